@@ -0,0 +1,165 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from evaluation import mae
+
+# Refit-per-replicate resampling on a process pool.
+#
+# Replicate r always uses the r-th child of SeedSequence(seed), so its sample
+# (and result) does not depend on the worker count or on which worker ran it.
+# X and y are copied once into shared memory; workers map them instead of
+# receiving a pickled copy per task. Each finished replicate is appended to a
+# JSONL file, and a rerun with the same file skips replicates already there.
+
+
+# --- Resampling schemes ---
+def bootstrap_indices(rng, n):
+    return rng.integers(0, n, size=n)
+
+def subsample_indices(rng, n, frac=0.8):
+    return np.sort(rng.choice(n, size=int(round(frac * n)), replace=False))
+
+
+# --- Evaluation functions: (model, X, y, idx) -> JSON-serializable result ---
+def oob_mae(model, X, y, idx):
+    oob = np.ones(len(y), dtype=bool)
+    oob[idx] = False
+    if not oob.any():
+        return float('nan')
+    return mae(y[oob], model.predict(X[oob]))
+
+def predict_grid(model, X, y, idx, x_grid):
+    # use via functools.partial(predict_grid, x_grid=grid)
+    return np.asarray(model.predict(x_grid), dtype=float).tolist()
+
+
+# --- Shared arrays ---
+def _to_shared(a):
+    a = np.ascontiguousarray(a)
+    shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+    np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf)[...] = a
+    return shm, (shm.name, a.shape, a.dtype.str)
+
+_WORKER = {}
+
+def _attach(spec):
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    a = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    a.flags.writeable = False  # every replicate sees the same base data
+    return shm, a
+
+def _init_worker(x_spec, y_spec, fit_fn, evaluate_fn, resample_fn):
+    x_shm, X = _attach(x_spec)
+    y_shm, y = _attach(y_spec)
+    _WORKER.update(X=X, y=y, shms=(x_shm, y_shm), fit_fn=fit_fn, evaluate_fn=evaluate_fn, resample_fn=resample_fn)
+
+
+def _run_replicates(replicates, seed):
+    X, y = _WORKER['X'], _WORKER['y']
+    out = []
+    for r in replicates:
+        # == SeedSequence(seed).spawn(r + 1)[r], without spawning the ones before it
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(r,)))
+        idx = _WORKER['resample_fn'](rng, len(y))
+        model = _WORKER['fit_fn'](X[idx], y[idx])
+        out.append({'replicate': r, 'result': _WORKER['evaluate_fn'](model, X, y, idx)})
+    return out
+
+
+# --- Results file ---
+def load_results(path):
+    """(meta, {replicate: result}) from a results file; (None, {}) when it does not exist."""
+    meta, done = None, {}
+    if not os.path.exists(path):
+        return meta, done
+    with open(path) as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                break  # torn last line from an interrupted run
+            if 'meta' in rec:
+                meta = rec['meta']
+            else:
+                done[rec['replicate']] = rec['result']
+    return meta, done
+
+
+def run_resampling(X, y, fit_fn, evaluate_fn=oob_mae, n_replicates=500, seed=111,
+                   resample_fn=bootstrap_indices, results_path=None, workers=None, batch_size=8):
+    """
+    Refits fit_fn(X[idx], y[idx]) for each replicate and records
+    evaluate_fn(model, X, y, idx). fit_fn, evaluate_fn and resample_fn must be
+    picklable (module-level functions or functools.partial of them).
+    Returns the results ordered by replicate. With results_path, results are
+    appended as they finish and replicates already in the file are skipped.
+    """
+    X, y = np.asarray(X), np.asarray(y)
+    meta = {'n': int(len(y)), 'n_replicates': int(n_replicates), 'seed': int(seed),
+            'fit_fn': getattr(fit_fn, '__name__', repr(fit_fn)),
+            'resample_fn': getattr(resample_fn, '__name__', repr(resample_fn))}
+    done = {}
+    if results_path is not None:
+        old_meta, done = load_results(results_path)
+        if old_meta is not None and old_meta != meta:
+            raise ValueError(f'{results_path} was written by a different run: {old_meta}')
+        # rewrite the valid records (drops a torn last line) before appending
+        with open(results_path, 'w') as f:
+            f.write(json.dumps({'meta': meta}) + '\n')
+            for r, res in sorted(done.items()):
+                f.write(json.dumps({'replicate': r, 'result': res}) + '\n')
+    todo = [r for r in range(n_replicates) if r not in done]
+    batches = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    x_shm, x_spec = _to_shared(X)
+    y_shm, y_spec = _to_shared(y)
+    sink = open(results_path, 'a') if results_path is not None else None
+    try:
+        def record(recs):
+            for rec in recs:
+                done[rec['replicate']] = rec['result']
+                if sink is not None:
+                    sink.write(json.dumps(rec) + '\n')
+            if sink is not None:
+                sink.flush()
+
+        if workers > 0 and batches:
+            ctx = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                                     initargs=(x_spec, y_spec, fit_fn, evaluate_fn, resample_fn)) as pool:
+                futures = [pool.submit(_run_replicates, b, seed) for b in batches]
+                for fut in as_completed(futures):
+                    record(fut.result())
+        else:
+            _init_worker(x_spec, y_spec, fit_fn, evaluate_fn, resample_fn)
+            try:
+                for b in batches:
+                    record(_run_replicates(b, seed))
+            finally:
+                shms = _WORKER.pop('shms')
+                _WORKER.clear()  # drop the array views before closing their buffers
+                for shm in shms:
+                    shm.close()
+    finally:
+        if sink is not None:
+            sink.close()
+        for shm in (x_shm, y_shm):
+            shm.close()
+            shm.unlink()
+    return [done[r] for r in range(n_replicates)]
+
+
+def summarize(results, alpha=0.05):
+    R = np.asarray(results, dtype=float)
+    lo, hi = np.nanpercentile(R, [100*alpha/2, 100*(1-alpha/2)], axis=0)
+    mean = np.nanmean(R, axis=0)
+    if R.ndim == 1:
+        return {'mean': float(mean), 'lo': float(lo), 'hi': float(hi)}
+    return {'mean': mean, 'lo': lo, 'hi': hi}
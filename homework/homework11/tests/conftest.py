@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the homework modules import each other by bare name (from evaluation import mae)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
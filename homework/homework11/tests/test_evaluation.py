@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from evaluation import GroupedLinReg, SimpleLinReg, bootstrap_metric, mae, r2, rmse
+
+
+@pytest.mark.parametrize("fn", [mae, rmse, r2])
+@pytest.mark.parametrize("n", [57, 180])
+def test_vectorized_bootstrap_matches_loop(fn, n):
+    rng = np.random.default_rng(0)
+    y_true = rng.normal(size=n)
+    y_pred = y_true + rng.normal(scale=0.5, size=n)
+    fast = bootstrap_metric(y_true, y_pred, fn, n_boot=300, seed=7, vectorized=True)
+    slow = bootstrap_metric(y_true, y_pred, fn, n_boot=300, seed=7, vectorized=False)
+    assert fast.keys() == slow.keys()
+    for k in fast:
+        assert fast[k] == pytest.approx(slow[k], rel=1e-12, abs=1e-12)
+
+
+def _per_group(x, y, groups):
+    return {g: SimpleLinReg().fit(x[groups == g], y[groups == g]) for g in np.unique(groups)}
+
+
+def _assert_matches(model, reference):
+    assert list(model.groups_) == sorted(reference)
+    for i, g in enumerate(model.groups_):
+        assert model.intercept_[i] == pytest.approx(reference[g].intercept_, abs=1e-9)
+        assert model.coef_[i] == pytest.approx(reference[g].coef_[0], abs=1e-9)
+
+
+def test_grouped_linreg_matches_per_group_fits():
+    rng = np.random.default_rng(1)
+    groups = np.repeat(np.array(["a", "b", "c", "d"]), [40, 25, 12, 1])  # d: a single row
+    x = rng.normal(size=len(groups))
+    x[groups == "c"] = 3.0  # constant x: pinv's minimum-norm answer
+    y = 2 * x + rng.normal(size=len(groups))
+    model = GroupedLinReg().fit(x, y, groups)
+    _assert_matches(model, _per_group(x, y, groups))
+    pred = model.predict(x, groups)
+    assert pred[groups == "a"] == pytest.approx(_per_group(x, y, groups)["a"].predict(x[groups == "a"]))
+
+
+def test_grouped_linreg_skips_missing_values_and_labels():
+    rng = np.random.default_rng(2)
+    x = rng.normal(size=30)
+    y = x + rng.normal(size=30)
+    groups = np.array(["a", "b", None] * 10, dtype=object)
+    x[0] = np.nan
+    y[4] = np.nan
+    model = GroupedLinReg().fit(x, y, groups)
+    keep = ~(np.isnan(x) | np.isnan(y)) & np.array([g is not None for g in groups])
+    _assert_matches(model, _per_group(x[keep], y[keep], groups[keep].astype(str)))
+    assert model.n_.tolist() == [9, 9]
+    assert np.isnan(model.predict([1.0], ["z"])).all()
+
+    float_groups = np.where(np.arange(30) % 3 == 2, np.nan, np.arange(30) % 3).astype(float)
+    assert GroupedLinReg().fit(x, y, float_groups).groups_.tolist() == [0.0, 1.0]
+
+
+def test_grouped_linreg_partial_fit_merges_and_adds_groups():
+    rng = np.random.default_rng(3)
+    groups = np.array(["a"] * 20 + ["b"] * 15 + ["a"] * 10 + ["c"] * 8)
+    x = rng.normal(size=len(groups))
+    y = 1.5 - x + rng.normal(size=len(groups))
+    first, rest = slice(0, 35), slice(35, None)  # rest: more "a", a new group "c"
+    model = GroupedLinReg().fit(x[first], y[first], groups[first])
+    model.partial_fit(x[rest], y[rest], groups[rest])
+    _assert_matches(model, _per_group(x, y, groups))
+    assert model.n_.tolist() == [30, 15, 8]
@@ -0,0 +1,58 @@
+import json
+
+import numpy as np
+import pytest
+
+from evaluation import fit_fn
+from resampling import load_results, run_resampling
+
+
+def _data(n=60):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(n, 1))
+    y = 3 * X.ravel() + rng.normal(size=n)
+    return X, y
+
+
+def test_results_do_not_depend_on_worker_count():
+    X, y = _data()
+    serial = run_resampling(X, y, fit_fn, n_replicates=12, seed=5, workers=0, batch_size=5)
+    pooled = run_resampling(X, y, fit_fn, n_replicates=12, seed=5, workers=2, batch_size=5)
+    assert serial == pooled
+    assert run_resampling(X, y, fit_fn, n_replicates=12, seed=6, workers=0) != serial
+
+
+def test_resume_skips_finished_replicates_and_drops_torn_line(tmp_path):
+    X, y = _data()
+    path = tmp_path / "results.jsonl"
+    full = run_resampling(X, y, fit_fn, n_replicates=10, seed=5, workers=0)
+
+    run_resampling(X, y, fit_fn, n_replicates=10, seed=5, workers=0, results_path=path)
+    lines = path.read_text().splitlines()
+    # keep the header and four replicates, then a half-written record
+    path.write_text("\n".join(lines[:5]) + "\n" + lines[5][:10])
+    meta, done = load_results(path)
+    assert meta["n_replicates"] == 10 and len(done) == 4
+
+    calls = []
+    def counting_fit(X, y):
+        calls.append(len(y))
+        return fit_fn(X, y)
+    counting_fit.__name__ = fit_fn.__name__  # same run as far as the results file is concerned
+
+    resumed = run_resampling(X, y, counting_fit, n_replicates=10, seed=5, workers=0, results_path=path)
+    assert len(calls) == 6
+    assert resumed == full
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert sorted(r["replicate"] for r in records[1:]) == list(range(10))
+
+
+@pytest.mark.parametrize("change", [{"seed": 6}, {"n_replicates": 11}])
+def test_results_from_another_run_are_rejected(tmp_path, change):
+    X, y = _data()
+    path = tmp_path / "results.jsonl"
+    run_resampling(X, y, fit_fn, n_replicates=10, seed=5, workers=0, results_path=path)
+    before = path.read_text()
+    with pytest.raises(ValueError, match="different run"):
+        run_resampling(X, y, fit_fn, workers=0, results_path=path, **{"n_replicates": 10, "seed": 5, **change})
+    assert path.read_text() == before
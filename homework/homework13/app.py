@@ -1,6 +1,8 @@
 # app.py
-from flask import Flask, request, jsonify, send_file, abort
-import io, matplotlib.pyplot as plt
+from flask import Flask, request, jsonify, Response, abort
+import hashlib, io, os, threading
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from src.utils import load_model, predict_model
 import numpy as np
 
@@ -54,18 +56,47 @@ def predict_two(input1, input2):
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
-@app.route('/plot', methods=['GET'])
-def plot_endpoint():
-    # produce a simple chart and return PNG bytes
-    fig, ax = plt.subplots()
-    ax.plot([0,1,2,3], [0,1,4,9])
+# /plot is rendered once per (model version, plotted data) and kept in memory;
+# Figure + Agg canvas instead of pyplot, so concurrent requests share no global figure state
+PLOT_X, PLOT_Y = [0, 1, 2, 3], [0, 1, 4, 9]
+_plot_cache = {}
+_plot_lock = threading.Lock()
+
+def _plot_key():
+    try:
+        st = os.stat(MODEL_PATH)
+        version = f'{st.st_mtime_ns}-{st.st_size}'
+    except FileNotFoundError:
+        version = 'no-model'
+    data = hashlib.sha1(np.asarray([PLOT_X, PLOT_Y], dtype=float).tobytes()).hexdigest()[:12]
+    return f'{version}-{data}'
+
+def render_plot():
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.plot(PLOT_X, PLOT_Y)
     ax.set_title('Example Plot')
     buf = io.BytesIO()
     fig.savefig(buf, format='png', bbox_inches='tight')
-    buf.seek(0)
-    return send_file(buf, mimetype='image/png',
-                     attachment_filename='plot.png',
-                     as_attachment=False)
+    return buf.getvalue()
+
+def get_plot():
+    key = _plot_key()
+    with _plot_lock:  # one render per key, even under concurrent first requests
+        if key not in _plot_cache:
+            _plot_cache.clear()  # older model versions are not served again
+            _plot_cache[key] = render_plot()
+        return key, _plot_cache[key]
+
+@app.route('/plot', methods=['GET'])
+def plot_endpoint():
+    # PNG bytes with an ETag; a client sending If-None-Match gets 304 and no body
+    key, png = get_plot()
+    response = Response(png, mimetype='image/png')
+    response.set_etag(key)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 if __name__ == '__main__':
     app.run(host='127.0.0.1', port=5000, debug=False)
@@ -2,7 +2,7 @@
 import numpy as np
 import pandas as pd
 from sklearn.linear_model import LinearRegression
-import pickle
+import joblib
 
 def generate_synthetic_data(n=200, seed=101):
     np.random.seed(seed)
@@ -18,12 +18,13 @@ def train_linear_model(df, feature_col='x_feature', target_col='y_target'):
     return model
 
 def save_model(model, path='model/model.pkl'):
-    with open(path, 'wb') as f:
-        pickle.dump(model, f)
+    # joblib stores NumPy arrays uncompressed and aligned, so they can be memory-mapped on load
+    joblib.dump(model, path)
 
-def load_model(path='model/model.pkl'):
-    with open(path, 'rb') as f:
-        return pickle.load(f)
+def load_model(path='model/model.pkl', mmap_mode='r'):
+    # mmap_mode='r': array data is mapped read-only from the file and shared by all
+    # worker processes instead of copied into each one (plain pickles still load)
+    return joblib.load(path, mmap_mode=mmap_mode)
 
 def predict_model(model, X):
     Xarr = np.array(X).reshape(1, -1) if np.ndim(X) == 1 else np.array(X)
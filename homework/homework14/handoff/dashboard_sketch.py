@@ -1,9 +1,22 @@
 # make_dashboard_sketch.py
 # Homework 14 – Optional Dashboard Sketch
-# Generates a simple PNG file (dashboard_sketch.png) with placeholder metrics.
+# Generates a PNG file (dashboard_sketch.png) of the monitoring metrics.
+# With a monitoring database (written by the project API / batch scoring when
+# MONITORING_DB is set), the bars show real values read from its `aggregates`
+# table: one row per metric, so drawing never scans the event log.
+# Without one, or for metrics nothing reports yet, the bars stay placeholders.
+#
+#   python dashboard_sketch.py ../../../project/reports/monitoring.sqlite
+
+import sys
+from pathlib import Path
 
 import matplotlib.pyplot as plt
 
+# the aggregates are read by the project's own reader (src.monitoring)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "project"))
+from src.monitoring import read_aggregates  # noqa: E402
+
 monitoring = {
     "Data": ["freshness_minutes", "null_rate", "schema_hash"],
     "Model": ["rolling_mae_or_auc", "calibration_error"],
@@ -11,22 +24,45 @@ monitoring = {
     "Business": ["approval_rate", "bad_rate"]
 }
 
-def make_dashboard_png():
+# dashboard name -> aggregates row, and the alert threshold the bar is scaled to
+SOURCES = {"rolling_mae_or_auc": "rolling_mae"}
+THRESHOLDS = {
+    "freshness_minutes": 24 * 60,
+    "null_rate": 0.05,
+    "rolling_mae_or_auc": 500.0,
+    "p95_latency_ms": 300.0,
+    "error_rate": 0.01,
+}
+
+def make_dashboard_png(db_path=None):
+    values = read_aggregates(db_path) if db_path else {}
     fig, axes = plt.subplots(2, 2, figsize=(10, 6))
-    fig.suptitle("Conceptual Monitoring Dashboard", fontsize=14, fontweight="bold")
+    title = "Monitoring Dashboard" if values else "Conceptual Monitoring Dashboard"
+    fig.suptitle(title, fontsize=14, fontweight="bold")
 
     for ax, (layer, metrics) in zip(axes.flatten(), monitoring.items()):
         ax.set_title(layer)
-        ax.barh(range(len(metrics)), [1]*len(metrics))  # fake values (all 1)
+        for i, name in enumerate(metrics):
+            value = values.get(SOURCES.get(name, name))
+            if isinstance(value, str):  # schema_hash: shown, not scaled
+                ax.barh(i, 1, color="lightgray")
+                ax.text(0.05, i, value, va="center", family="monospace")
+            elif value is not None and name in THRESHOLDS:
+                ratio = value / THRESHOLDS[name]
+                ax.barh(i, min(ratio, 2), color="tab:red" if ratio > 1 else "tab:green")
+                ax.text(min(ratio, 2) + 0.03 if ratio < 1.7 else 1.0, i, f"{value:.4g}", va="center")
+            else:
+                ax.barh(i, 1, color="lightgray")  # placeholder: nothing reports this metric yet
+        ax.axvline(1, color="black", linewidth=0.8, linestyle="--")
         ax.set_yticks(range(len(metrics)))
         ax.set_yticklabels(metrics)
         ax.set_xlim(0, 2)
-        ax.set_xticks([])  # hide x-axis since values are fake
-        ax.set_xlabel("placeholder")
+        ax.set_xticks([])  # values are scaled to their thresholds (dashed line)
+        ax.set_xlabel("value / alert threshold" if values else "placeholder")
 
     plt.tight_layout(rect=[0, 0, 1, 0.95])
     plt.savefig("dashboard_sketch.png")
     print("✅ Saved dashboard sketch to handoff/dashboard_sketch.png")
 
 if __name__ == "__main__":
-    make_dashboard_png()
+    make_dashboard_png(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -1,27 +1,127 @@
 # app.py
-from flask import Flask, request, jsonify
-from src.utils import predict, run_full_analysis
+import os
+import time
+from contextlib import ExitStack
+from flask import Flask, request, jsonify, g, Response
+from werkzeug.exceptions import BadRequest
+from src.utils import predict, model_cache_stats, feature_importance_plot
+from src.jobs import ANALYSIS_JOBS, submit_full_analysis
+from src.batching import MicroBatcher
+from src.serving import extract_payload, path_params_payload, job_accepted, job_status, job_result, schema_error, malformed_json
+from src.schema import SchemaError
+from src import profiling
+from src.monitoring import get_monitor
 import traceback
 
 app = Flask(__name__)
 
+# Concurrent POST /predict calls are coalesced into one vectorized predict().
+# Set PREDICT_BATCH_WAIT_MS=0 to disable the collection window. Rows stay
+# dicts: predict() validates them straight into a NumPy buffer.
+def _predict_rows(rows):
+    return predict(rows)["predictions"]
+
+BATCHER = MicroBatcher(
+    _predict_rows,
+    max_batch_rows=int(os.getenv("PREDICT_BATCH_MAX_ROWS", "256")),
+    max_wait_ms=float(os.getenv("PREDICT_BATCH_WAIT_MS", "2")),
+    as_frame=False,
+)
+
+# Every request is recorded as stage "http <METHOD> <route>" (see /metrics).
+# Its CPU time includes the request's share of a micro-batch, which runs on the
+# batcher thread. With PROFILE_DIR set, ?profile=1 or an "X-Profile: 1" header
+# also dumps a cProfile of that request there (the file name comes back in
+# X-Profile-File); a profiled POST /predict skips the batcher, so the dump
+# shows the inference itself rather than the wait for the batch.
+def _wants_profile():
+    return bool(profiling.PROFILE_DIR) and (request.args.get("profile") == "1"
+                                            or request.headers.get("X-Profile") == "1")
+
+@app.before_request
+def _start_request_stage():
+    if _wants_profile():
+        rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        g.profile = ExitStack()  # closed in _end_request_stage, which writes the dump
+        g.profile_file = g.profile.enter_context(profiling.profile_to(
+            profiling.profile_path(f"{request.method}-{rule}")))
+    g.stage_start = (time.perf_counter(), time.thread_time())
+
+@app.after_request
+def _end_request_stage(response):
+    start = g.pop("stage_start", None)
+    rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    if start is not None:
+        wall = time.perf_counter() - start[0]
+        if profiling.ENABLED:
+            cpu = time.thread_time() - start[1] + g.pop("batch_cpu", 0.0)
+            profiling.STAGES.record(f"http {request.method} {rule}", wall, cpu,
+                                    error=response.status_code >= 500)
+        if request.endpoint in ("predict_post", "predict_get"):
+            get_monitor().record_request(wall * 1000, ok=response.status_code < 500)
+    profile = g.pop("profile", None)
+    if profile is not None:
+        profile.close()
+        response.headers["X-Profile-File"] = g.pop("profile_file").name
+    return response
+
 @app.route("/")
 def health():
     return jsonify({"status": "ok", "service": "model-api"})
 
+@app.route("/metrics/model_cache")
+def model_cache_metrics():
+    return jsonify(model_cache_stats())
+
+@app.route("/metrics/batching")
+def batching_metrics():
+    return jsonify(BATCHER.stats())
+
+@app.route("/metrics/stages")
+def stage_metrics():
+    return jsonify(profiling.STAGES.snapshot())
+
+@app.route("/metrics")
+def prometheus_metrics():
+    return Response(profiling.STAGES.prometheus(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/plots/feature_importances")
+def feature_importances_png():
+    # rendered once per model version; clients revalidate with If-None-Match and get 304s
+    try:
+        plot = feature_importance_plot()
+    except FileNotFoundError:
+        return jsonify({"status": "error", "message": "No trained model yet"}), 404
+    if plot is None:
+        return jsonify({"status": "error", "message": "Model has no feature importances"}), 404
+    etag, png = plot
+    response = Response(png, mimetype="image/png")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
 @app.route("/predict", methods=["POST"])
 def predict_post():
     try:
-        data = request.get_json()
+        try:
+            data = request.get_json()
+        except BadRequest:
+            code, body = malformed_json()
+            return jsonify(body), code
         if data is None:
             return jsonify({"error": "No JSON received"}), 400
-        # Accept either {"features": {...}} or a list/dict directly
-        if "features" in data:
-            payload = data["features"]
+        payload = extract_payload(data)
+        if isinstance(payload, (dict, list)) and "profile" not in g:
+            future = BATCHER.submit_async(payload)
+            values = future.result()
+            g.batch_cpu = future.cpu_seconds
+            preds = {"predictions": values, "n": len(values)}
         else:
-            payload = data
-        preds = predict(payload)
+            preds = predict(payload)
         return jsonify({"status": "success", "result": preds})
+    except SchemaError as e:
+        code, body = schema_error(e)
+        return jsonify(body), code
     except Exception as e:
         traceback.print_exc()
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -32,34 +132,40 @@ def predict_post():
 def predict_get(param1, param2=None):
     # Example: parse params into a single-feature input. Adapt to your model schema.
     try:
-        # Convert params into numeric if possible
-        try:
-            val1 = float(param1)
-        except:
-            val1 = param1
-        payload = {"feat1": val1}
-        if param2 is not None:
-            try:
-                val2 = float(param2)
-            except:
-                val2 = param2
-            payload["feat2"] = val2
+        payload = path_params_payload(param1, param2)
         preds = predict(payload)
         return jsonify({"status": "success", "result": preds})
+    except SchemaError as e:
+        code, body = schema_error(e)
+        return jsonify(body), code
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
-@app.route("/run_full_analysis", methods=["GET"])
+@app.route("/run_full_analysis", methods=["GET", "POST"])
+@app.route("/jobs/run_full_analysis", methods=["POST"])
 def run_full():
+    # Retraining runs on a worker process; poll /jobs/<job_id> for progress.
     try:
         force = request.args.get("force", "false").lower() == "true"
-        summary = run_full_analysis(force_retrain=force)
-        return jsonify({"status": "success", "summary": summary})
+        code, body = job_accepted(*submit_full_analysis(force_retrain=force))
+        return jsonify(body), code
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status_get(job_id):
+    code, body = job_status(ANALYSIS_JOBS, job_id)
+    return jsonify(body), code
+
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result_get(job_id):
+    code, body = job_result(ANALYSIS_JOBS, job_id)
+    return jsonify(body), code
+
+
 if __name__ == "__main__":
     # For local dev only. For production use Gunicorn or uWSGI.
     app.run(host="0.0.0.0", port=5000, debug=True)
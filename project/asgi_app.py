@@ -0,0 +1,303 @@
+# asgi_app.py
+# Async serving mode: same routes as app.py, but inference runs on a bounded
+# thread pool so the event loop never blocks on predict() or JSON parsing.
+#
+#   uvicorn asgi_app:app --host 0.0.0.0 --port 8000
+import asyncio
+import contextvars
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from src.utils import predict, model_cache_stats, feature_importance_plot
+from src.jobs import ANALYSIS_JOBS, submit_full_analysis
+from src.serving import extract_payload, path_params_payload, job_accepted, job_status, job_result, schema_error, malformed_json
+from src.schema import SchemaError
+from src import profiling
+from src.monitoring import get_monitor
+
+PREDICT_WORKERS = int(os.getenv("PREDICT_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Requests allowed in flight (running + waiting) before we shed load with 503.
+PREDICT_MAX_PENDING = int(os.getenv("PREDICT_MAX_PENDING", str(PREDICT_WORKERS * 8)))
+
+# /run_full_analysis is queued on src.jobs' worker process, never on this pool.
+_predict_pool = ThreadPoolExecutor(max_workers=PREDICT_WORKERS, thread_name_prefix="predict")
+_pending = 0
+
+
+# --- Responses ---
+async def _send_bytes(send, status, payload, content_type, headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", content_type),
+            (b"content-length", str(len(payload)).encode("ascii")),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": payload})
+
+
+async def _send_json(send, status, body, headers=()):
+    await _send_bytes(send, status, json.dumps(body).encode("utf-8"), b"application/json", headers)
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+def _predict_from_body(body):
+    # Runs on the predict pool: JSON decoding is CPU work too.
+    try:
+        data = json.loads(body) if body else None
+    except ValueError:  # JSONDecodeError, or bytes that are not UTF-8
+        return malformed_json()
+    if data is None:
+        return 400, {"error": "No JSON received"}
+    return 200, {"status": "success", "result": predict(extract_payload(data))}
+
+
+# --- Per-request stages and profiles (as in app.py) ---
+# Each request is recorded as stage "http <METHOD> <route>". Its CPU time is
+# what the request ran on the predict pool, where the real work happens; the
+# event loop's small share is not attributed. With PROFILE_DIR set,
+# ?profile=1 or an "X-Profile: 1" header dumps a cProfile of that pool work
+# (the file name comes back in X-Profile-File).
+class _RequestStats:
+    __slots__ = ("cpu", "profile_path")
+
+    def __init__(self, profile_path=None):
+        self.cpu = 0.0
+        self.profile_path = profile_path
+
+
+_REQUEST = contextvars.ContextVar("asgi_request", default=None)
+
+
+def _wants_profile(scope):
+    if not profiling.PROFILE_DIR:
+        return False
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile", [""])[0] == "1" or dict(scope.get("headers", ())).get(b"x-profile") == b"1"
+
+
+def _measured(req, fn, *args):
+    # runs on a pool thread
+    t0 = time.thread_time()
+    try:
+        if req.profile_path is None:
+            return fn(*args)
+        with profiling.profile_to(req.profile_path):
+            return fn(*args)
+    finally:
+        req.cpu += time.thread_time() - t0
+
+
+async def _in_pool(fn, *args):
+    """Run fn on the predict pool, charged to the current request's stage."""
+    req = _REQUEST.get()
+    if req is not None:
+        fn, args = _measured, (req, fn, *args)
+    return await asyncio.get_running_loop().run_in_executor(_predict_pool, fn, *args)
+
+
+async def _run_bounded(fn, *args):
+    """Run fn on the predict pool, or return None when the queue is full."""
+    global _pending
+    if _pending >= PREDICT_MAX_PENDING:
+        return None
+    _pending += 1  # only touched from the event loop thread
+    try:
+        return await _in_pool(fn, *args)
+    finally:
+        _pending -= 1
+
+
+_BUSY = (503, {"status": "error", "message": "Server busy, retry later"})
+_RETRY_AFTER = [(b"retry-after", b"1")]
+
+
+# --- Handlers ---
+async def health(scope, receive, send):
+    await _send_json(send, 200, {"status": "ok", "service": "model-api"})
+
+
+async def model_cache_metrics(scope, receive, send):
+    await _send_json(send, 200, model_cache_stats())
+
+
+async def serving_metrics(scope, receive, send):
+    await _send_json(send, 200, {
+        "predict_workers": PREDICT_WORKERS,
+        "max_pending": PREDICT_MAX_PENDING,
+        "pending": _pending,
+    })
+
+
+async def stage_metrics(scope, receive, send):
+    await _send_json(send, 200, profiling.STAGES.snapshot())
+
+
+async def prometheus_metrics(scope, receive, send):
+    # predict() stages are recorded on the pool threads that run them
+    await _send_bytes(send, 200, profiling.STAGES.prometheus().encode("utf-8"),
+                      b"text/plain; version=0.0.4; charset=utf-8")
+
+
+async def feature_importances_png(scope, receive, send):
+    try:
+        plot = await _in_pool(feature_importance_plot)
+    except FileNotFoundError:
+        await _send_json(send, 404, {"status": "error", "message": "No trained model yet"})
+        return
+    if plot is None:
+        await _send_json(send, 404, {"status": "error", "message": "Model has no feature importances"})
+        return
+    etag, png = plot
+    quoted = f'"{etag}"'.encode("ascii")
+    headers = [(b"etag", quoted), (b"cache-control", b"no-cache")]
+    sent_tags = dict(scope.get("headers", ())).get(b"if-none-match", b"")
+    if quoted in [t.strip() for t in sent_tags.split(b",")] or sent_tags.strip() == b"*":
+        await _send_bytes(send, 304, b"", b"image/png", headers)
+        return
+    await _send_bytes(send, 200, png, b"image/png", headers)
+
+
+async def predict_post(scope, receive, send):
+    body = await _read_body(receive)
+    try:
+        result = await _run_bounded(_predict_from_body, body)
+    except SchemaError as e:
+        await _send_json(send, *schema_error(e))
+        return
+    except Exception as e:
+        traceback.print_exc()
+        await _send_json(send, 500, {"status": "error", "message": str(e)})
+        return
+    if result is None:
+        await _send_json(send, *_BUSY, headers=_RETRY_AFTER)
+        return
+    status, payload = result
+    await _send_json(send, status, payload)
+
+
+async def predict_get(scope, receive, send, param1, param2=None):
+    try:
+        result = await _run_bounded(predict, path_params_payload(param1, param2))
+    except SchemaError as e:
+        await _send_json(send, *schema_error(e))
+        return
+    except Exception as e:
+        await _send_json(send, 500, {"status": "error", "message": str(e)})
+        return
+    if result is None:
+        await _send_json(send, *_BUSY, headers=_RETRY_AFTER)
+        return
+    await _send_json(send, 200, {"status": "success", "result": result})
+
+
+async def run_full(scope, receive, send):
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    force = query.get("force", ["false"])[0].lower() == "true"
+    try:
+        await _send_json(send, *job_accepted(*submit_full_analysis(force_retrain=force)))
+    except Exception as e:
+        await _send_json(send, 500, {"status": "error", "message": str(e)})
+
+
+async def job_get(scope, receive, send, job_id, action=None):
+    if action is None:
+        await _send_json(send, *job_status(ANALYSIS_JOBS, job_id))
+    elif action == "result":
+        await _send_json(send, *job_result(ANALYSIS_JOBS, job_id))
+    else:
+        await _send_json(send, 404, {"status": "error", "message": "Not found"})
+
+
+# --- Routing ---
+ROUTES = {
+    ("GET", "/"): health,
+    ("GET", "/metrics/model_cache"): model_cache_metrics,
+    ("GET", "/metrics/serving"): serving_metrics,
+    ("GET", "/metrics/stages"): stage_metrics,
+    ("GET", "/metrics"): prometheus_metrics,
+    ("GET", "/plots/feature_importances"): feature_importances_png,
+    ("POST", "/predict"): predict_post,
+    ("GET", "/run_full_analysis"): run_full,
+    ("POST", "/run_full_analysis"): run_full,
+    ("POST", "/jobs/run_full_analysis"): run_full,
+}
+
+
+def _match(method, path):
+    """(handler, path args, route label for the request stage)."""
+    handler = ROUTES.get((method, path))
+    if handler is not None:
+        return handler, (), path
+    parts = [p for p in path.split("/") if p]
+    if method == "GET" and parts and parts[0] == "predict" and len(parts) in (2, 3):
+        return predict_get, tuple(parts[1:]), "/predict/<param1>" + ("/<param2>" if len(parts) == 3 else "")
+    if method == "GET" and parts and parts[0] == "jobs" and len(parts) in (2, 3):
+        return job_get, tuple(parts[1:]), "/jobs/<job_id>" + ("/<action>" if len(parts) == 3 else "")
+    return None, (), "unmatched"
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            _predict_pool.shutdown(wait=False, cancel_futures=True)
+            ANALYSIS_JOBS.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+    handler, args, rule = _match(scope["method"], scope["path"])
+    label = f"http {scope['method']} {rule}"
+    req = _RequestStats(profiling.profile_path(f"{scope['method']}-{rule}") if _wants_profile(scope) else None)
+    token = _REQUEST.set(req)
+    started, status = time.perf_counter(), [500]
+
+    async def send_watching_status(message):
+        if message["type"] == "http.response.start":
+            status[0] = message["status"]
+            if req.profile_path is not None and req.profile_path.exists():
+                headers = [*message.get("headers", ()), (b"x-profile-file", req.profile_path.name.encode())]
+                message = {**message, "headers": headers}
+        await send(message)
+
+    try:
+        if handler is None:
+            await _send_json(send_watching_status, 404, {"status": "error", "message": "Not found"})
+        else:
+            await handler(scope, receive, send_watching_status, *args)
+    finally:
+        _REQUEST.reset(token)
+        wall = time.perf_counter() - started
+        if profiling.ENABLED:
+            profiling.STAGES.record(label, wall, req.cpu, error=status[0] >= 500)
+        # prediction requests feed the monitoring latency / error-rate aggregates
+        if handler in (predict_post, predict_get):
+            get_monitor().record_request(wall * 1000, ok=status[0] < 500)
+
+
+if __name__ == "__main__":
+    import uvicorn  # optional dependency, only needed to run this module directly
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "8000")))
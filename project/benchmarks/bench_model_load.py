@@ -0,0 +1,104 @@
+# benchmarks/bench_model_load.py
+# Worker startup time and memory for the model artifact formats:
+#   pickle       joblib.load(model.pkl)                   (sklearn objects, private copy)
+#   pickle-mmap  joblib.load(model.pkl, mmap_mode="r")    (sklearn Trees copy their nodes anyway)
+#   flat-mmap    tree_export.load_forest(..., mmap_mode="r")  (node tables mapped, shared)
+# N worker processes load the same file and score one batch; RSS/PSS are read
+# from /proc while all of them are alive, so PSS shows what sharing saves (Linux).
+#
+#   python benchmarks/bench_model_load.py --workers 4 --train-rows 20000
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+MODES = ("pickle", "pickle-mmap", "flat-mmap")
+N_FEATURES = 6
+
+
+def _memory_mb():
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                fields[parts[0][:-1].lower()] = int(parts[1]) / 1024
+    return fields
+
+
+def worker(mode, path):
+    import joblib
+    from src.tree_export import load_forest
+
+    before = _memory_mb()["rss"]
+    t0 = time.perf_counter()
+    if mode == "pickle":
+        model = joblib.load(path)
+    elif mode == "pickle-mmap":
+        model = joblib.load(path, mmap_mode="r")
+    else:
+        model = load_forest(path, mmap_mode="r")
+    load_s = time.perf_counter() - t0
+    model.predict(np.random.default_rng(0).normal(size=(1000, N_FEATURES)))
+    print("ready", flush=True)
+    sys.stdin.readline()  # wait until every worker has loaded
+    mem = _memory_mb()
+    print(f"{load_s} {mem['rss'] - before} {mem['rss']} {mem['pss']}", flush=True)
+
+
+def run_mode(mode, path, workers):
+    procs = [subprocess.Popen([sys.executable, __file__, "--worker", mode, str(path)],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, cwd=ROOT)
+             for _ in range(workers)]
+    for p in procs:
+        assert p.stdout.readline().strip() == "ready"
+    rows = []
+    for p in procs:
+        p.stdin.write("\n")
+        p.stdin.flush()
+        rows.append([float(v) for v in p.stdout.readline().split()])
+        p.wait()
+    return np.array(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--train-rows", type=int, default=20_000)
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--worker", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.worker:
+        worker(*args.worker)
+        return
+
+    import joblib
+    from sklearn.ensemble import RandomForestRegressor
+    from src.tree_export import export_forest
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(args.train_rows, N_FEATURES))
+    y = X[:, 0] * 3 + np.sin(X[:, 1]) + rng.normal(0, 0.5, args.train_rows)
+    model = RandomForestRegressor(n_estimators=args.trees, random_state=0).fit(X, y)
+    tmp = Path(tempfile.mkdtemp())
+    paths = {"pickle": tmp / "model.pkl", "flat": tmp / "model.flat.joblib"}
+    joblib.dump(model, paths["pickle"])
+    export_forest(model, paths["flat"])
+    print(f"{args.trees} trees on {args.train_rows:,} rows: pickle {paths['pickle'].stat().st_size / 1e6:.1f} MB, "
+          f"flat {paths['flat'].stat().st_size / 1e6:.1f} MB; {args.workers} workers")
+    print(f"{'mode':<14}{'load ms':>10}{'model RSS MB':>14}{'RSS MB':>10}{'PSS MB':>10}{'total PSS MB':>14}")
+    for mode in MODES:
+        path = paths["flat"] if mode == "flat-mmap" else paths["pickle"]
+        r = run_mode(mode, path, args.workers)
+        print(f"{mode:<14}{np.median(r[:, 0]) * 1e3:>10.1f}{np.median(r[:, 1]):>14.1f}"
+              f"{np.median(r[:, 2]):>10.1f}{np.median(r[:, 3]):>10.1f}{r[:, 3].sum():>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# benchmarks/bench_outliers.py
+# Vectorized (engine="numpy") vs column-loop (engine="pandas") IQR functions.
+#
+#   python benchmarks/bench_outliers.py --rows 1000000 --cols 50
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.outliers import detect_outliers_iqr, winsorize_iqr  # noqa: E402
+
+
+def make_frame(rows, cols, seed=0):
+    rng = np.random.default_rng(seed)
+    data = rng.standard_t(3, size=(rows, cols))
+    data[rng.random((rows, cols)) < 0.01] = np.nan
+    return pd.DataFrame(data, columns=[f"c{i}" for i in range(cols)])
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--cols", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    df = make_frame(args.rows, args.cols)
+    cases = {
+        "detect_outliers_iqr": lambda engine: detect_outliers_iqr(df, engine=engine),
+        "winsorize_iqr": lambda engine: winsorize_iqr(df, engine=engine),
+    }
+    print(f"{args.rows:,} rows x {args.cols} cols (best of {args.repeat})")
+    print(f"{'function':<24}{'pandas s':>10}{'numpy s':>10}{'speedup':>9}")
+    for name, fn in cases.items():
+        t_pd = timed(lambda: fn("pandas"), args.repeat)
+        t_np = timed(lambda: fn("numpy"), args.repeat)
+        print(f"{name:<24}{t_pd:>10.3f}{t_np:>10.3f}{t_pd / t_np:>8.1f}x")
+    work = df.copy()
+    t_inplace = timed(lambda: winsorize_iqr(work, engine="numpy", inplace=True), args.repeat)
+    print(f"{'winsorize_iqr inplace':<24}{'':>10}{t_inplace:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
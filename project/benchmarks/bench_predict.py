@@ -0,0 +1,59 @@
+# benchmarks/bench_predict.py
+# sklearn RandomForestRegressor.predict vs the flattened node-table predictor
+# (src.tree_export.FlatForest) across batch sizes.
+#
+#   python benchmarks/bench_predict.py --train-rows 3000 --trees 100
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.tree_export import FlatForest  # noqa: E402
+
+COLS = ["Basic Salary", "Payment", "Age", "Tenure", "LoanAmount", "InterestRate"]
+
+
+def make_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({c: rng.lognormal(6, 1, rows) for c in COLS})
+    df.loc[rng.random(rows) < 0.05, "InterestRate"] = np.nan
+    y = df["Basic Salary"] * 0.3 - df["Payment"] + rng.normal(0, 50, rows)
+    return df, y
+
+
+def median_latency(fn, budget_s=2.0, max_repeat=50):
+    times = []
+    while len(times) < max_repeat and (len(times) < 3 or sum(times) < budget_s):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--train-rows", type=int, default=3000)
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 10, 1_000, 100_000])
+    args = parser.parse_args(argv)
+
+    X, y = make_frame(args.train_rows)
+    model = RandomForestRegressor(n_estimators=args.trees, random_state=42).fit(X, y)
+    flat = FlatForest.from_sklearn(model)
+    print(f"{args.trees} trees, {len(flat.value):,} nodes, max depth {flat.max_depth}")
+    print(f"{'batch':>8}{'sklearn ms':>14}{'flat ms':>12}{'speedup':>10}{'identical':>11}")
+    for n in args.batches:
+        batch, _ = make_frame(n, seed=n)
+        identical = np.array_equal(model.predict(batch), flat.predict(batch))
+        t_sk = median_latency(lambda: model.predict(batch))
+        t_flat = median_latency(lambda: flat.predict(batch))
+        print(f"{n:>8,}{t_sk * 1e3:>14.2f}{t_flat * 1e3:>12.2f}{t_sk / t_flat:>10.1f}x{str(identical):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_preprocessor.py
+# Dense one-hot vs sparse / bucketed / hashed categorical paths in make_preprocessor.
+#
+#   python benchmarks/bench_preprocessor.py --rows 200000
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse as sp
+from sklearn.linear_model import Ridge
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from src.modeling import make_preprocessor  # noqa: E402
+
+NUM_COLS = ["Basic Salary", "LoanAmount", "Instalment", "Tenure", "Age"]
+CAT_COLS = ["Employer", "Branch", "LoanPurpose", "Region"]
+
+
+def make_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({c: rng.lognormal(8, 1, rows) for c in NUM_COLS})
+    # Zipf-like level frequencies: a few big employers, a long tail of small ones
+    df["Employer"] = "emp_" + (rng.zipf(1.3, rows) % 20_000).astype(str)
+    df["Branch"] = "br_" + rng.integers(0, 500, rows).astype(str)
+    df["LoanPurpose"] = rng.choice(["School", "Home", "Car", "Medical", "Business"], rows)
+    df["Region"] = rng.choice(["North", "South", "East", "West", "Central"], rows)
+    y = df["Basic Salary"] * 0.3 - df["Instalment"] + rng.normal(0, 100, rows)
+    return df, y
+
+
+def nbytes(X):
+    if sp.issparse(X):
+        X = X.tocsr()
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return X.nbytes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    df, y = make_frame(args.rows)
+    configs = {
+        "dense one-hot": {},
+        "sparse one-hot": {"sparse": True},
+        "sparse, min_frequency=20": {"sparse": True, "min_frequency": 20},
+        "sparse, hashing 2**12": {"sparse": True, "hashing_n_features": 2 ** 12},
+    }
+    print(f"{args.rows:,} rows, {df['Employer'].nunique():,} employers, {df['Branch'].nunique()} branches")
+    print(f"{'config':<28}{'shape':>16}{'MB':>10}{'transform s':>13}{'ridge fit s':>13}")
+    for name, kwargs in configs.items():
+        pre = make_preprocessor(NUM_COLS, CAT_COLS, **kwargs)
+        try:
+            t0 = time.perf_counter()
+            X = pre.fit_transform(df)
+            t_pre = time.perf_counter() - t0
+        except MemoryError:
+            print(f"{name:<28}{'MemoryError':>16}")
+            continue
+        t0 = time.perf_counter()
+        Ridge(alpha=1.0, solver="auto").fit(X, y)
+        t_fit = time.perf_counter() - t0
+        shape = f"{X.shape[0]}x{X.shape[1]}"
+        print(f"{name:<28}{shape:>16}{nbytes(X) / 1e6:>10.1f}{t_pre:>13.2f}{t_fit:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# src/batch_score.py
+# Bulk scoring of a CSV/Parquet loan book without loading it into memory:
+#
+#   python -m src.batch_score data/processed/loan_book.parquet reports/scores.parquet \
+#       --workers 4 --chunksize 50000 --keep id_number
+#
+# Chunks are cleaned like prepare_data(), scored on a process pool whose
+# workers load the model once, and written out in input order.
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+from src import utils
+from src.monitoring import get_monitor
+from src.schema import SchemaError
+from src.storage import ChunkWriter, iter_table_chunks
+
+try:
+    import resource  # peak RSS; Unix only
+except ImportError:
+    resource = None
+
+DEFAULT_CHUNKSIZE = 50_000
+
+# --- Worker side ---
+_WORKER = {}
+
+
+def _init_worker(model_dir, model_name, backend):
+    # runs once per worker process: point utils at the model and load it up front
+    utils.MODEL_DIR = Path(model_dir)
+    _WORKER.update(model_name=model_name, backend=backend, schema=utils.load_schema(model_name))
+    if backend in ("flat", "auto"):
+        try:
+            utils.load_flat_model(model_name)
+        except TypeError:
+            pass  # not a tree model; predict() falls back or raises as configured
+    utils.load_model(model_name)
+
+
+def _score_chunk(df, keep=()):
+    df = utils.clean_column_names(df)
+    # actuals before fillna_values turns missing ones into 0
+    actual = df[utils.TARGET_COLUMN].to_numpy(dtype=float) if utils.TARGET_COLUMN in df.columns else None
+    df = utils.fillna_values(df)
+    schema = _WORKER["schema"]
+    if schema is not None:
+        missing = [c for c in schema.names if c not in df.columns]
+        if missing:
+            raise SchemaError([f"missing feature '{c}'" for c in missing])
+        X = df[schema.names]  # extra columns (ids, target, text) are not features
+    else:
+        X = df.drop(columns=[utils.TARGET_COLUMN], errors="ignore").select_dtypes(exclude=utils.NON_FEATURE_DTYPES)
+    preds = utils.predict(X, _WORKER["model_name"], backend=_WORKER["backend"])["predictions"]
+    monitor = get_monitor()
+    if actual is not None:  # rows with a known outcome feed the rolling MAE
+        monitor.record_outcomes(actual, preds)
+    monitor.flush(force=True)  # pool workers exit without running atexit hooks
+    out = df[list(keep)].reset_index(drop=True)
+    out["prediction"] = preds
+    return out
+
+
+class _InlineExecutor:
+    """workers=0: same code path, scored in this process."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+# --- Driver ---
+def _peak_memory_mb():
+    if resource is None:
+        return None, None
+    scale = 1 / 1024 if sys.platform != "darwin" else 1 / 1024 ** 2  # KiB on Linux, bytes on macOS
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    workers = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return round(own, 1), round(workers, 1)
+
+
+def score_file(src, dst, model_name="model_v1.pkl", model_dir=None, chunksize=DEFAULT_CHUNKSIZE,
+               workers=None, max_in_flight=None, backend=None, keep=()):
+    """
+    Streams `src` in chunks, scores them and writes `dst` (.csv or .parquet)
+    in input order with a `prediction` column plus any `keep` columns
+    (names after clean_column_names). At most `max_in_flight` chunks are
+    queued or being scored at once, which bounds memory.
+    Returns a summary with rows, seconds, rows_per_s and peak memory.
+    """
+    model_dir = Path(model_dir) if model_dir is not None else utils.MODEL_DIR
+    if not (model_dir / model_name).exists():
+        raise FileNotFoundError(f"Model not found at {model_dir / model_name}")
+    backend = backend or utils.PREDICT_BACKEND
+    workers = (multiprocessing.cpu_count() or 1) if workers is None else workers
+    max_in_flight = max_in_flight or max(2, 2 * workers)
+
+    started = time.perf_counter()
+    get_monitor().record_data_timestamp(Path(src).stat().st_mtime)
+    caller_model_dir = utils.MODEL_DIR
+    rows = chunks = 0
+    in_flight = deque()
+    pool = None
+    try:
+        if workers > 0:
+            # spawn, like src.jobs: safe even when the caller has live threads
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_init_worker, initargs=(str(model_dir), model_name, backend))
+        else:
+            _init_worker(str(model_dir), model_name, backend)  # sets utils.MODEL_DIR; restored below
+            pool = _InlineExecutor()
+        with ChunkWriter(dst) as writer:
+            def drain_one():
+                nonlocal rows
+                out = in_flight.popleft().result()
+                writer.write(out)
+                rows += len(out)
+
+            for chunk in iter_table_chunks(src, chunksize=chunksize):
+                in_flight.append(pool.submit(_score_chunk, chunk, tuple(keep)))
+                chunks += 1
+                if len(in_flight) >= max_in_flight:
+                    drain_one()
+            while in_flight:
+                drain_one()
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        utils.MODEL_DIR = caller_model_dir
+
+    seconds = time.perf_counter() - started
+    peak_self, peak_worker = _peak_memory_mb()
+    return {
+        "input": str(src),
+        "output": str(dst),
+        "model": model_name,
+        "backend": backend,
+        "workers": workers,
+        "chunks": chunks,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_s": round(rows / seconds, 1) if seconds > 0 else None,
+        "peak_rss_mb": peak_self,
+        "peak_worker_rss_mb": peak_worker if workers > 0 else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet loan book in chunks.")
+    parser.add_argument("input", help=".csv, .parquet or .feather file to score")
+    parser.add_argument("output", help=".csv or .parquet file to write")
+    parser.add_argument("--model", default="model_v1.pkl", help="model file name in --model-dir")
+    parser.add_argument("--model-dir", default=None, help="defaults to the project's model/ directory")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--workers", type=int, default=None, help="processes (0 = score in this process)")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="chunks queued at once (default 2 x workers)")
+    parser.add_argument("--backend", choices=utils.PREDICT_BACKENDS, default=None)
+    parser.add_argument("--keep", nargs="*", default=(), help="input columns to copy to the output, e.g. id_number")
+    args = parser.parse_args(argv)
+
+    summary = score_file(args.input, args.output, model_name=args.model, model_dir=args.model_dir,
+                         chunksize=args.chunksize, workers=args.workers, max_in_flight=args.max_in_flight,
+                         backend=args.backend, keep=args.keep)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
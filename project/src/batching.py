@@ -0,0 +1,183 @@
+# src/batching.py
+import queue
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future
+
+import pandas as pd
+
+from src.schema import SchemaError
+
+# --- Histograms ---
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+QUEUE_WAIT_MS_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100)
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative `le` buckets, Prometheus style)."""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self):
+        with self._lock:
+            cumulative, running = {}, 0
+            for bound, c in zip(self.bounds + ("+Inf",), self.counts):
+                running += c
+                cumulative[str(bound)] = running
+            return {
+                "buckets": cumulative,
+                "count": self.count,
+                "sum": self.sum,
+                "mean": (self.sum / self.count) if self.count else 0.0,
+            }
+
+
+# --- Micro-batcher ---
+class _Pending:
+    __slots__ = ("rows", "key", "future", "enqueued")
+
+    def __init__(self, rows, key):
+        self.rows = rows
+        self.key = key
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+def _as_rows(payload):
+    """Normalise a dict / list of dicts into (rows, column_key)."""
+    if isinstance(payload, dict):
+        rows = [payload]
+    elif isinstance(payload, list) and payload and all(isinstance(r, dict) for r in payload):
+        rows = payload
+    else:
+        # same message (and 400) as FeatureSchema.to_matrix gives unbatched requests
+        raise SchemaError(["input must be an object or a non-empty list of objects"])
+    key = tuple(rows[0].keys())
+    if any(tuple(r.keys()) != key for r in rows[1:]):
+        key = None  # heterogeneous rows: never mixed with other requests
+    return rows, key
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent prediction requests into one vectorized call.
+
+    A background thread takes the first queued request, then keeps collecting
+    until `max_batch_rows` rows are pending or `max_wait_ms` has elapsed since
+    that first request arrived. Requests whose rows share the same column
+    layout are stacked into a single DataFrame and passed to `predict_fn`,
+    which must return one prediction per row; each caller gets its own slice.
+    With as_frame=False `predict_fn` gets the stacked list of row dicts instead.
+    The batch runs on the batcher thread, so a caller's own CPU time misses it:
+    each future carries `cpu_seconds`, its row share of the batch's CPU time.
+    """
+
+    def __init__(self, predict_fn, max_batch_rows=256, max_wait_ms=2.0, as_frame=True):
+        self.predict_fn = predict_fn
+        self.as_frame = as_frame
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000.0
+        self.batch_rows = Histogram(BATCH_SIZE_BUCKETS)
+        self.batch_requests = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_MS_BUCKETS)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    # --- public API ---
+    def submit_async(self, payload):
+        rows, key = _as_rows(payload)
+        item = _Pending(rows, key)
+        self._queue.put(item)
+        return item.future
+
+    def submit(self, payload, timeout=None):
+        """Blocking helper: returns the list of predictions for `payload`."""
+        return self.submit_async(payload).result(timeout=timeout)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self):
+        return {
+            "max_batch_rows": self.max_batch_rows,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize(),
+            "batch_rows": self.batch_rows.snapshot(),
+            "batch_requests": self.batch_requests.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
+
+    # --- worker ---
+    def _collect(self, first):
+        batch, n_rows = [first], len(first.rows)
+        deadline = first.enqueued + self.max_wait
+        while n_rows < self.max_batch_rows:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # re-post the stop sentinel for _run
+                break
+            batch.append(item)
+            n_rows += len(item.rows)
+        return batch, n_rows
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, n_rows = self._collect(first)
+
+            started = time.perf_counter()
+            for item in batch:
+                self.queue_wait_ms.observe((started - item.enqueued) * 1000.0)
+            self.batch_rows.observe(n_rows)
+            self.batch_requests.observe(len(batch))
+
+            groups = {}
+            for item in batch:
+                # key=None requests get a group of their own
+                groups.setdefault(item.key if item.key is not None else id(item), []).append(item)
+            for items in groups.values():
+                self._execute(items)
+
+    def _execute(self, items):
+        rows = [r for item in items for r in item.rows]
+        cpu_start = time.thread_time()
+        try:
+            preds = list(self.predict_fn(pd.DataFrame(rows) if self.as_frame else rows))
+        except Exception as e:
+            if len(items) > 1:
+                # isolate the bad request instead of failing the whole batch
+                for item in items:
+                    self._execute([item])
+            else:
+                items[0].future.set_exception(e)
+            return
+        cpu = time.thread_time() - cpu_start
+        start = 0
+        for item in items:
+            stop = start + len(item.rows)
+            item.future.cpu_seconds = cpu * len(item.rows) / len(rows)
+            item.future.set_result(preds[start:stop])
+            start = stop
@@ -1,10 +1,19 @@
 import pandas as pd
 import numpy as np
 
+from src.storage import read_table, write_table, iter_table_chunks, ChunkWriter
+from src.profiling import profiled
+
 def load_raw_data(path:str) -> pd.DataFrame:
-    return pd.read_csv(path)
+    # .csv, .parquet or .feather, chosen by suffix
+    return read_table(path)
 
-def clean_loans(df:pd.DataFrame) -> pd.DataFrame:
+@profiled()
+def clean_loans(df:pd.DataFrame, interest_rate_median:float|None=None) -> pd.DataFrame:
+    """
+    interest_rate_median: fill value for missing InterestRate. Defaults to the
+    median of `df`; clean_loans_streaming passes the global median per chunk.
+    """
     #Handle missing tenure
     df['Tenure'] = df['Tenure'].fillna(0)
    
@@ -23,7 +32,7 @@ def clean_loans(df:pd.DataFrame) -> pd.DataFrame:
     df['LoanPurpose'] = df['LoanPurpose'].fillna('Unknown')
 
     #Interest rate
-    median_rate=df['InterestRate'].median()
+    median_rate = df['InterestRate'].median() if interest_rate_median is None else interest_rate_median
     df['InterestRate'] =df['InterestRate'].fillna(median_rate)
 
     # --- IsNPL (Target variable) ---
@@ -32,7 +41,47 @@ def clean_loans(df:pd.DataFrame) -> pd.DataFrame:
     return df
 
 def save_processed_data(df:pd.DataFrame, path : str):
-    df.to_csv(path, index=False)
-    
+    # .parquet/.feather keep parsed dates and dictionary-encoded categories; .csv is plain text
+    write_table(df, path)
+
+# --- Streaming (larger than RAM) ---
+def _median_from_counts(counts:pd.Series) -> float:
+    """Exact median (pandas semantics) from a value -> count table."""
+    counts = counts.sort_index()
+    n = int(counts.sum())
+    if n == 0:
+        return np.nan
+    cum = counts.cumsum().to_numpy()
+    values = counts.index.to_numpy(dtype=float)
+    lo = values[np.searchsorted(cum, (n - 1) // 2 + 1)]
+    hi = values[np.searchsorted(cum, n // 2 + 1)]
+    return (lo + hi) / 2
 
+def interest_rate_median_streaming(path:str, chunksize:int=100_000) -> float:
+    """
+    Pass one: exact global InterestRate median, reading only that column.
+    Memory grows with the number of distinct rates, not with the row count.
+    """
+    counts = pd.Series(dtype="int64")
+    for chunk in iter_table_chunks(path, chunksize=chunksize, columns=['InterestRate']):
+        vc = chunk['InterestRate'].value_counts(dropna=True)
+        counts = vc if counts.empty else counts.add(vc, fill_value=0)
+    return _median_from_counts(counts)
 
+def clean_loans_streaming(src_path:str, dst_path:str, chunksize:int=100_000) -> dict:
+    """
+    Two-pass version of clean_loans for loan books that do not fit in memory.
+    Pass one computes the global InterestRate median; pass two cleans each
+    chunk with it and appends to dst_path (.csv or .parquet). Peak memory is
+    bounded by chunksize, and the rows written match clean_loans on the
+    whole file.
+    """
+    median_rate = interest_rate_median_streaming(src_path, chunksize=chunksize)
+    rows_in = 0
+    with ChunkWriter(dst_path) as writer:
+        for chunk in iter_table_chunks(src_path, chunksize=chunksize):
+            rows_in += len(chunk)
+            writer.write(clean_loans(chunk, interest_rate_median=median_rate))
+        rows_out = writer.rows
+    return {"rows_in": rows_in, "rows_out": rows_out,
+            "interest_rate_median": float(median_rate), "output": str(dst_path)}
@@ -1,7 +1,180 @@
+# src/feature_engineering.py
+# Loan features as a registry: each feature names its input columns and a
+# vectorized NumPy kernel. Statistics a feature depends on (the Basic Salary
+# quantile behind HighSalaryFlag) are fitted once and kept with the engine, so
+# scoring a single row uses the training-time value. Derived columns can be
+# cached on disk, keyed by a hash of their inputs and the feature version.
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
-def add_loan_features(df):
-    df['DebtToIncome'] = df['LoanAmount'] / df['Basic Salary']
-    df['PrincipalPaidPct'] = (df['LoanAmount'] - df['PrincipalBalance']) / df['LoanAmount']
-    df['HighSalaryFlag'] = (df['Basic Salary'] > df['Basic Salary'].quantile(0.75)).astype(int)
-    return df
+from src.profiling import profiled
+
+# frames smaller than this are recomputed: hashing and file IO would cost more
+CACHE_MIN_ROWS = int(os.getenv("FEATURE_CACHE_MIN_ROWS", "10000"))
+
+
+def safe_divide(num, den, fill=np.nan):
+    """num / den, with `fill` where den is 0 or either side is missing."""
+    num = np.asarray(num, dtype=float)
+    den = np.asarray(den, dtype=float)
+    out = np.full(np.broadcast(num, den).shape, fill, dtype=float)
+    np.divide(num, den, out=out, where=(den != 0) & np.isfinite(den))
+    return out
+
+
+class Feature:
+    """
+    kernel(*input_arrays, **stats) -> array of len(rows).
+    fit(*input_arrays) -> dict of statistics learned from training data, or
+    None for stateless features. Bump `version` whenever the kernel or fit
+    changes meaning; cached columns of older versions are then ignored.
+    """
+
+    def __init__(self, name, inputs, kernel, fit=None, version=1):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.kernel = kernel
+        self.fit = fit
+        self.version = version
+
+
+FEATURES = {}
+
+
+def register_feature(feature):
+    FEATURES[feature.name] = feature
+    return feature
+
+
+# --- Loan features ---
+register_feature(Feature(
+    "DebtToIncome", ("LoanAmount", "Basic Salary"),
+    kernel=lambda amount, salary: safe_divide(amount, salary),
+))
+register_feature(Feature(
+    "PrincipalPaidPct", ("LoanAmount", "PrincipalBalance"),
+    kernel=lambda amount, balance: safe_divide(amount - balance, amount),
+))
+register_feature(Feature(
+    "HighSalaryFlag", ("Basic Salary",),
+    fit=lambda salary: {"q75": float(np.nanquantile(salary, 0.75))},
+    kernel=lambda salary, q75: (salary > q75).astype(int),  # NaN -> 0
+))
+
+
+# --- Engine ---
+def _column_hash(series):
+    values = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    return hashlib.sha1(values.tobytes() + str(series.dtype).encode()).hexdigest()
+
+
+class FeatureEngine:
+    """
+    Computes registered features on a frame. fit() learns the statistics
+    (stats_); transform() returns a copy of the frame with the derived
+    columns added and leaves the input untouched.
+
+    With cache_dir (default: FEATURE_CACHE_DIR env, unset = no cache), each
+    derived column of a frame with at least CACHE_MIN_ROWS rows is stored as
+    <name>-<key>.npy, where the key covers the input columns' contents, the
+    feature version and its fitted statistics. A feature is recomputed only
+    when one of those changed. The three loan kernels are cheaper than hashing
+    their inputs, so the cache pays off for costlier registered features.
+    """
+
+    def __init__(self, features=None, cache_dir=None):
+        self.features = [FEATURES[f] if isinstance(f, str) else f for f in (features or FEATURES)]
+        cache_dir = cache_dir or os.getenv("FEATURE_CACHE_DIR")
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.stats_ = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _inputs(self, df, feature):
+        missing = [c for c in feature.inputs if c not in df.columns]
+        if missing:
+            raise KeyError(f"{feature.name} needs columns {missing}")
+        return [df[c].to_numpy(dtype=float, na_value=np.nan) for c in feature.inputs]
+
+    def fit(self, df):
+        self.stats_ = {f.name: f.fit(*self._inputs(df, f)) for f in self.features if f.fit is not None}
+        return self
+
+    def _stats(self, feature):
+        if feature.fit is None:
+            return {}
+        if feature.name not in self.stats_:
+            raise RuntimeError(f"{feature.name} needs fitted statistics; call fit() on training data first")
+        return self.stats_[feature.name]
+
+    def _cache_path(self, feature, stats, hashes):
+        key = json.dumps([feature.version, stats, [hashes[c] for c in feature.inputs]], sort_keys=True)
+        return self.cache_dir / f"{feature.name}-{hashlib.sha1(key.encode()).hexdigest()[:20]}.npy"
+
+    def transform(self, df):
+        out = df.copy()
+        use_cache = self.cache_dir is not None and len(df) >= CACHE_MIN_ROWS
+        hashes = {}  # each input column is hashed once, however many features read it
+        for feature in self.features:
+            stats = self._stats(feature)
+            path = None
+            if use_cache:
+                for c in feature.inputs:
+                    if c not in hashes and c in df.columns:
+                        hashes[c] = _column_hash(df[c])
+                if all(c in hashes for c in feature.inputs):
+                    path = self._cache_path(feature, stats, hashes)
+            if path is not None and path.exists():
+                values = np.load(path)
+                self.cache_hits += 1
+            else:
+                values = feature.kernel(*self._inputs(df, feature), **stats)
+                if path is not None:
+                    self.cache_misses += 1
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+                    with open(tmp, "wb") as f:
+                        np.save(f, values)
+                    os.replace(tmp, path)  # readers never see a partial file
+            out[feature.name] = values
+        return out
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+    # --- persistence (next to the model, so scoring reuses training statistics) ---
+    def to_dict(self):
+        return {"features": {f.name: f.version for f in self.features}, "stats": self.stats_}
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return str(path)
+
+    @classmethod
+    def load(cls, path, cache_dir=None):
+        with open(path) as f:
+            d = json.load(f)
+        stale = [n for n, v in d["features"].items() if n not in FEATURES or FEATURES[n].version != v]
+        if stale:
+            raise ValueError(f"{path} was fitted with other versions of {stale}; refit the features")
+        engine = cls(list(d["features"]), cache_dir=cache_dir)
+        engine.stats_ = d["stats"]
+        return engine
+
+
+@profiled()
+def add_loan_features(df, engine=None):
+    """
+    Returns a copy of df with DebtToIncome, PrincipalPaidPct and HighSalaryFlag.
+    Pass a fitted FeatureEngine when scoring; without one, the statistics are
+    fitted on df itself (the training case).
+    """
+    if engine is None:
+        engine = FeatureEngine().fit(df)
+    return engine.transform(df)
@@ -0,0 +1,122 @@
+# src/jobs.py
+import multiprocessing
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from src import utils
+
+
+class JobQueue:
+    """
+    Runs long jobs (retraining, full analysis) on a process pool so the API
+    process keeps serving predictions while they run.
+
+    submit() returns a job id immediately. While a job with the same
+    `dedupe_key` is still queued or running, submitting again returns that
+    job's id instead of starting a duplicate.
+    """
+
+    def __init__(self, max_workers=1, max_finished=100):
+        self.max_workers = max_workers
+        self.max_finished = max_finished
+        self._pool = None
+        self._jobs = OrderedDict()   # job_id -> record
+        self._active = {}            # dedupe_key -> job_id
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        if self._pool is None:
+            # spawn: the API process has live threads (batcher, server), which fork would copy unsafely
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def submit(self, fn, *args, dedupe_key=None, on_success=None, **kwargs):
+        """Returns (job_id, created). created is False for a deduplicated submission."""
+        with self._lock:
+            if dedupe_key is not None and dedupe_key in self._active:
+                return self._active[dedupe_key], False
+            job_id = uuid.uuid4().hex
+            record = {
+                "job_id": job_id,
+                "name": getattr(fn, "__name__", str(fn)),
+                "status": "queued",
+                "submitted_at": time.time(),
+                "finished_at": None,
+                "result": None,
+                "error": None,
+            }
+            self._jobs[job_id] = record
+            if dedupe_key is not None:
+                self._active[dedupe_key] = job_id
+            future = self._executor().submit(fn, *args, **kwargs)
+            record["_future"] = future
+        future.add_done_callback(lambda f: self._finish(job_id, dedupe_key, f, on_success))
+        return job_id, True
+
+    def _finish(self, job_id, dedupe_key, future, on_success):
+        try:
+            result = future.result()
+            if on_success is not None:
+                on_success(result)
+            status, error = "succeeded", None
+        except Exception as e:
+            traceback.print_exc()
+            result, status, error = None, "failed", f"{type(e).__name__}: {e}"
+        with self._lock:
+            record = self._jobs.get(job_id)
+            if record is not None:
+                record.update(status=status, result=result, error=error, finished_at=time.time())
+                record.pop("_future", None)
+            if dedupe_key is not None and self._active.get(dedupe_key) == job_id:
+                del self._active[dedupe_key]
+            self._trim()
+
+    def _trim(self):
+        finished = [j for j, r in self._jobs.items() if r["finished_at"] is not None]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def status(self, job_id):
+        """Public view of a job (without its result), or None for unknown ids."""
+        with self._lock:
+            record = self._jobs.get(job_id)
+            if record is None:
+                return None
+            view = {k: v for k, v in record.items() if not k.startswith("_") and k != "result"}
+            future = record.get("_future")
+            if future is not None and future.running():
+                view["status"] = "running"
+            return view
+
+    def result(self, job_id):
+        with self._lock:
+            record = self._jobs.get(job_id)
+            return None if record is None else record["result"]
+
+    def shutdown(self, wait=True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+# --- Full analysis job ---
+ANALYSIS_JOBS = JobQueue(max_workers=1)
+
+
+def _swap_in_model(summary):
+    # Runs in the API process once the worker has written the new model file.
+    utils.refresh_model()
+
+
+def submit_full_analysis(force_retrain=False):
+    """Queue run_full_analysis on the worker process. Returns (job_id, created)."""
+    return ANALYSIS_JOBS.submit(
+        utils.run_full_analysis,
+        force_retrain=force_retrain,
+        dedupe_key=("run_full_analysis", bool(force_retrain)),
+        on_success=_swap_in_model,
+    )
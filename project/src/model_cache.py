@@ -0,0 +1,78 @@
+# src/model_cache.py
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+class ModelCache:
+    """
+    Process-wide LRU cache of deserialized models.
+
+    Entries are keyed by resolved file path and validated against the file's
+    (mtime_ns, size) signature, so a model file replaced on disk is reloaded
+    on the next lookup even without an explicit invalidate().
+    """
+
+    def __init__(self, maxsize=4):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # path -> (signature, model)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _signature(path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def get(self, path, loader):
+        """Return the model at `path`, calling `loader(path)` only on a miss."""
+        path = str(Path(path).resolve())
+        sig = self._signature(path)  # raises FileNotFoundError for missing files
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == sig:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            model = loader(path)
+            self._put(path, sig, model)
+            return model
+
+    def put(self, path, model):
+        """Install an already-loaded model for `path` (e.g. right after saving it)."""
+        path = str(Path(path).resolve())
+        sig = self._signature(path)
+        with self._lock:
+            self._put(path, sig, model)
+
+    def _put(self, path, sig, model):
+        self._entries[path] = (sig, model)
+        self._entries.move_to_end(path)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, path=None):
+        """Drop one cached path, or everything when `path` is None."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(Path(path).resolve()), None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "models": list(self._entries.keys()),
+            }
@@ -1,14 +1,22 @@
 # src/modeling.py
+import copy
 import os
 import re
+import time
 import numpy as np
 import pandas as pd
 
 from dotenv import load_dotenv
 
+from src.storage import read_table
+from src.outliers import IQRWinsorizer
+
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.base import clone
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, StandardScaler
 from sklearn.linear_model import LinearRegression, RidgeCV, LassoCV
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
@@ -25,7 +33,8 @@ def load_features(path_env_key="FEATURES_DATA_CSV",
                   parse_dates=("LoanDate","DisbursementDate","LastPaymentDate","RetirementDate")):
     path = os.getenv(path_env_key, default_path)
     parse = [c for c in (parse_dates or []) if isinstance(c, str)]
-    df = pd.read_csv(path, parse_dates=[c for c in parse if c in pd.read_csv(path, nrows=0).columns])
+    # single pass; Parquet/Feather feature files come back with dates already typed
+    df = read_table(path, parse_dates=parse)
     return df
 
 # ---------- Feature typing ----------
@@ -63,29 +72,96 @@ def time_aware_split(df, date_col="LoanDate", test_size=0.2, random_state=42):
         train_df, test_df = train_test_split(df, test_size=test_size, random_state=random_state)
     return train_df, test_df
 
+def _time_order(df, date_col):
+    """Row positions in date order (stable, NaT last); row order when there is no usable date."""
+    if date_col in df.columns and df[date_col].notna().any():
+        return pd.Series(df[date_col].to_numpy()).sort_values(kind="stable").index.to_numpy()
+    return np.arange(len(df))
+
+def walk_forward_splits(df, date_col="LoanDate", n_splits=5, test_size=None, window="expanding",
+                        max_train_size=None, gap=0):
+    """
+    Walk-forward folds over df sorted once by date_col. Returns (order, folds):
+    `order` holds row positions in date order and each fold is a
+    (train, test) pair of slices into it, so fold rows are df.iloc[order[train]]
+    and nothing is copied until a fold is used. The last n_splits blocks of
+    test_size rows are the test windows; each trains on the rows before it,
+    minus `gap` rows. window="rolling" keeps only the latest max_train_size
+    training rows (default: the first fold's training size).
+    """
+    if window not in ("expanding", "rolling"):
+        raise ValueError("window must be 'expanding' or 'rolling'")
+    order = _time_order(df, date_col)
+    n = len(order)
+    test_size = test_size or n // (n_splits + 1)
+    first_test = n - n_splits * test_size
+    if test_size < 1 or first_test - gap < 1:
+        raise ValueError(f"{n} rows are too few for {n_splits} folds of {test_size} test rows with gap={gap}")
+    if window == "rolling" and max_train_size is None:
+        max_train_size = first_test - gap
+
+    folds = []
+    for k in range(n_splits):
+        test_start = first_test + k * test_size
+        train_stop = test_start - gap
+        train_start = max(0, train_stop - max_train_size) if max_train_size else 0
+        folds.append((slice(train_start, train_stop), slice(test_start, test_start + test_size)))
+    return order, folds
+
 # ---------- Pipelines ----------
-def make_preprocessor(numeric_cols, categorical_cols):
+def _rows_as_tokens(X):
+    """'column=value' strings per row, the input FeatureHasher expects."""
+    X = pd.DataFrame(X)
+    token_cols = [(str(c) + "=" + X[c].astype(str)).tolist() for c in X.columns]
+    return list(zip(*token_cols))
+
+def make_preprocessor(numeric_cols, categorical_cols, sparse=False, min_frequency=None,
+                      max_categories=None, hashing_n_features=None):
+    """
+    sparse=True keeps the design matrix CSR end to end: one-hot output stays
+    sparse and numeric columns are scaled without centering (centering would
+    densify). min_frequency / max_categories bucket rare levels into one
+    "infrequent" column; hashing_n_features replaces one-hot with a
+    FeatureHasher of fixed width (no vocabulary kept, unseen levels hash too).
+    """
     numeric_pipe = Pipeline(steps=[
-        ("scaler", StandardScaler())
-    ])
-    cat_pipe = Pipeline(steps=[
-        ("ohe", OneHotEncoder(handle_unknown="ignore", sparse_output=False))
+        ("scaler", StandardScaler(with_mean=not sparse))
     ])
+    if hashing_n_features:
+        cat_pipe = Pipeline(steps=[
+            ("tokens", FunctionTransformer(_rows_as_tokens)),
+            ("hash", FeatureHasher(n_features=hashing_n_features, input_type="string", alternate_sign=False))
+        ])
+    else:
+        bucketed = min_frequency is not None or max_categories is not None
+        cat_pipe = Pipeline(steps=[
+            ("ohe", OneHotEncoder(handle_unknown="infrequent_if_exist" if bucketed else "ignore",
+                                  sparse_output=sparse, min_frequency=min_frequency,
+                                  max_categories=max_categories))
+        ])
     pre = ColumnTransformer(
         transformers=[
             ("num", numeric_pipe, numeric_cols),
             ("cat", cat_pipe, categorical_cols)
         ],
-        remainder="drop"
+        remainder="drop",
+        # sparse: always CSR; dense: hashed output is densified like one-hot
+        sparse_threshold=1.0 if sparse else 0.0
     )
     return pre
 
-def make_model_pipeline(model, numeric_cols, categorical_cols):
-    pre = make_preprocessor(numeric_cols, categorical_cols)
-    pipe = Pipeline(steps=[
-        ("pre", pre),
-        ("model", model)
-    ])
+def make_model_pipeline(model, numeric_cols, categorical_cols, winsorize_k=None, **pre_kwargs):
+    """
+    winsorize_k: if set, numeric columns are clipped to IQR bounds learned at
+    fit time (IQRWinsorizer) before preprocessing; the bounds travel with the
+    pipeline, so serving applies the training-time caps.
+    pre_kwargs are passed to make_preprocessor (sparse, min_frequency, ...).
+    """
+    pre = make_preprocessor(numeric_cols, categorical_cols, **pre_kwargs)
+    steps = [("pre", pre), ("model", model)]
+    if winsorize_k is not None:
+        steps.insert(0, ("winsor", IQRWinsorizer(cols=list(numeric_cols), k=winsorize_k)))
+    pipe = Pipeline(steps=steps)
     return pipe
 
 # ---------- Train/Eval ----------
@@ -99,28 +175,144 @@ def eval_regression(y_true, y_pred):
     rmse = np.sqrt(mse)                        # compute RMSE manually
     r2 = r2_score(y_true, y_pred)
     return {"MAE": mae, "RMSE": rmse, "R2": r2}
-def fit_and_report(model_name, model, X_train, y_train, X_test, y_test, num_cols, cat_cols):
-    pipe = make_model_pipeline(model, num_cols, cat_cols)
+def fit_and_report(model_name, model, X_train, y_train, X_test, y_test, num_cols, cat_cols, **pre_kwargs):
+    pipe = make_model_pipeline(model, num_cols, cat_cols, **pre_kwargs)
     pipe.fit(X_train, y_train)
     yhat = pipe.predict(X_test)
     metrics = eval_regression(y_test, yhat)
     return model_name, pipe, metrics, yhat
 
-def try_baselines(X_train, y_train, X_test, y_test, num_cols, cat_cols):
+def _pool_clone(model, parallel):
+    """
+    Unfitted copy of model for a pool job. With a parallel pool, every n_jobs
+    parameter (nested ones too) is set to 1: the jobs already share the cores,
+    and a forest using all of them in each job would oversubscribe.
+    """
+    model = clone(model)
+    if parallel:
+        inner = {k: 1 for k in model.get_params() if k == "n_jobs" or k.endswith("__n_jobs")}
+        model.set_params(**inner)
+    return model
+
+def _fit_candidate(name, model, Xt_train, y_train, Xt_test):
+    # Runs in a worker process; Xt_* arrive memory-mapped, not pickled.
+    t0 = time.perf_counter()
+    model.fit(Xt_train, y_train)
+    fit_seconds = time.perf_counter() - t0
+    return name, model, model.predict(Xt_test), fit_seconds
+
+def try_baselines(X_train, y_train, X_test, y_test, num_cols, cat_cols, n_jobs=-1, **pre_kwargs):
+    """
+    Fits the baseline candidates on a shared, once-fitted preprocessor.
+    The transformed matrices are built once and handed to a joblib process
+    pool, which memory-maps arrays above 1 MB instead of pickling them to
+    every worker. Returns (metrics_df, fitted) as before; metrics_df also
+    has per-candidate fit_seconds, and
+    metrics_df.attrs["preprocess_seconds"] holds the shared transform time.
+    pre_kwargs go to make_preprocessor (e.g. sparse=True, min_frequency=20).
+    """
     candidates = {
         "Linear": LinearRegression(),
         "RidgeCV": RidgeCV(alphas=[0.1, 1.0, 10.0]),
         "LassoCV": LassoCV(alphas=[0.001, 0.01, 0.1, 1.0], max_iter=5000, random_state=42),
         "RandomForest": RandomForestRegressor(n_estimators=250, random_state=42, n_jobs=-1)
     }
+    t0 = time.perf_counter()
+    pre = make_preprocessor(num_cols, cat_cols, **pre_kwargs)
+    Xt_train = pre.fit_transform(X_train, y_train)
+    Xt_test = pre.transform(X_test)
+    preprocess_seconds = time.perf_counter() - t0
+
+    y_fit = np.asarray(y_train)
+    parallel = effective_n_jobs(n_jobs) > 1
+    results = Parallel(n_jobs=n_jobs, max_nbytes="1M", mmap_mode="r")(
+        delayed(_fit_candidate)(name, _pool_clone(mdl, parallel), Xt_train, y_fit, Xt_test)
+        for name, mdl in candidates.items()
+    )
+
     rows, fitted = [], {}
-    for name, mdl in candidates.items():
-        name, pipe, m, yhat = fit_and_report(name, mdl, X_train, y_train, X_test, y_test, num_cols, cat_cols)
-        rows.append({"model": name, **m})
+    for name, model, yhat, fit_seconds in results:
+        # own copy each: refitting one returned pipeline must not change the others
+        pipe = Pipeline(steps=[("pre", copy.deepcopy(pre)), ("model", model)])
+        m = eval_regression(y_test, yhat)
+        rows.append({"model": name, **m, "fit_seconds": fit_seconds})
         fitted[name] = (pipe, yhat)
     metrics_df = pd.DataFrame(rows).sort_values("RMSE")
+    metrics_df.attrs["preprocess_seconds"] = preprocess_seconds
     return metrics_df, fitted
 
+def _fit_fold(name, fold, model, Xt, y, train, test):
+    # Xt/y cover the fold's rows (train and test are slices into them); in
+    # "prefix" mode they are the whole sorted frame, memory-mapped once for every fold.
+    t0 = time.perf_counter()
+    model.fit(Xt[train], y[train])
+    fit_seconds = time.perf_counter() - t0
+    return name, fold, model.predict(Xt[test]), fit_seconds
+
+def walk_forward_cv(models, df, target, num_cols, cat_cols, date_col="LoanDate", n_splits=5,
+                    test_size=None, window="expanding", max_train_size=None, gap=0,
+                    preprocess="fold", n_jobs=-1, **pre_kwargs):
+    """
+    Time-series cross-validation on walk_forward_splits() folds. `models` is
+    an estimator or a dict of name -> estimator; every (model, fold) fit runs
+    on a joblib process pool. Returns one row per model and fold with the
+    eval_regression metrics (MAE, RMSE, R2) plus fold sizes, test window dates
+    and fit_seconds; metrics_df.attrs["preprocess_seconds"] holds the total
+    preprocessing time.
+
+    preprocess="fold" fits the preprocessor on each fold's training rows,
+    once per fold for all models. preprocess="prefix" fits it once on the
+    first fold's training rows, which precede every test window, and
+    transforms the sorted frame a single time; folds then slice that matrix.
+    pre_kwargs go to make_preprocessor.
+    """
+    if preprocess not in ("fold", "prefix"):
+        raise ValueError("preprocess must be 'fold' or 'prefix'")
+    if not isinstance(models, dict):
+        models = {type(models).__name__: models}
+    order, folds = walk_forward_splits(df, date_col=date_col, n_splits=n_splits, test_size=test_size,
+                                       window=window, max_train_size=max_train_size, gap=gap)
+    X = df[list(num_cols) + list(cat_cols)]
+    y = np.asarray(df[target])[order]
+    dates = df[date_col].to_numpy()[order] if date_col in df.columns else None
+
+    t0 = time.perf_counter()
+    fold_data = []
+    if preprocess == "prefix":
+        first_train = folds[0][0]
+        pre = make_preprocessor(num_cols, cat_cols, **pre_kwargs)
+        pre.fit(X.iloc[order[first_train]], y[first_train])
+        Xt = pre.transform(X.iloc[order])
+        fold_data = [(Xt, y, train, test) for train, test in folds]
+    else:
+        for train, test in folds:
+            # train and test are contiguous in `order` (apart from the gap): transform them in one call
+            a = train.start
+            pre = make_preprocessor(num_cols, cat_cols, **pre_kwargs)
+            pre.fit(X.iloc[order[train]], y[train])
+            Xt_k = pre.transform(X.iloc[order[a:test.stop]])
+            fold_data.append((Xt_k, y[a:test.stop], slice(0, train.stop - a), slice(test.start - a, test.stop - a)))
+    preprocess_seconds = time.perf_counter() - t0
+
+    parallel = effective_n_jobs(n_jobs) > 1
+    results = Parallel(n_jobs=n_jobs, max_nbytes="1M", mmap_mode="r")(
+        delayed(_fit_fold)(name, k, _pool_clone(mdl, parallel), Xt_k, y_k, train, test)
+        for k, (Xt_k, y_k, train, test) in enumerate(fold_data)
+        for name, mdl in models.items()
+    )
+
+    rows = []
+    for name, k, yhat, fit_seconds in results:
+        train, test = folds[k]
+        row = {"model": name, "fold": k, "n_train": train.stop - train.start, "n_test": test.stop - test.start}
+        if dates is not None:
+            row.update(test_from=dates[test.start], test_to=dates[test.stop - 1])
+        row.update(eval_regression(y[test], yhat), fit_seconds=fit_seconds)
+        rows.append(row)
+    metrics_df = pd.DataFrame(rows).sort_values(["model", "fold"], ignore_index=True)
+    metrics_df.attrs["preprocess_seconds"] = preprocess_seconds
+    return metrics_df
+
 # ---------- Diagnostics ----------
 def residual_plots(y_true, y_pred, title_prefix=""):
     resid = y_true - y_pred
@@ -149,9 +341,12 @@ def linear_coeff_table(fitted_pipe):
 
     # Get feature names back from ColumnTransformer
     num_names = pre.transformers_[0][2]
-    ohe = pre.transformers_[1][1].named_steps["ohe"]
+    cat_pipe = pre.transformers_[1][1]
     cat_original = pre.transformers_[1][2]
-    cat_names = list(ohe.get_feature_names_out(cat_original))
+    if "hash" in cat_pipe.named_steps:
+        cat_names = [f"hash_{i}" for i in range(cat_pipe.named_steps["hash"].n_features)]
+    else:
+        cat_names = list(cat_pipe.named_steps["ohe"].get_feature_names_out(cat_original))
 
     feat_names = list(num_names) + cat_names
 
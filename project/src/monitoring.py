@@ -0,0 +1,354 @@
+# src/monitoring.py
+# Monitoring metrics for the dashboard (homework14): freshness, input null
+# rate, schema hash, rolling MAE, p95 latency and error rate.
+#
+# Each process (API worker, batch-scoring worker) keeps fixed-size streaming
+# aggregators in memory and every few seconds writes them to one SQLite file:
+#   events      raw events, capped at MONITORING_MAX_EVENTS rows (oldest dropped)
+#   states      each process' aggregator state (small JSON, merged on flush)
+#   aggregates  one row per dashboard metric, recomputed on flush
+# so the dashboard reads a handful of rows and never scans the event log.
+#
+# Set MONITORING_DB (e.g. reports/monitoring.sqlite) to enable; unset, every
+# record_* call is a no-op.
+import atexit
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+
+import numpy as np
+
+WINDOW_SECONDS = float(os.getenv("MONITORING_WINDOW_S", "3600"))
+FLUSH_SECONDS = float(os.getenv("MONITORING_FLUSH_S", "5"))
+MAX_EVENTS = int(os.getenv("MONITORING_MAX_EVENTS", "100000"))
+N_BUCKETS = 12  # time buckets per window: data ages out in steps of window / 12
+
+
+# --- Streaming aggregators (fixed memory) ---
+class RollingSum:
+    """Sum and count of values over the last `window_s` seconds, in a ring of time buckets."""
+
+    def __init__(self, window_s=WINDOW_SECONDS, n_buckets=N_BUCKETS):
+        self.width = window_s / n_buckets
+        self.epochs = np.full(n_buckets, -1, dtype=np.int64)
+        self.sums = np.zeros(n_buckets)
+        self.counts = np.zeros(n_buckets)
+
+    def _slot(self, now):
+        epoch = int(now // self.width)
+        i = epoch % len(self.epochs)
+        if self.epochs[i] != epoch:  # bucket last used a full window ago: reuse it
+            self.epochs[i] = epoch
+            self._clear(i)
+        return i
+
+    def _clear(self, i):
+        self.sums[i] = 0.0
+        self.counts[i] = 0.0
+
+    def _live(self, now):
+        return self.epochs > int(now // self.width) - len(self.epochs)
+
+    def add(self, value, count=1, now=None):
+        i = self._slot(time.time() if now is None else now)
+        self.sums[i] += value
+        self.counts[i] += count
+
+    def totals(self, now=None):
+        live = self._live(time.time() if now is None else now)
+        return float(self.sums[live].sum()), float(self.counts[live].sum())
+
+    def mean(self, now=None):
+        total, count = self.totals(now)
+        return total / count if count else None
+
+    def merge(self, other):
+        """Add another ring of the same geometry; where buckets disagree, the newer one wins."""
+        for i in range(len(self.epochs)):
+            if other.epochs[i] == self.epochs[i]:
+                self._add_bucket(i, other, i)
+            elif other.epochs[i] > self.epochs[i]:
+                self.epochs[i] = other.epochs[i]
+                self._clear(i)
+                self._add_bucket(i, other, i)
+        return self
+
+    def _add_bucket(self, i, other, j):
+        self.sums[i] += other.sums[j]
+        self.counts[i] += other.counts[j]
+
+    def to_state(self):
+        return {"width": self.width, "epochs": self.epochs.tolist(), "sums": self.sums.tolist(),
+                "counts": self.counts.tolist()}
+
+    @classmethod
+    def from_state(cls, d):
+        obj = cls.__new__(cls)
+        obj.width = d["width"]
+        obj.epochs = np.asarray(d["epochs"], dtype=np.int64)
+        obj.sums = np.asarray(d["sums"], dtype=float)
+        obj.counts = np.asarray(d["counts"], dtype=float)
+        return obj
+
+
+class RollingHistogram(RollingSum):
+    """
+    HDR-style latency histogram over a rolling window: log-linear bins with
+    SUB_BINS per power of two above MIN_MS (about 3% relative error), so
+    percentiles cost O(bins) however many values were recorded.
+    """
+    MIN_MS = 0.01
+    SUB_BINS = 32
+    N_OCTAVES = 25  # 0.01 ms .. ~5.6 min; larger values land in the last bin
+
+    def __init__(self, window_s=WINDOW_SECONDS, n_buckets=N_BUCKETS):
+        super().__init__(window_s, n_buckets)
+        self.bins = np.zeros((n_buckets, self.N_OCTAVES * self.SUB_BINS), dtype=np.int64)
+
+    def _clear(self, i):
+        super()._clear(i)
+        self.bins[i] = 0
+
+    def _add_bucket(self, i, other, j):
+        super()._add_bucket(i, other, j)
+        self.bins[i] += other.bins[j]
+
+    @classmethod
+    def _bin(cls, ms):
+        r = max(ms, cls.MIN_MS) / cls.MIN_MS
+        octave = int(np.log2(r))
+        sub = int((r / 2.0 ** octave - 1.0) * cls.SUB_BINS)
+        return min(octave * cls.SUB_BINS + sub, cls.N_OCTAVES * cls.SUB_BINS - 1)
+
+    @classmethod
+    def _bin_value(cls, b):
+        octave, sub = divmod(b, cls.SUB_BINS)
+        return cls.MIN_MS * 2.0 ** octave * (1.0 + (sub + 0.5) / cls.SUB_BINS)  # bin midpoint
+
+    def add(self, ms, count=1, now=None):
+        i = self._slot(time.time() if now is None else now)
+        self.sums[i] += ms * count
+        self.counts[i] += count
+        self.bins[i, self._bin(ms)] += count
+
+    def percentile(self, q, now=None):
+        counts = self.bins[self._live(time.time() if now is None else now)].sum(axis=0)
+        total = counts.sum()
+        if total == 0:
+            return None
+        b = int(np.searchsorted(np.cumsum(counts), q / 100.0 * total))
+        return self._bin_value(b)
+
+    def to_state(self):
+        # sparse: only the non-empty bins of each bucket
+        state = super().to_state()
+        state["bins"] = [{str(b): int(c) for b, c in zip(np.flatnonzero(row), row[row > 0])} for row in self.bins]
+        return state
+
+    @classmethod
+    def from_state(cls, d):
+        obj = super().from_state(d)
+        obj.bins = np.zeros((len(obj.epochs), cls.N_OCTAVES * cls.SUB_BINS), dtype=np.int64)
+        for i, row in enumerate(d["bins"]):
+            for b, c in row.items():
+                obj.bins[i, int(b)] = c
+        return obj
+
+
+def schema_hash(names):
+    """Short, stable hash of the ordered feature names."""
+    return hashlib.sha1("\x1f".join(map(str, names)).encode()).hexdigest()[:12]
+
+
+# --- Store ---
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY, ts REAL, source TEXT, kind TEXT, value REAL, ok INTEGER);
+CREATE TABLE IF NOT EXISTS states (source TEXT PRIMARY KEY, state TEXT, updated_at REAL);
+CREATE TABLE IF NOT EXISTS aggregates (metric TEXT PRIMARY KEY, value REAL, text TEXT, updated_at REAL);
+"""
+AGGREGATORS = {"latency_ms": RollingHistogram, "errors": RollingSum, "null_rate": RollingSum, "abs_error": RollingSum}
+
+
+def _connect(db_path):
+    con = sqlite3.connect(str(db_path), timeout=10)
+    con.execute("PRAGMA journal_mode=WAL")  # the dashboard reads while workers write
+    con.executescript(_SCHEMA)
+    return con
+
+
+class Monitor:
+    """
+    In-process aggregators plus a buffered event log. record_* calls only
+    touch memory; a background thread calls flush() every flush_s seconds,
+    which writes this process' events and state and recomputes the aggregates
+    table, so request threads never wait on SQLite. flush_s=0 starts no thread:
+    flushing is then left to explicit flush() calls. close() stops the thread
+    after a last flush.
+    """
+
+    def __init__(self, db_path, source=None, window_s=WINDOW_SECONDS, max_events=MAX_EVENTS, flush_s=FLUSH_SECONDS):
+        self.db_path = str(db_path)
+        self.source = source or f"{socket.gethostname()}:{os.getpid()}"
+        self.window_s = window_s
+        self.max_events = max_events
+        self.flush_s = flush_s
+        self.aggregators = {name: cls(window_s) for name, cls in AGGREGATORS.items()}
+        self._events = []
+        self._gauges = {}  # metric -> (value, text)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # one writer at a time; held across the SQLite work
+        self._last_flush = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+        if flush_s > 0:
+            self._thread = threading.Thread(target=self._run, name="monitoring-flush", daemon=True)
+            self._thread.start()
+
+    # --- recording ---
+    def record_request(self, latency_ms, ok=True):
+        now = time.time()
+        with self._lock:
+            self.aggregators["latency_ms"].add(latency_ms, now=now)
+            self.aggregators["errors"].add(0.0 if ok else 1.0, now=now)
+            self._events.append((now, self.source, "request", float(latency_ms), int(ok)))
+
+    def record_input(self, X, feature_names=None):
+        """Null rate of a scored batch (float matrix) and the hash of its feature names."""
+        X = np.asarray(X, dtype=float)
+        nulls = float(np.isnan(X).sum())
+        now = time.time()
+        with self._lock:
+            self.aggregators["null_rate"].add(nulls, count=max(X.size, 1), now=now)
+            if feature_names is not None:
+                self._gauges["schema_hash"] = (float(len(feature_names)), schema_hash(feature_names))
+            self._events.append((now, self.source, "input", nulls / max(X.size, 1), 1))
+
+    def record_outcomes(self, y_true, y_pred):
+        """Absolute errors for rows whose actual value is known (rolling MAE)."""
+        err = np.abs(np.asarray(y_true, dtype=float) - np.asarray(y_pred, dtype=float))
+        err = err[~np.isnan(err)]
+        now = time.time()
+        with self._lock:
+            self.aggregators["abs_error"].add(float(err.sum()), count=len(err), now=now)
+            self._events.append((now, self.source, "outcomes", float(err.mean()) if len(err) else None, 1))
+
+    def record_data_timestamp(self, ts):
+        """Unix time of the newest data the system has seen (e.g. a data file's mtime)."""
+        with self._lock:
+            current = self._gauges.get("last_data_ts", (0.0, None))[0]
+            self._gauges["last_data_ts"] = (max(current, float(ts)), None)
+
+    # --- persistence ---
+    def _run(self):
+        while not self._stop.wait(self.flush_s):
+            try:
+                self.flush()
+            except Exception:  # e.g. the database is locked; keep the events for the next round
+                traceback.print_exc()
+
+    def close(self):
+        """Stop the background thread and write whatever is still buffered."""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        return self.flush(force=True)
+
+    def flush(self, force=False):
+        """Write buffered events and state; without force, only if flush_s has passed since the last write."""
+        with self._flush_lock:
+            with self._lock:
+                if not force and time.monotonic() - self._last_flush < self.flush_s:
+                    return False
+                self._last_flush = time.monotonic()
+                events, self._events = self._events, []
+                gauges = dict(self._gauges)
+                state = json.dumps({k: a.to_state() for k, a in self.aggregators.items()})
+            now = time.time()
+            try:
+                con = _connect(self.db_path)
+                try:
+                    with con:  # one transaction
+                        if events:
+                            con.executemany("INSERT INTO events (ts, source, kind, value, ok) VALUES (?, ?, ?, ?, ?)",
+                                            events)
+                            con.execute("DELETE FROM events WHERE id <= (SELECT MAX(id) FROM events) - ?",
+                                        (self.max_events,))
+                        con.execute("INSERT OR REPLACE INTO states VALUES (?, ?, ?)", (self.source, state, now))
+                        # states of processes that stopped reporting a window ago hold only expired buckets
+                        con.execute("DELETE FROM states WHERE updated_at < ?", (now - self.window_s,))
+                        states = [json.loads(s) for (s,) in con.execute("SELECT state FROM states")]
+                        self._write_aggregates(con, states, gauges, now)
+                finally:
+                    con.close()
+            except Exception:
+                with self._lock:  # put the events back in front of anything recorded since (capped)
+                    self._events[:0] = events
+                    del self._events[:-self.max_events]
+                raise
+        return True
+
+    def _write_aggregates(self, con, states, gauges, now):
+        merged = {name: cls(self.window_s) for name, cls in AGGREGATORS.items()}
+        for state in states:
+            for name, agg in merged.items():
+                if name in state:
+                    agg.merge(AGGREGATORS[name].from_state(state[name]))
+        _, requests = merged["errors"].totals(now)
+        rows = [
+            ("requests", requests, None),
+            ("error_rate", merged["errors"].mean(now), None),
+            ("p95_latency_ms", merged["latency_ms"].percentile(95, now), None),
+            ("p50_latency_ms", merged["latency_ms"].percentile(50, now), None),
+            ("null_rate", merged["null_rate"].mean(now), None),
+            ("rolling_mae", merged["abs_error"].mean(now), None),
+        ]
+        con.executemany("INSERT OR REPLACE INTO aggregates VALUES (?, ?, ?, ?)",
+                        [(m, v, t, now) for m, v, t in rows])
+        if "schema_hash" in gauges:
+            value, text = gauges["schema_hash"]
+            con.execute("INSERT OR REPLACE INTO aggregates VALUES ('schema_hash', ?, ?, ?)", (value, text, now))
+        if "last_data_ts" in gauges:
+            # newest across processes: keep the larger of the stored and our own value
+            con.execute("INSERT INTO aggregates VALUES ('last_data_ts', ?, NULL, ?) ON CONFLICT(metric) DO UPDATE "
+                        "SET value = MAX(value, excluded.value), updated_at = excluded.updated_at",
+                        (gauges["last_data_ts"][0], now))
+
+
+class _Disabled:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+_MONITOR = None
+_MONITOR_PID = None
+
+
+def get_monitor():
+    """This process' Monitor (created on first use), or a no-op stand-in when MONITORING_DB is unset."""
+    global _MONITOR, _MONITOR_PID
+    db_path = os.getenv("MONITORING_DB")
+    if not db_path:
+        return _Disabled()
+    if _MONITOR is None or _MONITOR_PID != os.getpid() or _MONITOR.db_path != db_path:
+        _MONITOR, _MONITOR_PID = Monitor(db_path), os.getpid()
+        atexit.register(_MONITOR.close)
+    return _MONITOR
+
+
+def read_aggregates(db_path, now=None):
+    """Dashboard metrics: one row per metric from the aggregates table, plus freshness_minutes."""
+    con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = con.execute("SELECT metric, value, text, updated_at FROM aggregates").fetchall()
+    finally:
+        con.close()
+    out = {m: (t if t is not None else v) for m, v, t, _ in rows}
+    out["updated_at"] = max((u for *_, u in rows), default=None)
+    if out.get("last_data_ts") is not None:
+        out["freshness_minutes"] = ((time.time() if now is None else now) - out["last_data_ts"]) / 60.0
+    return out
@@ -2,8 +2,14 @@
 import numpy as np
 import pandas as pd
 from typing import List, Tuple
+from sklearn.base import BaseEstimator, OneToOneFeatureMixin, TransformerMixin
+from sklearn.utils.validation import check_is_fitted
 
-NUMERIC_DTYPES = ["int16","int32","int64","float16","float32","float64"]
+from src.profiling import profiled
+
+# includes narrow ints: those storage.optimize_dtypes() produces and 8-bit ones from callers
+NUMERIC_DTYPES = ["int8","int16","int32","int64","uint8","uint16","uint32","float16","float32","float64"]
+ENGINES = ("numpy", "pandas")
 
 def _numeric_cols(df: pd.DataFrame, include: List[str] | None = None,
                   exclude: List[str] | None = None) -> List[str]:
@@ -11,24 +17,123 @@ def _numeric_cols(df: pd.DataFrame, include: List[str] | None = None,
     exclude = exclude or []
     return [c for c in cols if c not in exclude]
 
+def _check_engine(engine: str) -> None:
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {ENGINES}, got {engine!r}")
+
 def iqr_bounds(s: pd.Series, k: float = 1.5) -> Tuple[float, float]:
     s = pd.to_numeric(s, errors="coerce")
     q1, q3 = s.quantile(0.25), s.quantile(0.75)
     iqr = q3 - q1
     return q1 - k * iqr, q3 + k * iqr
 
+# ---------- Vectorized engine ----------
+def _numeric_matrix(df: pd.DataFrame, cols: List[str]) -> np.ndarray:
+    """(n_rows, n_cols) float64 matrix, column-major so each column is contiguous.
+    Non-numeric columns are coerced like pd.to_numeric(errors="coerce")."""
+    M = np.empty((len(df), len(cols)), dtype=np.float64, order="F")
+    for j, c in enumerate(cols):
+        s = df[c]
+        if not pd.api.types.is_numeric_dtype(s):
+            s = pd.to_numeric(s, errors="coerce")
+        M[:, j] = s.to_numpy(dtype=np.float64, na_value=np.nan)
+    return M
+
+def _lerp(a: np.ndarray, b: np.ndarray, t: np.ndarray) -> np.ndarray:
+    # numpy's "linear" quantile interpolation, so bounds match Series.quantile
+    diff = b - a
+    return np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+
+def _block_quantiles(B: np.ndarray, qs) -> np.ndarray:
+    """
+    Quantiles of every column of B (NaN-free, Fortran order). B is reordered
+    in place: each needed order statistic costs one single-kth partition of
+    the part of B not yet fixed, which is much cheaper than a full sort or a
+    multi-kth np.quantile.
+    """
+    m = B.shape[0]
+    h = np.asarray(qs, dtype=np.float64) * (m - 1)
+    lo_idx = np.floor(h).astype(np.int64)
+    hi_idx = np.minimum(lo_idx + 1, m - 1)
+    stats, start = {}, 0
+    for k in sorted(set(lo_idx.tolist()) | set(hi_idx.tolist())):
+        sub = B[start:]
+        sub.partition(k - start, axis=0)
+        stats[k] = sub[k - start].copy()
+        start = k + 1
+    lows = np.stack([stats[k] for k in lo_idx])
+    highs = np.stack([stats[k] for k in hi_idx])
+    return _lerp(lows, highs, (h - lo_idx)[:, None])
+
+def iqr_bounds_matrix(M: np.ndarray, k: float = 1.5) -> Tuple[np.ndarray, np.ndarray]:
+    """Lower/upper IQR bounds for every column of M (NaNs skipped, M left untouched)."""
+    n_rows, n_cols = M.shape
+    q = np.full((2, n_cols), np.nan)
+    nan_cols = np.isnan(M).any(axis=0)
+    dense = np.flatnonzero(~nan_cols)
+    if n_rows and dense.size:
+        # NaN-free columns: all of them in one set of partition calls
+        q[:, dense] = _block_quantiles(np.asfortranarray(M[:, dense]), [0.25, 0.75])
+    for j in np.flatnonzero(nan_cols):
+        col = M[:, j]
+        col = col[~np.isnan(col)]
+        if col.size:
+            q[:, j] = _block_quantiles(col[:, None], [0.25, 0.75])[:, 0]
+    q1, q3 = q
+    iqr = q3 - q1
+    return q1 - k * iqr, q3 + k * iqr
+
+def sketch_bounds(sketches, cols: List[str], k: float = 1.5) -> Tuple[np.ndarray, np.ndarray]:
+    """IQR bounds from per-column QuantileSketch objects (see src/sketches.py)."""
+    missing = [c for c in cols if c not in sketches]
+    if missing:
+        raise KeyError(f"No sketch for columns: {missing}")
+    q1 = np.array([sketches[c].quantile(0.25) for c in cols], dtype=np.float64)
+    q3 = np.array([sketches[c].quantile(0.75) for c in cols], dtype=np.float64)
+    iqr = q3 - q1
+    return q1 - k * iqr, q3 + k * iqr
+
+def _outlier_matrix(M: np.ndarray, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+    # one broadcast comparison over all columns; NaN compares False
+    return (M < low) | (M > high)
+
+def _summary_table(cols, low, high, counts, n_rows) -> pd.DataFrame:
+    pct = counts / n_rows * 100.0 if n_rows else np.full(len(cols), np.nan)
+    records = [{
+        "column": c,
+        "lower_bound": low[j],
+        "upper_bound": high[j],
+        "n_outliers": int(counts[j]),
+        "pct_outliers": float(pct[j]),
+    } for j, c in enumerate(cols)]
+    return pd.DataFrame(records).sort_values("pct_outliers", ascending=False)
+
+@profiled()
 def detect_outliers_iqr(
     df: pd.DataFrame,
     cols: List[str] | None = None,
     k: float = 1.5,
-    exclude: List[str] | None = None
+    exclude: List[str] | None = None,
+    engine: str = "numpy",
+    sketches: dict | None = None
 ) -> tuple[pd.Series, pd.DataFrame]:
     """
     Returns:
       mask  -> boolean Series (True where row has an outlier in any selected column)
       table -> per-column summary with bounds and counts
+    engine="numpy" computes all quantiles and masks in single vectorized calls;
+    engine="pandas" is the original column-by-column loop.
+    sketches: optional {column: QuantileSketch}; bounds then come from the
+    sketches (e.g. built over a whole file or a live stream) instead of `df`.
     """
     cols = _numeric_cols(df, include=cols, exclude=exclude)
+    if engine == "numpy" or sketches is not None:
+        M = _numeric_matrix(df, cols)
+        low, high = iqr_bounds_matrix(M, k) if sketches is None else sketch_bounds(sketches, cols, k)
+        out = _outlier_matrix(M, low, high)
+        overall_mask = pd.Series(out.any(axis=1), index=df.index)
+        return overall_mask, _summary_table(cols, low, high, out.sum(axis=0), len(df))
+    _check_engine(engine)
     overall_mask = pd.Series(False, index=df.index)
     records = []
     for c in cols:
@@ -50,9 +155,30 @@ def winsorize_iqr(
     df: pd.DataFrame,
     cols: List[str] | None = None,
     k: float = 1.5,
-    exclude: List[str] | None = None
+    exclude: List[str] | None = None,
+    engine: str = "numpy",
+    inplace: bool = False
 ) -> pd.DataFrame:
-    """Cap values outside IQR bounds back to the bounds (a.k.a. winsorize)."""
+    """
+    Cap values outside IQR bounds back to the bounds (a.k.a. winsorize).
+    inplace=True (numpy engine) writes the clipped columns into `df` instead
+    of copying the whole frame first; only columns with outliers are touched.
+    """
+    if engine == "numpy":
+        df2 = df if inplace else df.copy()
+        cols = _numeric_cols(df2, include=cols, exclude=exclude)
+        M = _numeric_matrix(df2, cols)
+        low, high = iqr_bounds_matrix(M, k)
+        changed = _outlier_matrix(M, low, high).any(axis=0)
+        np.clip(M, low, high, out=M)
+        for j, c in enumerate(cols):
+            # untouched numeric columns keep their dtype, as Series.clip does
+            if changed[j] or not pd.api.types.is_numeric_dtype(df2[c]):
+                df2[c] = M[:, j]
+        return df2
+    _check_engine(engine)
+    if inplace:
+        raise ValueError('inplace=True requires engine="numpy"')
     df2 = df.copy()
     cols = _numeric_cols(df2, include=cols, exclude=exclude)
     for c in cols:
@@ -65,18 +191,71 @@ def remove_outliers_iqr(
     df: pd.DataFrame,
     cols: List[str] | None = None,
     k: float = 1.5,
-    exclude: List[str] | None = None
+    exclude: List[str] | None = None,
+    engine: str = "numpy",
+    sketches: dict | None = None
 ) -> pd.DataFrame:
     """Drop rows where ANY selected column is outside its IQR bounds."""
-    mask, _ = detect_outliers_iqr(df, cols=cols, k=k, exclude=exclude)
+    mask, _ = detect_outliers_iqr(df, cols=cols, k=k, exclude=exclude, engine=engine, sketches=sketches)
     return df.loc[~mask].copy()
 
 def summarize_outliers(
     df: pd.DataFrame,
     cols: List[str] | None = None,
     k: float = 1.5,
-    exclude: List[str] | None = None
+    exclude: List[str] | None = None,
+    engine: str = "numpy",
+    sketches: dict | None = None
 ) -> pd.DataFrame:
     """Convenience wrapper that just returns the summary table."""
-    _, summary = detect_outliers_iqr(df, cols=cols, k=k, exclude=exclude)
+    _, summary = detect_outliers_iqr(df, cols=cols, k=k, exclude=exclude, engine=engine, sketches=sketches)
     return summary
+
+# ---------- Fitted bounds (train once, apply at serving time) ----------
+class IQRWinsorizer(OneToOneFeatureMixin, TransformerMixin, BaseEstimator):
+    """
+    Learns IQR bounds in fit() and clips to them in transform(), so scoring a
+    single row uses the training-time bounds instead of recomputing them from
+    the request. transform() does no quantile work: one clip over the
+    selected columns. Works on DataFrames (cols by name) and arrays (cols by
+    position), pickles with the pipeline it belongs to.
+    """
+
+    def __init__(self, cols=None, k=1.5, exclude=None):
+        self.cols = cols
+        self.k = k
+        self.exclude = exclude
+
+    def fit(self, X, y=None):
+        if isinstance(X, pd.DataFrame):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+            self.columns_ = _numeric_cols(X, include=self.cols, exclude=self.exclude)
+            M = _numeric_matrix(X, self.columns_)
+        else:
+            X = np.asarray(X, dtype=np.float64)
+            cols = self.cols if self.cols is not None else range(X.shape[1])
+            self.columns_ = [c for c in cols if c not in (self.exclude or [])]
+            M = X[:, self.columns_]
+        self.n_features_in_ = X.shape[1]
+        lower, upper = iqr_bounds_matrix(M, self.k)
+        # columns with no usable values are left unclipped
+        self.lower_ = np.where(np.isnan(lower), -np.inf, lower)
+        self.upper_ = np.where(np.isnan(upper), np.inf, upper)
+        return self
+
+    def transform(self, X):
+        check_is_fitted(self, "lower_")
+        if isinstance(X, pd.DataFrame):
+            X = X.copy()
+            M = _numeric_matrix(X, self.columns_)
+            np.clip(M, self.lower_, self.upper_, out=M)
+            for j, c in enumerate(self.columns_):
+                X[c] = M[:, j]
+            return X
+        X = np.array(X, dtype=np.float64)  # copy
+        X[:, self.columns_] = np.clip(X[:, self.columns_], self.lower_, self.upper_)
+        return X
+
+    def bounds(self) -> pd.DataFrame:
+        check_is_fitted(self, "lower_")
+        return pd.DataFrame({"column": self.columns_, "lower_bound": self.lower_, "upper_bound": self.upper_})
@@ -0,0 +1,105 @@
+# src/plots.py
+# Report plots rendered once per (model version, data hash) and then served
+# from memory or disk. Rendering builds a matplotlib Figure on the Agg canvas
+# directly, without pyplot's global figure state, so it is safe from request
+# threads and background threads alike.
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+
+def render_png(draw, figsize=(10, 6), dpi=100):
+    """PNG bytes of a new Figure after draw(fig) has filled it."""
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    draw(fig)
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
+
+def feature_importance_png(names, importances):
+    def draw(fig):
+        ax = fig.add_subplot()
+        ax.bar(names, importances)
+        ax.tick_params(axis="x", labelrotation=45)
+        for label in ax.get_xticklabels():
+            label.set_horizontalalignment("right")
+        ax.set_title("Feature Importances")
+        fig.tight_layout()
+    return render_png(draw)
+
+
+def plot_key(kind, *parts):
+    """Cache key (also the ETag) from the plot kind and whatever its image depends on."""
+    digest = hashlib.sha1("\x1f".join(map(str, parts)).encode()).hexdigest()[:16]
+    return f"{kind}-{digest}"
+
+
+class PlotCache:
+    """
+    PNG bytes by key: an in-memory LRU in front of `<directory>/<key>.png`.
+    Concurrent requests for a key that is being rendered wait for that render
+    instead of starting their own.
+    """
+
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> Event set when the render finishes
+        self.hits = 0
+        self.disk_hits = 0
+        self.renders = 0
+
+    def _remember(self, key, png):
+        with self._lock:
+            self._entries[key] = png
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get(self, key, render, directory=None):
+        """PNG for `key`, calling render() only when neither memory nor disk has it."""
+        while True:
+            with self._lock:
+                png = self._entries.get(key)
+                if png is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return png
+                waiting = self._inflight.get(key)
+                if waiting is None:
+                    done = self._inflight[key] = threading.Event()
+                    break
+            waiting.wait()  # someone else is rendering it; then re-check memory
+        try:
+            path = Path(directory) / f"{key}.png" if directory is not None else None
+            if path is not None and path.exists():
+                png = path.read_bytes()
+                self.disk_hits += 1
+            else:
+                png = render()
+                self.renders += 1
+                if path is not None:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                    tmp.write_bytes(png)
+                    os.replace(tmp, path)
+            self._remember(key, png)
+            return png
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            done.set()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits,
+                    "disk_hits": self.disk_hits, "renders": self.renders}
@@ -0,0 +1,207 @@
+# src/profiling.py
+# Per-stage instrumentation: wall time, CPU time (of the calling thread), row
+# counts and, with PROFILE_MEMORY=1, peak traced allocations. Stages are marked
+# with the @profiled decorator or the `stage()` context manager; totals are
+# served by the API as JSON (/metrics/stages) and Prometheus text (/metrics).
+#
+# PROFILE_STAGES=0 turns recording off: a decorated call then costs one global
+# flag check. cProfile dumps of single requests are opt-in (PROFILE_DIR).
+import cProfile
+import functools
+import itertools
+import os
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+ENABLED = os.getenv("PROFILE_STAGES", "1") != "0"
+# tracemalloc slows allocation-heavy code noticeably; peak memory is opt-in
+TRACE_MEMORY = os.getenv("PROFILE_MEMORY", "0") == "1"
+# where profile_to() dumps land when a request asks for a profile; unset = disabled
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+
+
+def _count_rows(result):
+    """Row count of a stage's result: frames/arrays/lists, (X, y) tuples, predict() dicts."""
+    if isinstance(result, dict):
+        return result.get("n")
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+class StageStats:
+    """Running totals per stage name. Safe to update from several threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._local = threading.local()  # open stages of this thread, for nested peak memory
+
+    def record(self, name, wall, cpu, rows=None, peak_bytes=None, error=False):
+        with self._lock:
+            s = self._stages.get(name)
+            if s is None:
+                s = self._stages[name] = {"calls": 0, "errors": 0, "wall_seconds": 0.0, "wall_seconds_max": 0.0,
+                                          "cpu_seconds": 0.0, "rows": 0, "peak_memory_bytes": None}
+            s["calls"] += 1
+            s["errors"] += bool(error)
+            s["wall_seconds"] += wall
+            s["wall_seconds_max"] = max(s["wall_seconds_max"], wall)
+            s["cpu_seconds"] += cpu
+            s["rows"] += rows or 0
+            if peak_bytes is not None:
+                s["peak_memory_bytes"] = max(s["peak_memory_bytes"] or 0, peak_bytes)
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """
+        Times the block. Set `.rows` on the yielded object to record a row
+        count known only inside the block.
+        """
+        if not ENABLED:
+            yield _NullStage
+            return
+        handle = _Stage(rows)
+        memory = TRACE_MEMORY and tracemalloc.is_tracing()
+        if memory:
+            open_stages = self._local.__dict__.setdefault("open", [])
+            start_mem = tracemalloc.get_traced_memory()[0]
+            if open_stages:  # keep the enclosing stage's peak before resetting it
+                open_stages[-1][1] = max(open_stages[-1][1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            open_stages.append([start_mem, 0])
+        t0, c0 = time.perf_counter(), time.thread_time()
+        error = False
+        try:
+            yield handle
+        except BaseException:
+            error = True
+            raise
+        finally:
+            wall, cpu = time.perf_counter() - t0, time.thread_time() - c0
+            peak = None
+            if memory:
+                start_mem, inner_peak = open_stages.pop()
+                absolute = max(inner_peak, tracemalloc.get_traced_memory()[1])
+                peak = absolute - start_mem
+                if open_stages:
+                    open_stages[-1][1] = max(open_stages[-1][1], absolute)
+            self.record(name, wall, cpu, handle.rows, peak, error)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(s) for name, s in sorted(self._stages.items())}
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+    def prometheus(self, prefix="loan_api_stage"):
+        """Prometheus text exposition (version 0.0.4) of the totals."""
+        snap = self.snapshot()
+        metrics = (
+            ("calls_total", "counter", "Calls of the stage", "calls"),
+            ("errors_total", "counter", "Calls that raised", "errors"),
+            ("wall_seconds_total", "counter", "Wall time spent in the stage", "wall_seconds"),
+            ("wall_seconds_max", "gauge", "Slowest single call", "wall_seconds_max"),
+            ("cpu_seconds_total", "counter", "CPU time of the calling thread", "cpu_seconds"),
+            ("rows_total", "counter", "Rows processed", "rows"),
+            ("peak_memory_bytes", "gauge", "Largest traced allocation peak (PROFILE_MEMORY=1)", "peak_memory_bytes"),
+        )
+        lines = []
+        for suffix, kind, help_text, key in metrics:
+            name = f"{prefix}_{suffix}"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for stage, s in snap.items():
+                if s[key] is not None:
+                    label = stage.replace("\\", "\\\\").replace('"', '\\"')
+                    lines.append(f'{name}{{stage="{label}"}} {s[key]}')
+        return "\n".join(lines) + "\n"
+
+
+class _Stage:
+    __slots__ = ("rows",)
+
+    def __init__(self, rows=None):
+        self.rows = rows
+
+
+class _NullStageType:
+    # shared no-op handle while recording is off; setting rows is ignored
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NullStage = _NullStageType()
+
+STAGES = StageStats()
+
+
+def stage(name, rows=None):
+    return STAGES.stage(name, rows)
+
+
+def profiled(name=None, rows=_count_rows):
+    """
+    Decorator recording each call as stage `name` (default: module.function).
+    `rows(result)` gives the row count; pass rows=None to skip counting.
+    """
+    def wrap(fn):
+        stage_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with STAGES.stage(stage_name) as s:
+                result = fn(*args, **kwargs)
+                s.rows = rows(result) if rows is not None else None
+                return result
+        return wrapper
+    return wrap
+
+
+def set_enabled(enabled=True, trace_memory=None):
+    """Switch recording at runtime (tests, notebooks). trace_memory=True also starts tracemalloc."""
+    global ENABLED, TRACE_MEMORY
+    ENABLED = enabled
+    if trace_memory is not None:
+        TRACE_MEMORY = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+
+# --- cProfile dumps ---
+_DUMP_SEQ = itertools.count()  # next() is atomic under the GIL
+
+
+def profile_path(label, directory=None):
+    """Fresh file name for a dump; the per-process sequence keeps same-second dumps apart."""
+    directory = Path(directory or PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", label).strip("_") or "profile"
+    return directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_DUMP_SEQ)}-{safe}.pstats"
+
+
+@contextmanager
+def profile_to(path):
+    """
+    cProfile the block and dump pstats to `path` (snakeviz, `python -m pstats`,
+    or convert with flameprof/gprof2dot for flame graphs).
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield path
+    finally:
+        profiler.disable()
+        profiler.dump_stats(str(path))
@@ -0,0 +1,127 @@
+# src/schema.py
+# Training-time feature schema, saved next to the model, and a validator that
+# writes request payloads straight into a float64 buffer in training column order.
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+MAX_REPORTED_ERRORS = 20
+
+
+class SchemaError(ValueError):
+    """Payload does not match the model's feature schema. `errors` lists every problem found."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        shown = "; ".join(self.errors[:3])
+        more = f" (+{len(self.errors) - 3} more)" if len(self.errors) > 3 else ""
+        super().__init__(f"Invalid input: {shown}{more}")
+
+
+class FeatureSchema:
+    """
+    Feature names, dtypes and order as seen by the model at fit time.
+
+    to_matrix() accepts a dict, a list of dicts or a DataFrame and returns an
+    (n_rows, n_features) float64 array in training order. Every feature is
+    required; None/NaN become NaN; numbers, bools and numeric strings are
+    accepted. Unknown keys are an error unless extra="ignore".
+    """
+
+    def __init__(self, names, dtypes=None, extra="error"):
+        if extra not in ("error", "ignore"):
+            raise ValueError("extra must be 'error' or 'ignore'")
+        self.names = list(names)
+        self.dtypes = dict(dtypes) if dtypes is not None else {n: "float64" for n in self.names}
+        self.extra = extra
+        self._name_set = frozenset(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_frame(cls, X, **kwargs):
+        return cls(X.columns.tolist(), {c: str(t) for c, t in X.dtypes.items()}, **kwargs)
+
+    @classmethod
+    def from_model(cls, model, **kwargs):
+        """Names only (dtypes assumed float64), from a model fitted on a DataFrame; None otherwise."""
+        names = getattr(model, "feature_names_in_", None)
+        return cls([str(n) for n in names], **kwargs) if names is not None else None
+
+    # --- persistence ---
+    def to_dict(self):
+        return {"names": self.names, "dtypes": self.dtypes}
+
+    @classmethod
+    def from_dict(cls, d, **kwargs):
+        return cls(d["names"], d.get("dtypes"), **kwargs)
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return str(path)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        with open(path) as f:
+            return cls.from_dict(json.load(f), **kwargs)
+
+    # --- validation ---
+    def _row_errors(self, i, row):
+        # slow path, only run once the fast path has failed: name every problem in the row
+        if not isinstance(row, dict):
+            return [f"row {i}: expected an object of features, got {type(row).__name__}"]
+        errors = [f"row {i}: missing feature '{n}'" for n in self.names if n not in row]
+        if self.extra == "error":
+            errors += [f"row {i}: unknown feature '{k}'" for k in row if k not in self._name_set]
+        for n in self.names:
+            value = row.get(n)
+            if value is None or isinstance(value, bool):
+                continue
+            try:
+                float(value)
+            except (TypeError, ValueError):
+                errors.append(f"row {i}: feature '{n}' expects a number, got {value!r}")
+        return errors
+
+    def _fill(self, rows, out):
+        # stops at the first invalid row and returns its errors
+        names, n = self.names, len(self.names)
+        check_extra = self.extra == "error"
+        for i, row in enumerate(rows):
+            try:
+                out[i] = [row[name] for name in names]  # None -> NaN, numeric strings parse
+                if check_extra and len(row) != n:
+                    raise KeyError
+            except (KeyError, TypeError, ValueError):
+                errors = self._row_errors(i, row)
+                if errors:
+                    return errors
+                out[i] = [math.nan if row.get(name) is None else float(row[name]) for name in names]
+        return []
+
+    def to_matrix(self, payload, out=None):
+        if isinstance(payload, pd.DataFrame):
+            missing = [n for n in self.names if n not in payload.columns]
+            extra = [c for c in payload.columns if c not in self._name_set] if self.extra == "error" else []
+            if missing or extra:
+                raise SchemaError([f"missing feature '{n}'" for n in missing] +
+                                  [f"unknown feature '{c}'" for c in extra])
+            try:
+                return payload[self.names].to_numpy(dtype=np.float64, na_value=np.nan)
+            except (TypeError, ValueError):
+                payload = payload.to_dict(orient="records")  # find the offending cells
+        rows = [payload] if isinstance(payload, dict) else payload
+        if not isinstance(rows, list) or not rows:
+            raise SchemaError(["input must be an object or a non-empty list of objects"])
+        if out is None:
+            out = np.empty((len(rows), len(self.names)), dtype=np.float64)
+        elif out.shape != (len(rows), len(self.names)):
+            raise ValueError(f"out has shape {out.shape}, expected {(len(rows), len(self.names))}")
+        errors = self._fill(rows, out)
+        if errors:
+            raise SchemaError(errors[:MAX_REPORTED_ERRORS])
+        return out
@@ -0,0 +1,63 @@
+# src/serving.py
+# Request parsing and response shapes shared by the Flask (app.py) and ASGI (asgi_app.py) front ends.
+
+
+def extract_payload(data):
+    """Accept either {"features": {...}} or a list/dict directly."""
+    if isinstance(data, dict) and "features" in data:
+        return data["features"]
+    return data
+
+
+def _maybe_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def path_params_payload(param1, param2=None):
+    """Turn /predict/<param1>/<param2> into a feature dict. Adapt to your model schema."""
+    payload = {"feat1": _maybe_float(param1)}
+    if param2 is not None:
+        payload["feat2"] = _maybe_float(param2)
+    return payload
+
+
+def schema_error(exc):
+    """400 body for a schema.SchemaError: the summary plus every field-level error."""
+    return 400, {"status": "error", "message": str(exc), "errors": exc.errors}
+
+
+def malformed_json():
+    """400 body for a request body that does not parse as JSON."""
+    return 400, {"status": "error", "message": "Request body is not valid JSON"}
+
+
+# --- Job responses: (http_status, body) pairs ---
+def job_accepted(job_id, created):
+    return 202, {
+        "status": "accepted",
+        "job_id": job_id,
+        "deduplicated": not created,
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result",
+    }
+
+
+def job_status(jobs, job_id):
+    job = jobs.status(job_id)
+    if job is None:
+        return 404, {"status": "error", "message": "Unknown job"}
+    return 200, job
+
+
+def job_result(jobs, job_id):
+    job = jobs.status(job_id)
+    if job is None:
+        return 404, {"status": "error", "message": "Unknown job"}
+    if job["status"] == "failed":
+        return 500, {"status": "error", "message": job["error"]}
+    if job["status"] != "succeeded":
+        return 202, {"status": job["status"], "job_id": job_id}
+    return 200, {"status": "success", "summary": jobs.result(job_id)}
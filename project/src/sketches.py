@@ -0,0 +1,164 @@
+# src/sketches.py
+import json
+import math
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with a relative-error guarantee (DDSketch-style).
+
+    Values are counted in logarithmic buckets of ratio gamma = (1+a)/(1-a),
+    so any quantile estimate is within `relative_accuracy` (a) of the true
+    value at that rank. Memory depends on the value range (~1,700 buckets to
+    cover 15 orders of magnitude at a=0.01), not on how many values were seen.
+    Sketches built on different chunks or processes can be merged exactly and
+    persisted as JSON.
+    """
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-9):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value  # |x| below this counts as zero
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = defaultdict(int)  # bucket key -> count
+        self.negative = defaultdict(int)  # keyed on |x|
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    # --- updates ---
+    def _add_keys(self, store, values):
+        keys, counts = np.unique(np.ceil(np.log(values) / self._log_gamma).astype(np.int64),
+                                 return_counts=True)
+        for key, c in zip(keys.tolist(), counts.tolist()):
+            store[key] += c
+
+    def update(self, values):
+        """Add a scalar or array of values; NaNs are ignored."""
+        x = np.asarray(values, dtype=np.float64).ravel()
+        x = x[~np.isnan(x)]
+        if x.size == 0:
+            return self
+        pos = x[x > self.min_value]
+        neg = -x[x < -self.min_value]
+        if pos.size:
+            self._add_keys(self.positive, pos)
+        if neg.size:
+            self._add_keys(self.negative, neg)
+        self.zero_count += int(x.size - pos.size - neg.size)
+        self.count += int(x.size)
+        self.min = min(self.min, float(x.min()))
+        self.max = max(self.max, float(x.max()))
+        return self
+
+    def merge(self, other):
+        """Fold `other` into this sketch (in place). Accuracies must match."""
+        if other.relative_accuracy != self.relative_accuracy or other.min_value != self.min_value:
+            raise ValueError("Can only merge sketches with the same relative_accuracy and min_value")
+        for key, c in other.positive.items():
+            self.positive[key] += c
+        for key, c in other.negative.items():
+            self.negative[key] += c
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    # --- queries ---
+    def _value(self, key):
+        return 2.0 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q):
+        if self.count == 0:
+            return float("nan")
+        if not 0 <= q <= 1:
+            raise ValueError("q must be in [0, 1]")
+        rank = q * (self.count - 1)
+        seen = 0
+        # ascending value order: most negative first, then zeros, then positives
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return max(-self._value(key), self.min)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return min(self._value(key), self.max)
+        return self.max
+
+    def quantiles(self, qs):
+        return [self.quantile(q) for q in qs]
+
+    # --- persistence ---
+    def to_dict(self):
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "min_value": self.min_value,
+            "positive": {str(k): v for k, v in self.positive.items()},
+            "negative": {str(k): v for k, v in self.negative.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        sk = cls(relative_accuracy=d["relative_accuracy"], min_value=d["min_value"])
+        sk.positive.update({int(k): v for k, v in d["positive"].items()})
+        sk.negative.update({int(k): v for k, v in d["negative"].items()})
+        sk.zero_count = d["zero_count"]
+        sk.count = d["count"]
+        if d["count"]:
+            sk.min, sk.max = d["min"], d["max"]
+        return sk
+
+    def __len__(self):
+        return self.count
+
+
+# --- Per-column collections ---
+def sketch_columns(chunks, cols, relative_accuracy=0.01, sketches=None):
+    """
+    Build (or keep updating) one QuantileSketch per column from an iterable of
+    DataFrame chunks, e.g. storage.iter_table_chunks(path, columns=cols).
+    """
+    sketches = sketches if sketches is not None else {c: QuantileSketch(relative_accuracy) for c in cols}
+    for chunk in chunks:
+        for c in cols:
+            sketches[c].update(pd.to_numeric(chunk[c], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan))
+    return sketches
+
+
+def merge_sketch_columns(*collections):
+    """Merge several {column: sketch} mappings (e.g. one per worker) into a new one."""
+    merged = {}
+    for coll in collections:
+        for c, sk in coll.items():
+            if c not in merged:
+                merged[c] = QuantileSketch.from_dict(sk.to_dict())
+            else:
+                merged[c].merge(sk)
+    return merged
+
+
+def save_sketches(sketches, path):
+    with open(path, "w") as f:
+        json.dump({c: sk.to_dict() for c, sk in sketches.items()}, f)
+    return str(path)
+
+
+def load_sketches(path):
+    with open(path) as f:
+        return {c: QuantileSketch.from_dict(d) for c, d in json.load(f).items()}
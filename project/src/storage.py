@@ -0,0 +1,402 @@
+# src/storage.py
+# Columnar (Parquet / Feather) storage for processed and feature data, with CSV
+# kept as the import/export fallback. The format is chosen from the file suffix.
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (pandas uses it for Parquet/Feather IO)
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+    import pyarrow.types as pat
+    HAS_PYARROW = True
+except ImportError:  # CSV still works without it
+    HAS_PYARROW = False
+
+DATE_COLS = ("LoanDate", "DisbursementDate", "LastPaymentDate", "RetirementDate")
+COLUMNAR_SUFFIXES = (".parquet", ".feather")
+# object columns with at most this share of distinct values are dictionary-encoded
+CATEGORY_MAX_RATIO = 0.5
+# narrower dtypes optimize_dtypes() tries, smallest first. No 8-bit ints: pandas
+# arithmetic keeps the operands' dtype, so Age + Age would wrap past 127 silently.
+INT_CANDIDATES = ("int16", "uint16", "int32", "uint32", "int64")
+
+
+def _fmt(path):
+    suffix = Path(path).suffix.lower()
+    if suffix in COLUMNAR_SUFFIXES + (".csv",):
+        return suffix.lstrip(".")
+    raise ValueError(f"Unsupported storage format: {path}")
+
+
+def _require_pyarrow(path):
+    if not HAS_PYARROW:
+        raise ImportError(f"pyarrow is required to read/write {path}; use a .csv path instead")
+
+
+# ---------- Schema ----------
+def apply_schema(df, date_cols=DATE_COLS, category_cols=None, max_category_ratio=CATEGORY_MAX_RATIO):
+    """
+    Returns a copy with date columns parsed and string columns converted to
+    `category` (dictionary-encoded on disk). With category_cols=None, string
+    columns whose distinct/total ratio is <= max_category_ratio are converted.
+    """
+    df = df.copy()
+    for c in date_cols or ():
+        if c in df.columns and not pd.api.types.is_datetime64_any_dtype(df[c]):
+            df[c] = pd.to_datetime(df[c], errors="coerce")
+    if category_cols is None:
+        text_cols = df.select_dtypes(include=["object", "string"]).columns
+        n = max(len(df), 1)
+        category_cols = [c for c in text_cols if df[c].nunique(dropna=True) / n <= max_category_ratio]
+    for c in category_cols:
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+    return df
+
+
+# ---------- Memory: narrow dtypes ----------
+def _fits(values, dtype):
+    """True when every value of the numeric array survives a cast to dtype unchanged."""
+    dtype = np.dtype(dtype)
+    if dtype.kind in "iu":
+        if values.dtype.kind == "f" and not (np.isfinite(values).all() and (values == np.trunc(values)).all()):
+            return False
+        info = np.iinfo(dtype)
+        return values.size == 0 or (values.min() >= info.min and values.max() <= info.max)
+    with np.errstate(over="ignore", invalid="ignore"):
+        return np.array_equal(values.astype(dtype).astype(values.dtype), values, equal_nan=True)
+
+
+def _narrowest_dtype(s):
+    if not (pd.api.types.is_integer_dtype(s) or pd.api.types.is_float_dtype(s)) or s.empty:
+        return None
+    if isinstance(s.dtype, pd.api.extensions.ExtensionDtype):
+        return None  # nullable Int64/Float64: leave the mask handling to pandas
+    values = s.to_numpy()
+    candidates = INT_CANDIDATES + (("float32",) if values.dtype.kind == "f" else ())
+    fitting = [c for c in candidates if np.dtype(c).itemsize < values.dtype.itemsize and _fits(values, c)]
+    return min(fitting, key=lambda c: np.dtype(c).itemsize) if fitting else None
+
+
+def optimize_dtypes(df, category_cols=None, max_category_ratio=CATEGORY_MAX_RATIO):
+    """
+    Returns (optimized_df, dtype_map, report). Numeric columns get the
+    narrowest dtype that holds every value exactly (ints shrink to int16..int32,
+    integral floats without NaN become ints, floats that round-trip become
+    float32). String columns become `category`: category_cols, or with None
+    those whose distinct/total ratio is <= max_category_ratio. dtype_map holds
+    only the columns that changed; report has bytes before/after per column.
+    """
+    if category_cols is None:
+        text_cols = df.select_dtypes(include=["object", "string"]).columns
+        n = max(len(df), 1)
+        category_cols = [c for c in text_cols if df[c].nunique(dropna=True) / n <= max_category_ratio]
+    out = df.copy(deep=False)
+    dtype_map, rows = {}, []
+    for c in df.columns:
+        target = "category" if c in category_cols else _narrowest_dtype(df[c])
+        if target is None or str(df[c].dtype) == target:
+            continue
+        out[c] = df[c].astype(target)
+        dtype_map[c] = target
+        before, after = int(df[c].memory_usage(index=False, deep=True)), int(out[c].memory_usage(index=False, deep=True))
+        rows.append({"column": c, "dtype_before": str(df[c].dtype), "dtype_after": target,
+                     "bytes_before": before, "bytes_after": after, "bytes_saved": before - after})
+    report = pd.DataFrame(rows, columns=["column", "dtype_before", "dtype_after",
+                                         "bytes_before", "bytes_after", "bytes_saved"])
+    report = report.sort_values("bytes_saved", ascending=False, ignore_index=True)
+    report.attrs["bytes_before"] = int(df.memory_usage(index=False, deep=True).sum())
+    report.attrs["bytes_after"] = int(out.memory_usage(index=False, deep=True).sum())
+    return out, dtype_map, report
+
+
+def dtype_map_path(path):
+    """`loans.parquet` -> `loans.dtypes.json`, shared by the CSV and columnar copies."""
+    return Path(path).with_suffix(".dtypes.json")
+
+
+def save_dtype_map(dtype_map, path):
+    with open(dtype_map_path(path), "w") as f:
+        json.dump({"dtypes": dtype_map}, f, indent=2)
+    return str(dtype_map_path(path))
+
+
+def load_dtype_map(path):
+    """The dtype map stored next to a dataset, or None when there is none."""
+    sidecar = dtype_map_path(path)
+    if not sidecar.exists():
+        return None
+    with open(sidecar) as f:
+        return json.load(f)["dtypes"]
+
+
+def _apply_dtype_map(df, dtype_map):
+    # in place, on a frame read_table just built. A column whose new values no
+    # longer fit (NaN or wider range in appended rows) keeps its read dtype.
+    for c, dtype in dtype_map.items():
+        if c not in df.columns or str(df[c].dtype) == dtype:
+            continue
+        if dtype == "category":
+            df[c] = df[c].astype("category")
+        elif pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c]) \
+                and _fits(df[c].to_numpy(), dtype):
+            df[c] = df[c].astype(dtype)
+    return df
+
+
+def optimize_table(path, dest=None):
+    """
+    Memory-optimizer stage for a stored dataset: computes the dtype map,
+    stores it next to `path` (and `dest`) so read_table applies it on later
+    loads, and with `dest` also writes the optimized frame there.
+    Returns the per-column report.
+    """
+    df = read_table(path, dtypes=None)
+    out, dtype_map, report = optimize_dtypes(df)
+    save_dtype_map(dtype_map, path)
+    if dest is not None:
+        write_table(out, dest, category_cols=[c for c, t in dtype_map.items() if t == "category"])
+        save_dtype_map(dtype_map, dest)
+    return report
+
+
+def _arrow_schema(path, fmt):
+    _require_pyarrow(path)
+    if fmt == "parquet":
+        return pq.read_schema(path)
+    with ipc.open_file(path) as reader:  # Feather v2 is the Arrow IPC file format
+        return reader.schema
+
+
+def columns_of(path):
+    """Column names, read from file metadata (or the CSV header line)."""
+    fmt = _fmt(path)
+    if fmt == "csv":
+        return pd.read_csv(path, nrows=0).columns.tolist()
+    return list(_arrow_schema(path, fmt).names)
+
+
+def numeric_columns(path):
+    """Numeric/bool columns of a columnar file, without reading any data pages."""
+    fmt = _fmt(path)
+    if fmt == "csv":
+        return None  # CSV has no typed schema
+    return [f.name for f in _arrow_schema(path, fmt)
+            if pat.is_integer(f.type) or pat.is_floating(f.type) or pat.is_boolean(f.type)]
+
+
+# ---------- IO ----------
+def _read_parquet_from(path, start_row, columns):
+    # skip whole row groups before start_row without decoding them
+    pf = pq.ParquetFile(path)
+    groups, offset, pos = [], 0, 0
+    for i in range(pf.num_row_groups):
+        n = pf.metadata.row_group(i).num_rows
+        if pos + n > start_row:
+            groups.append(i)
+        elif not groups:
+            offset = pos + n  # rows in the skipped leading groups
+        pos += n
+    table = pf.read_row_groups(groups, columns=columns) if groups else pf.schema_arrow.empty_table()
+    if columns is not None and not groups:
+        table = table.select(columns)
+    return table.slice(start_row - offset).to_pandas()
+
+
+def read_table(path, columns=None, parse_dates=None, start_row=0, dtypes="auto"):
+    """
+    Reads CSV/Parquet/Feather. `columns` limits what is read (column pruning
+    for the columnar formats, usecols for CSV). `parse_dates` is applied to
+    the columns that exist, without a second pass over the file.
+    `start_row` skips the first data rows (e.g. rows already consumed by
+    incremental training); Parquet skips whole row groups without reading them.
+    `dtypes`: a column -> dtype map, "auto" for the map saved next to the file
+    by optimize_table() (if any), or None to keep the stored dtypes.
+    """
+    fmt = _fmt(path)
+    columns = list(columns) if columns is not None else None
+    dtype_map = load_dtype_map(path) if isinstance(dtypes, str) and dtypes == "auto" else dtypes
+    if fmt == "parquet":
+        _require_pyarrow(path)
+        if start_row:
+            df = _read_parquet_from(path, start_row, columns)
+        else:
+            df = pd.read_parquet(path, columns=columns)
+    elif fmt == "feather":
+        _require_pyarrow(path)
+        df = pd.read_feather(path, columns=columns)
+        if start_row:
+            df = df.iloc[start_row:].reset_index(drop=True)
+    else:
+        skip = range(1, start_row + 1) if start_row else None  # keep the header line
+        # categories are parsed straight from the text; numeric casts are checked after the read
+        cats = {c: "category" for c, t in (dtype_map or {}).items() if t == "category"}
+        df = pd.read_csv(path, usecols=columns, skiprows=skip, dtype=cats or None)
+    for c in parse_dates or ():
+        if c in df.columns and not pd.api.types.is_datetime64_any_dtype(df[c]):
+            df[c] = pd.to_datetime(df[c], errors="coerce")
+    if dtype_map:
+        _apply_dtype_map(df, dtype_map)
+    return df
+
+
+def write_table(df, path, date_cols=DATE_COLS, category_cols=None):
+    """
+    Writes df by suffix. Columnar formats get the typed schema from
+    apply_schema(); CSV is written as-is.
+    """
+    fmt = _fmt(path)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+        return str(path)
+    _require_pyarrow(path)
+    typed = apply_schema(df, date_cols=date_cols, category_cols=category_cols).reset_index(drop=True)
+    if fmt == "parquet":
+        typed.to_parquet(path, index=False)
+    else:
+        typed.to_feather(path)
+    return str(path)
+
+
+def columnar_sibling(path, suffix=".parquet"):
+    """
+    `data.csv` -> `data.parquet` if that file exists and is at least as new as
+    the CSV, else the original path: rows appended to the CSV after the
+    columnar copy was written must not be silently missed.
+    """
+    path = Path(path)
+    candidate = path.with_suffix(suffix)
+    if not candidate.exists():
+        return path
+    if path.exists() and candidate.stat().st_mtime < path.stat().st_mtime:
+        return path
+    return candidate
+
+
+# ---------- Chunked IO ----------
+def iter_table_chunks(path, chunksize=100_000, columns=None):
+    """Yields DataFrames of at most `chunksize` rows; never loads the whole file."""
+    fmt = _fmt(path)
+    if fmt == "csv":
+        yield from pd.read_csv(path, usecols=list(columns) if columns is not None else None,
+                               chunksize=chunksize)
+        return
+    _require_pyarrow(path)
+    if fmt == "parquet":
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns)
+        for batch in batches:
+            yield batch.to_pandas()
+        return
+    with ipc.open_file(path) as reader:  # record batches are read lazily
+        for i in range(reader.num_record_batches):
+            table = pyarrow.Table.from_batches([reader.get_batch(i)])
+            if columns is not None:
+                table = table.select(list(columns))
+            for start in range(0, table.num_rows, chunksize):
+                yield table.slice(start, chunksize).to_pandas()
+
+
+class ChunkWriter:
+    """
+    Appends DataFrame chunks to one CSV or Parquet file. The first chunk fixes
+    the column order. For Parquet, chunks are written as they arrive, so memory
+    stays bounded by the chunk size; column types may differ between chunks
+    (read_csv gives int64 for one chunk and float64 for the next, or a column
+    is all-null until its strings show up). All-null columns are written with
+    the null type, and when a chunk needs a wider schema (null -> any,
+    int -> float) the writer starts a new part file. close() joins the parts,
+    row group by row group, cast to the widest schema. Columns that never had
+    a value end up float64, as read_csv reads an empty column.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.fmt = _fmt(path)
+        if self.fmt == "feather":
+            raise ValueError("Chunked writes support .csv and .parquet only")
+        if self.fmt == "parquet":
+            _require_pyarrow(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._columns = None
+        self._parts = []
+        self._schema = None
+        self._writer = None
+        self.rows = 0
+
+    def _to_table(self, df):
+        table = pyarrow.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+        for i, c in enumerate(self._columns):
+            if df[c].isna().all() and not pat.is_null(table.schema.field(i).type):
+                table = table.set_column(i, pyarrow.field(c, pyarrow.null()), pyarrow.nulls(len(df)))
+        return table
+
+    def _open_part(self, schema):
+        if self._writer is not None:
+            self._writer.close()
+        part = self.path.with_name(f".{self.path.name}.part{len(self._parts)}.{os.getpid()}.{threading.get_ident()}.tmp")
+        self._parts.append(part)
+        self._schema = schema
+        self._writer = pq.ParquetWriter(part, schema)
+
+    def write(self, df):
+        if self._columns is None:
+            self._columns = list(df.columns)
+        df = df[self._columns]
+        if self.fmt == "csv":
+            df.to_csv(self.path, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        else:
+            table = self._to_table(df)
+            if self._schema is None:
+                self._open_part(table.schema)
+            elif not table.schema.equals(self._schema):
+                wider = pyarrow.unify_schemas([self._schema, table.schema], promote_options="permissive")
+                if not wider.equals(self._schema):
+                    self._open_part(wider)
+                table = table.cast(self._schema)
+            self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        final = pyarrow.schema([pyarrow.field(f.name, pyarrow.float64()) if pat.is_null(f.type) else f
+                                for f in self._schema])
+        try:
+            if len(self._parts) == 1 and final.equals(self._schema):
+                os.replace(self._parts[0], self.path)
+                return
+            tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with pq.ParquetWriter(tmp, final) as writer:
+                for part in self._parts:
+                    pf = pq.ParquetFile(part)
+                    for i in range(pf.num_row_groups):
+                        writer.write_table(pf.read_row_group(i).cast(final))
+            os.replace(tmp, self.path)
+        finally:
+            for part in self._parts:
+                part.unlink(missing_ok=True)
+            self._parts = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------- CSV import / export ----------
+def import_csv(csv_path, dest_path, date_cols=DATE_COLS, category_cols=None):
+    return write_table(pd.read_csv(csv_path), dest_path, date_cols=date_cols, category_cols=category_cols)
+
+
+def export_csv(src_path, csv_path):
+    return write_table(read_table(src_path), csv_path)
@@ -0,0 +1,155 @@
+# src/tree_export.py
+# Flattens a fitted sklearn forest into plain node arrays and scores them with
+# NumPy, skipping sklearn's per-call validation and joblib dispatch that
+# dominate single-row predict() latency.
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+from sklearn.tree import DecisionTreeRegressor, ExtraTreeRegressor
+
+LEAF = -1  # sklearn's TREE_LEAF marker in children_left/right
+FLATTENABLE = (RandomForestRegressor, ExtraTreesRegressor, DecisionTreeRegressor, ExtraTreeRegressor)
+
+
+class FlatForest:
+    """
+    All trees of a forest concatenated into one set of node tables:
+    feature, threshold, left, right, value (and missing_left for trees fitted
+    on data with NaNs). `roots` holds each tree's first node. Leaves point to
+    themselves, which is how the traversal tells it has reached one.
+
+    predict() reproduces sklearn bit for bit: inputs are compared as float32
+    (as sklearn's tree code does) and per-tree values are summed in tree order
+    before dividing by the tree count.
+    """
+
+    ARRAYS = ("feature", "threshold", "left", "right", "value", "missing_left", "roots")
+
+    def __init__(self, feature, threshold, left, right, value, missing_left, roots,
+                 max_depth, feature_names=None, average=True):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.missing_left = missing_left
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        self.average = average
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_features(self):
+        return len(self.feature_names) if self.feature_names is not None else int(self.feature.max()) + 1
+
+    # --- conversion ---
+    @classmethod
+    def from_sklearn(cls, model):
+        if isinstance(model, (RandomForestRegressor, ExtraTreesRegressor)):
+            trees, average = [est.tree_ for est in model.estimators_], True
+        elif isinstance(model, (DecisionTreeRegressor, ExtraTreeRegressor)):
+            trees, average = [model.tree_], False
+        else:
+            raise TypeError(f"Cannot flatten {type(model).__name__}; expected a fitted regression tree or forest")
+        if trees[0].n_outputs != 1 or trees[0].value.shape[2] != 1:
+            raise ValueError("Only single-output regression trees can be flattened")
+
+        parts = {k: [] for k in ("feature", "threshold", "left", "right", "value", "missing_left")}
+        roots, offset, max_depth = [], 0, 0
+        for tree in trees:
+            n = tree.node_count
+            own = np.arange(offset, offset + n, dtype=np.int32)
+            is_leaf = tree.children_left == LEAF
+            # leaves loop back to themselves; feature 0 is a harmless dummy lookup
+            parts["left"].append(np.where(is_leaf, own, tree.children_left + offset).astype(np.int32))
+            parts["right"].append(np.where(is_leaf, own, tree.children_right + offset).astype(np.int32))
+            parts["feature"].append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            parts["threshold"].append(tree.threshold.astype(np.float64))
+            parts["value"].append(tree.value[:, 0, 0].astype(np.float64))
+            mgl = getattr(tree, "missing_go_to_left", None)
+            parts["missing_left"].append(np.zeros(n, bool) if mgl is None else np.asarray(mgl, bool))
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+        arrays = {k: np.ascontiguousarray(np.concatenate(v)) for k, v in parts.items()}
+        return cls(roots=np.asarray(roots, dtype=np.int32), max_depth=max_depth,
+                   feature_names=getattr(model, "feature_names_in_", None), average=average, **arrays)
+
+    def to_dict(self):
+        d = {k: getattr(self, k) for k in self.ARRAYS}
+        d.update(max_depth=self.max_depth, feature_names=self.feature_names, average=self.average)
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(**d)
+
+    # --- scoring ---
+    def _as_matrix(self, X):
+        if isinstance(X, pd.DataFrame):
+            if self.feature_names is not None:
+                X = X[self.feature_names]  # select by name, so column order does not matter
+            X = X.to_numpy(dtype=np.float32, na_value=np.nan)
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"X has {X.shape[1]} features, but the model expects {self.n_features}")
+        return X
+
+    def apply(self, X):
+        """Leaf node index per (tree, row), shape (n_trees, n_rows)."""
+        X = self._as_matrix(X)
+        n_rows, n_features = X.shape
+        flat_x = X.ravel()
+        has_nan = bool(np.isnan(flat_x).any())
+        # one lane per (tree, row); lanes that reach a leaf are dropped
+        node = np.repeat(self.roots[:, None], n_rows, axis=1).ravel()
+        base = np.tile(np.arange(n_rows, dtype=np.int64) * n_features, self.n_trees)
+        lanes, cur = np.arange(node.size), node
+        for _ in range(self.max_depth):
+            x = flat_x[base + self.feature[cur]]
+            go_left = x <= self.threshold[cur]
+            if has_nan:
+                go_left = np.where(np.isnan(x), self.missing_left[cur], go_left)
+            cur = np.where(go_left, self.left[cur], self.right[cur])
+            node[lanes] = cur
+            live = self.left[cur] != cur
+            if not live.all():
+                lanes, cur, base = lanes[live], cur[live], base[live]
+                if lanes.size == 0:
+                    break
+        return node.reshape(self.n_trees, n_rows)
+
+    def predict(self, X, chunk_rows=4096):
+        X = self._as_matrix(X)
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), chunk_rows):
+            leaf_values = self.value[self.apply(X[start:start + chunk_rows])]
+            acc = np.zeros(leaf_values.shape[1], dtype=np.float64)
+            for row in leaf_values:  # tree order, like sklearn's accumulation
+                acc += row
+            out[start:start + chunk_rows] = acc / self.n_trees if self.average else acc
+        return out
+
+
+# --- Persistence ---
+def export_forest(model, path):
+    """Flatten `model` and write its node tables to `path` (a plain dict of arrays)."""
+    joblib.dump(FlatForest.from_sklearn(model).to_dict(), path)
+    return str(path)
+
+
+def load_forest(path, mmap_mode=None):
+    """
+    With mmap_mode="r" the node tables are memory-mapped from the file rather
+    than read into memory, so processes scoring the same file share them.
+    """
+    d = joblib.load(path, mmap_mode=mmap_mode)
+    # plain ndarray views of the maps: same pages, without np.memmap overhead on indexing
+    return FlatForest.from_dict({k: np.asarray(v) if isinstance(v, np.ndarray) else v for k, v in d.items()})
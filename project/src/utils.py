@@ -1,14 +1,25 @@
 # src/utils.py
 import os
 import json
+import threading
 from pathlib import Path
 import joblib
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import SGDRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error
-import matplotlib.pyplot as plt
+
+from src.model_cache import ModelCache
+from src.storage import read_table, numeric_columns, columnar_sibling
+from src.tree_export import FLATTENABLE, export_forest, load_forest
+from src.schema import FeatureSchema
+from src.profiling import profiled, stage
+from src.monitoring import get_monitor
+from src.plots import PlotCache, feature_importance_png, plot_key
 
 # --- Paths ---
 ROOT = Path(__file__).resolve().parents[1]
@@ -20,6 +31,28 @@ MODEL_DIR.mkdir(exist_ok=True)
 REPORTS_DIR.mkdir(exist_ok=True)
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+# --- Model cache ---
+# Shared by every caller in the process so predict() does not unpickle the
+# forest on each request; entries are revalidated against the file mtime/size.
+# (one model takes up to three entries: pickle, flat tables, schema)
+MODEL_CACHE = ModelCache(maxsize=int(os.getenv("MODEL_CACHE_SIZE", "8")))
+# rendered report plots (PNG bytes), also kept on disk under REPORTS_DIR/plots
+PLOT_CACHE = PlotCache(maxsize=int(os.getenv("PLOT_CACHE_SIZE", "16")))
+# Cached models are loaded with joblib mmap_mode="r": their uncompressed arrays
+# (notably the flat node tables) are mapped from the page cache instead of copied
+# into each worker, which makes startup cheap and shares memory across workers.
+# Off by default on Windows, where a mapped file cannot be replaced: retraining
+# while the API holds the mapping would fail with PermissionError.
+MODEL_MMAP = os.getenv("MODEL_MMAP", "0" if os.name == "nt" else "1") != "0"
+
+# --- Prediction backend ---
+# sklearn: model.predict. flat: NumPy over the exported node tables (tree
+# models only, same output). auto: flat for batches up to FLAT_MAX_ROWS, where
+# sklearn's per-call overhead dominates, sklearn for larger ones.
+PREDICT_BACKENDS = ("sklearn", "flat", "auto")
+PREDICT_BACKEND = os.getenv("PREDICT_BACKEND", "sklearn")
+FLAT_MAX_ROWS = int(os.getenv("FLAT_MAX_ROWS", "128"))
+
 # --- Existing cleaning functions ---
 def clean_column_names(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
@@ -33,66 +66,296 @@ def fillna_values(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 # --- Data prep ---
-def prepare_data(path=None):
+NON_FEATURE_DTYPES = ["object", "string", "category", "datetime", "datetimetz"]
+TARGET_COLUMN = "affordability"  # regression target, after clean_column_names
+
+def default_data_path():
+    # prefer the Parquet copy when one has been written next to the CSV (and is not stale)
+    return columnar_sibling(DATA_DIR / "cleaned_loan_data_capped.csv")
+
+def prepare_data(path=None, start_row=0):
     """
     Loads and preprocesses the real project dataset.
-    Returns X (features) and y (target).
+    Returns X (features) and y (target). `start_row` skips rows that were
+    already consumed (see train_incremental).
     """
     if path is None:
-        path = DATA_DIR / "cleaned_loan_data_capped.csv"
+        path = default_data_path()
 
-    df = pd.read_csv(path)
+    # columnar files: read only the numeric columns (None -> all columns for CSV)
+    df = read_table(path, columns=numeric_columns(path), start_row=start_row)
     df = clean_column_names(df)
     df = fillna_values(df)
 
-    target_column = "affordability"  # your regression target
+    target_column = TARGET_COLUMN
     if target_column not in df.columns:
         raise ValueError(f"Target column '{target_column}' not found in dataset")
 
-    # drop non-numeric columns (IDs, text)
-    non_numeric_cols = df.select_dtypes(include=["object"]).columns.tolist()
+    # drop non-numeric columns (IDs, text, typed dates/categories)
+    non_numeric_cols = df.select_dtypes(include=NON_FEATURE_DTYPES).columns.tolist()
     X = df.drop(columns=[target_column] + non_numeric_cols)
     y = df[target_column]
     return X, y
 
 # --- Model handling ---
+def _tmp_path(path):
+    # unique per process and thread, so concurrent writers of one file never share a tmp file
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
 def save_model(model, name="model_v1.pkl"):
     path = MODEL_DIR / name
-    joblib.dump(model, path)
+    # write then rename, so a concurrent load never sees a half-written file
+    tmp_path = _tmp_path(path)
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
+    MODEL_CACHE.invalidate(path)
+    # tree models also get flat node tables, the format served processes can memory-map
+    export_flat_model(model, name)
     return str(path)
 
-def load_model(name="model_v1.pkl"):
+def _load_shared(path):
+    # read-only: arrays stay memory-mapped, so worker processes share their pages
+    return joblib.load(path, mmap_mode="r" if MODEL_MMAP else None)
+
+def load_model(name="model_v1.pkl", use_cache=True):
+    """
+    Loads a model from MODEL_DIR. With use_cache=True (default) the
+    deserialized model is shared through MODEL_CACHE (its arrays memory-mapped
+    when MODEL_MMAP is on); pass use_cache=False to get a private, writable
+    copy you intend to modify.
+    """
     path = MODEL_DIR / name
     if not path.exists():
         raise FileNotFoundError(f"Model not found at {path}")
+    if use_cache:
+        return MODEL_CACHE.get(path, _load_shared)
     return joblib.load(path)
 
+def refresh_model(name="model_v1.pkl"):
+    """
+    Loads the current file for `name` and swaps it into MODEL_CACHE in one
+    step, e.g. after another process has retrained it. Requests keep using
+    the previous model until the new one is fully loaded.
+    """
+    path = MODEL_DIR / name
+    model = _load_shared(path)
+    MODEL_CACHE.put(path, model)
+    return model
+
+def flat_model_path(name="model_v1.pkl"):
+    return MODEL_DIR / f"{Path(name).stem}.flat.joblib"
+
+def export_flat_model(model, name="model_v1.pkl"):
+    """
+    Writes the node-table copy of a tree model (see src.tree_export) next to
+    the pickle. Returns None for models that cannot be flattened.
+    """
+    if not isinstance(model, FLATTENABLE):
+        return None
+    path = flat_model_path(name)
+    tmp_path = _tmp_path(path)
+    export_forest(model, tmp_path)
+    os.replace(tmp_path, path)
+    MODEL_CACHE.invalidate(path)
+    return str(path)
+
+def load_flat_model(name="model_v1.pkl"):
+    """Cached FlatForest for `name`; re-exported when missing or older than the pickle."""
+    path = flat_model_path(name)
+    model_path = MODEL_DIR / name
+    if not path.exists() or path.stat().st_mtime_ns < model_path.stat().st_mtime_ns:
+        if export_flat_model(load_model(name), name) is None:
+            raise TypeError(f"{name} is not a tree model; use PREDICT_BACKEND=sklearn")
+    return MODEL_CACHE.get(path, lambda p: load_forest(p, mmap_mode="r" if MODEL_MMAP else None))
+
+def schema_path(name="model_v1.pkl"):
+    return MODEL_DIR / f"{Path(name).stem}.schema.json"
+
+def save_schema(X, name="model_v1.pkl"):
+    """Records the training features (names, dtypes, order) for predict()'s validator."""
+    path = schema_path(name)
+    FeatureSchema.from_frame(X).save(path)
+    MODEL_CACHE.invalidate(path)
+    return str(path)
+
+def load_schema(name="model_v1.pkl"):
+    """Saved FeatureSchema for `name`, else one built from the model's feature names, else None."""
+    path = schema_path(name)
+    if path.exists():
+        return MODEL_CACHE.get(path, FeatureSchema.load)
+    return FeatureSchema.from_model(load_model(name))
+
+def model_cache_stats():
+    return MODEL_CACHE.stats()
+
 # --- Training ---
-def train_and_save(default_model_name="model_v1.pkl", overwrite=True):
-    X, y = prepare_data()
+MODEL_KINDS = ("forest", "sgd")
+
+def make_model(kind="forest"):
+    """RandomForest (grown with warm_start) or a scaled SGD linear model (updated with partial_fit)."""
+    if kind == "forest":
+        return RandomForestRegressor(n_estimators=100, random_state=42)
+    if kind == "sgd":
+        # NaN -> 0 after scaling is mean imputation that stays valid under partial_fit
+        return Pipeline([
+            ("scale", StandardScaler()),
+            ("impute", FunctionTransformer(np.nan_to_num)),
+            ("sgd", SGDRegressor(random_state=42)),
+        ])
+    raise ValueError(f"Unknown model kind {kind!r}; expected one of {MODEL_KINDS}")
+
+def _rmse(y_true, y_pred):
+    return float(mean_squared_error(y_true, y_pred) ** 0.5)
+
+def _update_metrics(**entries):
+    # keep the full-retrain "rmse" and add/replace the other sections
+    metrics_path = REPORTS_DIR / "metrics.json"
+    try:
+        with open(metrics_path) as f:
+            metrics = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        metrics = {}
+    metrics.update(entries)
+    REPORTS_DIR.mkdir(exist_ok=True)
+    with open(metrics_path, "w") as f:
+        json.dump(metrics, f, indent=2)
+    return metrics
+
+@profiled(rows=None)
+def train_and_save(default_model_name="model_v1.pkl", overwrite=True, data_path=None, model_kind="forest"):
+    data_path = data_path or default_data_path()
+    X, y = prepare_data(data_path)
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    model = RandomForestRegressor(n_estimators=100, random_state=42)
-    model.fit(X_train, y_train)
+    model = make_model(model_kind)
+    with stage("utils.train_and_save.fit", rows=len(X_train)):
+        model.fit(X_train, y_train)
     preds = model.predict(X_test)
-    rmse = mean_squared_error(y_test, preds) ** 0.5
+    rmse = _rmse(y_test, preds)
 
-    # save model
+    # save model (and the watermark incremental updates start from)
     if overwrite or not (MODEL_DIR / default_model_name).exists():
         save_model(model, default_model_name)
+        save_schema(X, default_model_name)
+        save_watermark(default_model_name, data_path, rows_consumed=len(X), mode="full")
+        get_monitor().record_data_timestamp(Path(data_path).stat().st_mtime)
+        prerender_plots(default_model_name, model, X.columns.tolist())
 
-    # write metrics and test predictions
+    # write metrics and test predictions; a full retrain resets the incremental section
     REPORTS_DIR.mkdir(exist_ok=True)
-    metrics_path = REPORTS_DIR / "metrics.json"
-    with open(metrics_path, "w") as f:
-        json.dump({"rmse": float(rmse)}, f, indent=2)
+    with open(REPORTS_DIR / "metrics.json", "w") as f:
+        json.dump({"rmse": rmse}, f, indent=2)
 
     pd.DataFrame({"y_true": y_test, "y_pred": preds}).to_csv(REPORTS_DIR / "test_predictions.csv", index=False)
-    return {"model_path": str(MODEL_DIR / default_model_name), "metrics": {"rmse": float(rmse)}}
+    return {"model_path": str(MODEL_DIR / default_model_name), "metrics": {"rmse": rmse}}
+
+# --- Incremental training ---
+def _watermark_path(model_name):
+    return MODEL_DIR / f"{model_name}.watermark.json"
+
+def load_watermark(model_name="model_v1.pkl"):
+    """Which rows of which data file the saved model has already seen, or None."""
+    try:
+        with open(_watermark_path(model_name)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_watermark(model_name, data_path, rows_consumed, mode):
+    path = _watermark_path(model_name)
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "model": model_name,
+            "source": str(Path(data_path).resolve()),
+            "rows_consumed": int(rows_consumed),
+            "mode": mode,
+            "updated_at": pd.Timestamp.now(tz="UTC").isoformat(),
+        }, f, indent=2)
+    os.replace(tmp_path, path)
+    return str(path)
+
+def train_incremental(model_name="model_v1.pkl", data_path=None, n_new_trees=10,
+                      holdout_size=0.2, compare_full=False):
+    """
+    Updates a saved model with only the rows appended to the data file since
+    its watermark, instead of retraining from scratch.
+
+    RandomForest models get `n_new_trees` extra trees (warm_start) fitted on
+    the new rows; SGD pipelines are updated with partial_fit. A slice of the
+    new rows is held out to report RMSE before/after the update; with
+    compare_full=True a from-scratch model on all other rows is scored on the
+    same holdout. Results go to metrics.json under "incremental", next to the
+    full-retrain "rmse".
+    """
+    data_path = Path(data_path or default_data_path())
+    watermark = load_watermark(model_name)
+    if watermark is None:
+        raise FileNotFoundError(f"No watermark for {model_name}; run train_and_save first")
+    if watermark["source"] != str(data_path.resolve()):
+        raise ValueError(f"{model_name} was trained on {watermark['source']}, not {data_path}")
+
+    start = watermark["rows_consumed"]
+    X_new, y_new = prepare_data(data_path, start_row=start)
+    if len(X_new) == 0:
+        return {"model_path": str(MODEL_DIR / model_name), "rows_new": 0, "rows_consumed": start}
+    if len(X_new) >= 5 and holdout_size:
+        X_fit, X_hold, y_fit, y_hold = train_test_split(X_new, y_new, test_size=holdout_size, random_state=42)
+    else:  # too few rows to hold any out
+        X_fit, y_fit, X_hold, y_hold = X_new, y_new, X_new.iloc[:0], y_new.iloc[:0]
+
+    model = load_model(model_name, use_cache=False)  # private copy; the served one stays untouched
+    rmse_before = _rmse(y_hold, model.predict(X_hold)) if len(X_hold) else None
+
+    if isinstance(model, RandomForestRegressor):
+        mode = "warm_start"
+        model.set_params(warm_start=True, n_estimators=model.n_estimators + n_new_trees)
+        model.fit(X_fit, y_fit)  # only the added trees are fitted, on the new rows
+    elif isinstance(model, Pipeline) and isinstance(model[-1], SGDRegressor):
+        mode = "partial_fit"
+        model[0].partial_fit(X_fit)  # running mean/var over all rows seen so far
+        model[-1].partial_fit(model[:-1].transform(X_fit), y_fit)
+    else:
+        raise TypeError(f"{type(model).__name__} supports neither warm_start nor partial_fit")
+
+    rmse_after = _rmse(y_hold, model.predict(X_hold)) if len(X_hold) else None
+    save_model(model, model_name)
+    # held-out rows count as consumed: the next run only sees rows appended after this one
+    save_watermark(model_name, data_path, rows_consumed=start + len(X_new), mode=mode)
+
+    report = {
+        "model": model_name,
+        "mode": mode,
+        "rows_previous": start,
+        "rows_new": len(X_new),
+        "rows_consumed": start + len(X_new),
+        "holdout_rows": len(X_hold),
+        "rmse_before": rmse_before,
+        "rmse_after": rmse_after,
+    }
+    if compare_full and len(X_hold):
+        X_all, y_all = prepare_data(data_path)
+        keep = ~X_all.index.isin(X_hold.index + start)  # prepare_data resets the index per read
+        full = make_model("forest" if mode == "warm_start" else "sgd").fit(X_all[keep], y_all[keep])
+        report["rmse_full_retrain"] = _rmse(y_hold, full.predict(X_hold))
+    _update_metrics(incremental=report)
+    return {"model_path": str(MODEL_DIR / model_name), **report}
 
 # --- Prediction ---
-def predict(input_data, model_name="model_v1.pkl"):
-    model = load_model(model_name)
-    if isinstance(input_data, dict):
+@profiled()
+def predict(input_data, model_name="model_v1.pkl", backend=None):
+    """
+    Scores a dict, list of dicts or DataFrame. Inputs are checked against the
+    model's feature schema and written straight into a float64 array in
+    training order; a mismatch raises schema.SchemaError naming each problem.
+    """
+    backend = backend or PREDICT_BACKEND
+    if backend not in PREDICT_BACKENDS:
+        raise ValueError(f"Unknown predict backend {backend!r}; expected one of {PREDICT_BACKENDS}")
+    schema = load_schema(model_name)
+    if schema is not None:
+        X = schema.to_matrix(input_data)
+        get_monitor().record_input(X, schema.names)
+    elif isinstance(input_data, dict):  # model fitted without feature names
         X = pd.DataFrame([input_data])
     elif isinstance(input_data, list):
         X = pd.DataFrame(input_data)
@@ -100,30 +363,75 @@ def predict(input_data, model_name="model_v1.pkl"):
         X = input_data
     else:
         raise ValueError("Input must be dict, list of dicts, or DataFrame")
+    model = None
+    if backend == "flat" or (backend == "auto" and len(X) <= FLAT_MAX_ROWS):
+        try:
+            model = load_flat_model(model_name)
+        except TypeError:
+            if backend == "flat":
+                raise  # auto: not a tree model, use sklearn
+    if model is None:
+        model = load_model(model_name)
+        if schema is not None:
+            # zero-copy view with the training names, which sklearn checks against feature_names_in_
+            X = pd.DataFrame(X, columns=schema.names, copy=False)
     preds = model.predict(X)
     return {"predictions": preds.tolist(), "n": len(preds)}
 
 # --- Plotting ---
-def plot_example(save_path=REPORTS_DIR / "example_plot.png"):
+def _feature_importance_job(name, model=None, names=None):
+    """(cache key, render) for the model's importance chart, or None when it has no importances."""
+    model = model if model is not None else load_model(name)
+    fi = getattr(model, "feature_importances_", None)
+    if fi is None:
+        return None
+    if names is None:
+        schema = load_schema(name)
+        names = schema.names if schema is not None else [f"x{i}" for i in range(len(fi))]
+    st = os.stat(MODEL_DIR / name)
+    # model version (file signature, as in MODEL_CACHE) and the feature names it was fitted on
+    key = plot_key("feature_importances", name, st.st_mtime_ns, st.st_size, *names)
+    return key, lambda: feature_importance_png(names, fi)
+
+def feature_importance_plot(name="model_v1.pkl"):
+    """
+    (etag, png_bytes) of the feature-importance chart, rendered once per model
+    version and then served from memory or REPORTS_DIR/plots. None for models
+    without feature_importances_.
+    """
+    job = _feature_importance_job(name)
+    if job is None:
+        return None
+    key, render = job
+    return key, PLOT_CACHE.get(key, render, REPORTS_DIR / "plots")
+
+def prerender_plots(name="model_v1.pkl", model=None, names=None):
+    """
+    Render the model's plots on a background thread, so the first request
+    finds them ready. Pass the just-fitted model and its feature names to skip
+    reloading them. Returns the thread, or None when there is nothing to plot.
+    """
+    job = _feature_importance_job(name, model, names)
+    if job is None:
+        return None
+    key, render = job
+    thread = threading.Thread(target=PLOT_CACHE.get, args=(key, render, REPORTS_DIR / "plots"),
+                              daemon=True, name=f"prerender-{key}")
+    thread.start()
+    return thread
+
+def plot_example(save_path=None):
+    save_path = Path(save_path) if save_path is not None else REPORTS_DIR / "example_plot.png"
     try:
-        model = load_model()
+        plot = feature_importance_plot()
     except FileNotFoundError:
         train_and_save()
-        model = load_model()
-
-    if hasattr(model, "feature_importances_"):
-        fi = model.feature_importances_
-        X, _ = prepare_data()
-        names = X.columns.tolist()
-        plt.figure(figsize=(10,6))
-        plt.bar(names, fi)
-        plt.xticks(rotation=45, ha="right")
-        plt.title("Feature Importances")
-        plt.tight_layout()
-        plt.savefig(save_path)
-        plt.close()
-        return str(save_path)
-    return None
+        plot = feature_importance_plot()
+
+    if plot is None:
+        return None
+    save_path.write_bytes(plot[1])
+    return str(save_path)
 
 # --- Full analysis orchestrator ---
 def run_full_analysis(force_retrain=False):
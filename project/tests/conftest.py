@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src import utils
+from src.plots import PlotCache
+
+
+def make_loan_book(n=300, seed=0):
+    """Raw loan rows as the project reads them: an id, two numeric features, a text column and the target."""
+    rng = np.random.default_rng(seed)
+    salary = rng.uniform(1000, 5000, n)
+    payment = rng.uniform(100, 800, n)
+    return pd.DataFrame({
+        "ID number": np.arange(n),
+        "Basic Salary": salary,
+        "Payment": payment,
+        "Region": rng.choice(["N", "S"], n),
+        "AFFORDABILITY": salary * 0.3 - payment + rng.normal(0, 10, n),
+    })
+
+
+@pytest.fixture
+def loan_book():
+    return make_loan_book
+
+
+@pytest.fixture
+def model_dirs(tmp_path, monkeypatch):
+    """Models, reports and rendered plots go to tmp_path instead of the repo."""
+    monkeypatch.setattr(utils, "MODEL_DIR", tmp_path)
+    monkeypatch.setattr(utils, "REPORTS_DIR", tmp_path)
+    monkeypatch.setattr(utils, "PLOT_CACHE", PlotCache())
+    return tmp_path
+
+
+@pytest.fixture
+def trained(model_dirs):
+    """model_v1.pkl (and its schema) trained by utils.train_and_save on a small loan book."""
+    make_loan_book(200).to_csv(model_dirs / "loans.csv", index=False)
+    utils.train_and_save(data_path=model_dirs / "loans.csv")
+    return model_dirs
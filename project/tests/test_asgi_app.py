@@ -0,0 +1,78 @@
+import asyncio
+import json
+import threading
+import asgi_app
+
+
+def _call(method, path, body=b"", query=b""):
+    async def run():
+        sent = []
+        scope = {"type": "http", "method": method, "path": path, "query_string": query}
+
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        await asgi_app.app(scope, receive, send)
+        return sent[0]["status"], json.loads(sent[1]["body"])
+    return asyncio.run(run())
+
+
+def test_health_and_unknown_route():
+    assert _call("GET", "/") == (200, {"status": "ok", "service": "model-api"})
+    assert _call("GET", "/nope")[0] == 404
+
+
+def test_predict_runs_on_pool(monkeypatch):
+    monkeypatch.setattr(asgi_app, "predict", lambda payload: {"predictions": [1.0], "n": 1, "seen": payload})
+    status, body = _call("POST", "/predict", json.dumps({"features": {"a": 1}}).encode())
+    assert status == 200
+    assert body["result"]["seen"] == {"a": 1}
+    status, body = _call("GET", "/predict/2.5/x")
+    assert body["result"]["seen"] == {"feat1": 2.5, "feat2": "x"}
+
+
+def test_full_queue_returns_503(monkeypatch):
+    release = threading.Event()
+
+    def slow_predict(payload):
+        release.wait(5)
+        return {"predictions": [0.0], "n": 1}
+
+    monkeypatch.setattr(asgi_app, "predict", slow_predict)
+    monkeypatch.setattr(asgi_app, "PREDICT_MAX_PENDING", 1)
+
+    async def run():
+        statuses = []
+
+        async def one():
+            sent = []
+
+            async def receive():
+                return {"type": "http.request", "body": b'{"a": 1}', "more_body": False}
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {"type": "http", "method": "POST", "path": "/predict", "query_string": b""}
+            await asgi_app.app(scope, receive, send)
+            statuses.append(sent[0]["status"])
+            release.set()
+
+        await asyncio.gather(one(), one())
+        return statuses
+
+    assert sorted(asyncio.run(run())) == [200, 503]
+
+
+def test_malformed_json_is_a_400_like_flask():
+    import app as flask_app
+
+    status, body = _call("POST", "/predict", b'{"features": {"a": 1')
+    response = flask_app.app.test_client().post("/predict", data=b'{"features": {"a": 1',
+                                                content_type="application/json")
+    assert status == response.status_code == 400
+    assert body == response.get_json() == {"status": "error", "message": "Request body is not valid JSON"}
+    assert _call("POST", "/predict", b"\xff\xfe")[0] == 400
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from src import storage, utils
+from src.batch_score import main, score_file
+
+
+@pytest.fixture
+def book(tmp_path, model_dirs, loan_book):
+    df = loan_book(300)
+    path = tmp_path / "book.csv"
+    df.to_csv(path, index=False)
+    X, y = utils.prepare_data(path)
+    model = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, y)
+    utils.save_model(model, "m.pkl")
+    utils.save_schema(X, "m.pkl")
+    return path, model.predict(X)
+
+
+@pytest.mark.parametrize("workers,suffix", [(0, ".csv"), (1, ".parquet")])
+def test_scores_in_order(book, tmp_path, workers, suffix):
+    path, expected = book
+    out = tmp_path / f"scores{suffix}"
+    summary = score_file(path, out, model_name="m.pkl", chunksize=64, workers=workers,
+                         max_in_flight=2, keep=["id_number"])
+    assert (summary["rows"], summary["chunks"]) == (300, 5)
+    assert summary["rows_per_s"] > 0
+    scores = storage.read_table(out)
+    assert scores.columns.tolist() == ["id_number", "prediction"]
+    assert scores["id_number"].tolist() == list(range(300))
+    np.testing.assert_allclose(scores["prediction"], expected)
+
+
+def test_cli(book, tmp_path, capsys):
+    path, _ = book
+    assert main([str(path), str(tmp_path / "cli.csv"), "--model", "m.pkl", "--model-dir", str(tmp_path),
+                 "--workers", "0"]) == 0
+    assert '"rows": 300' in capsys.readouterr().out
+
+
+def test_failed_model_load_restores_model_dir(book, tmp_path, monkeypatch):
+    path, _ = book
+    def broken(*args, **kwargs):
+        raise OSError("corrupt model file")
+    monkeypatch.setattr(utils, "load_model", broken)
+    caller_dir = tmp_path / "elsewhere"
+    monkeypatch.setattr(utils, "MODEL_DIR", caller_dir)
+    with pytest.raises(OSError):
+        score_file(path, tmp_path / "out.csv", model_name="m.pkl", model_dir=tmp_path, workers=0)
+    assert utils.MODEL_DIR == caller_dir
@@ -0,0 +1,62 @@
+import threading
+import pytest
+from src.batching import MicroBatcher
+from src.schema import SchemaError
+
+
+def test_concurrent_requests_are_coalesced():
+    calls = []
+
+    def predict_fn(X):
+        calls.append(len(X))
+        return (X["a"] * 10).tolist()
+
+    batcher = MicroBatcher(predict_fn, max_batch_rows=64, max_wait_ms=50)
+    results = {}
+
+    def worker(i):
+        results[i] = batcher.submit({"a": i})
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    assert results == {i: [i * 10] for i in range(8)}
+    assert sum(calls) == 8
+    assert len(calls) < 8
+    stats = batcher.stats()
+    assert stats["batch_rows"]["count"] == len(calls)
+    assert stats["queue_wait_ms"]["count"] == 8
+
+
+def test_failing_request_does_not_poison_batch():
+    def predict_fn(X):
+        if (X["a"] < 0).any():
+            raise ValueError("negative")
+        return X["a"].tolist()
+
+    batcher = MicroBatcher(predict_fn, max_wait_ms=50)
+    good = batcher.submit_async([{"a": 1}, {"a": 2}])
+    bad = batcher.submit_async({"a": -1})
+    assert good.result(timeout=5) == [1, 2]
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
+    batcher.close()
+
+
+@pytest.mark.parametrize("payload", [[], [1, 2], [{"a": 1}, "b"]])
+def test_bad_payload_is_a_schema_error_and_a_400(payload):
+    batcher = MicroBatcher(lambda X: [0.0] * len(X), max_wait_ms=1)
+    try:
+        with pytest.raises(SchemaError):
+            batcher.submit(payload)
+    finally:
+        batcher.close()
+
+    import app as flask_app
+    response = flask_app.app.test_client().post("/predict", json={"features": payload})
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
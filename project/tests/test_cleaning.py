@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.cleaning import clean_loans, clean_loans_streaming
+
+
+def _raw_loans(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+
+    def with_gaps(values, frac=0.1):
+        values = pd.Series(values, dtype=object if isinstance(values[0], str) else None)
+        values[rng.random(n) < frac] = np.nan
+        return values
+
+    dates = pd.date_range("2019-01-01", periods=n, freq="D").strftime("%Y-%m-%d").to_numpy()
+    return pd.DataFrame({
+        "Loan_ID": [f"L{i}" for i in range(n)],
+        "Tenure": with_gaps(rng.integers(1, 60, n).astype(float)),
+        "LoanDate": with_gaps(dates),
+        "DisbursementDate": with_gaps(dates),
+        "LastPaymentDate": with_gaps(dates),
+        "RetirementDate": with_gaps(dates),
+        "LoanAmount": with_gaps(rng.uniform(1e3, 1e5, n)),
+        "DisbursementAmount": with_gaps(rng.uniform(1e3, 1e5, n)),
+        "Instalment": with_gaps(rng.uniform(50, 5e3, n)),
+        "PrincipalBalance": with_gaps(rng.uniform(0, 1e5, n)),
+        "LoanStatus": with_gaps(rng.choice(["Active", "Closed"], n)),
+        "LoanPurpose": with_gaps(rng.choice(["School", "Home", "Car"], n)),
+        "InterestRate": with_gaps(rng.choice([12.0, 14.5, 18.0, 21.0], n), frac=0.3),
+        "IsNPL": with_gaps(rng.integers(0, 2, n).astype(float), frac=0.05),
+    })
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_streaming_matches_in_memory(tmp_path, suffix):
+    if suffix == ".parquet":
+        pytest.importorskip("pyarrow")
+    src = tmp_path / "raw.csv"
+    _raw_loans().to_csv(src, index=False)
+
+    expected = clean_loans(pd.read_csv(src)).reset_index(drop=True)
+    dst = tmp_path / f"clean{suffix}"
+    info = clean_loans_streaming(src, dst, chunksize=97)
+
+    if suffix == ".csv":
+        got = pd.read_csv(dst, parse_dates=["LoanDate", "DisbursementDate", "LastPaymentDate", "RetirementDate"])
+    else:
+        got = pd.read_parquet(dst)
+    assert info["rows_out"] == len(expected)
+    assert info["interest_rate_median"] == pd.read_csv(src)["InterestRate"].median()
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+def test_streaming_parquet_widens_types_that_change_between_chunks(tmp_path):
+    pytest.importorskip("pyarrow")
+    df = _raw_loans()
+    # written as whole numbers (int64 in read_csv's early chunks), with decimals from row 800 on
+    df["Tenure"] = pd.Series([i % 60 if i < 800 else i % 60 + 0.5 for i in range(len(df))], dtype=object)
+    df.loc[:300, "LastPaymentDate"] = np.nan  # all-null in the first chunks
+    src = tmp_path / "raw.csv"
+    df.to_csv(src, index=False)
+
+    expected = clean_loans(pd.read_csv(src)).reset_index(drop=True)
+    clean_loans_streaming(src, tmp_path / "clean.parquet", chunksize=97)
+    got = pd.read_parquet(tmp_path / "clean.parquet")
+    assert got["Tenure"].dtype == "float64"
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["clean.parquet", "raw.csv"]  # parts removed
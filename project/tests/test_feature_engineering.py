@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import feature_engineering as fe
+from src.feature_engineering import FeatureEngine, add_loan_features, safe_divide
+
+
+def _loans(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "LoanAmount": rng.uniform(1_000, 50_000, n).round(2),
+        "PrincipalBalance": rng.uniform(0, 1_000, n).round(2),
+        "Basic Salary": rng.lognormal(8, 0.5, n).round(2),
+    })
+
+
+def test_matches_the_original_formulas_without_mutating_input():
+    df = _loans()
+    before = df.copy()
+    out = add_loan_features(df)
+    pd.testing.assert_frame_equal(df, before)
+    np.testing.assert_allclose(out["DebtToIncome"], df["LoanAmount"] / df["Basic Salary"])
+    np.testing.assert_allclose(out["PrincipalPaidPct"],
+                               (df["LoanAmount"] - df["PrincipalBalance"]) / df["LoanAmount"])
+    expected = (df["Basic Salary"] > df["Basic Salary"].quantile(0.75)).astype(int)
+    pd.testing.assert_series_equal(out["HighSalaryFlag"], expected, check_names=False)
+
+
+def test_zero_denominators_give_nan_not_inf():
+    np.testing.assert_array_equal(safe_divide([1.0, 0.0, 2.0, 3.0], [0.0, 0.0, np.nan, 2.0]),
+                                  [np.nan, np.nan, np.nan, 1.5])
+    row = pd.DataFrame({"LoanAmount": [0.0], "PrincipalBalance": [0.0], "Basic Salary": [0.0]})
+    out = FeatureEngine().fit(_loans()).transform(row)
+    assert out[["DebtToIncome", "PrincipalPaidPct"]].isna().all(axis=None)
+
+
+def test_single_row_scoring_uses_fitted_quantile(tmp_path):
+    train = _loans()
+    engine = FeatureEngine().fit(train)
+    q75 = train["Basic Salary"].quantile(0.75)
+    assert engine.stats_["HighSalaryFlag"]["q75"] == pytest.approx(q75)
+
+    restored = FeatureEngine.load(engine.save(tmp_path / "features.json"))
+    row = train.iloc[[0]].assign(**{"Basic Salary": q75 + 1})
+    assert restored.transform(row)["HighSalaryFlag"].iloc[0] == 1
+    with pytest.raises(RuntimeError):
+        FeatureEngine().transform(row)
+
+
+def test_disk_cache_recomputes_only_changed_features(tmp_path, monkeypatch):
+    monkeypatch.setattr(fe, "CACHE_MIN_ROWS", 0)
+    df = _loans()
+    engine = FeatureEngine(cache_dir=tmp_path).fit(df)
+    first = engine.transform(df)
+    assert (engine.cache_hits, engine.cache_misses) == (0, 3)
+
+    pd.testing.assert_frame_equal(engine.transform(df), first)
+    assert (engine.cache_hits, engine.cache_misses) == (3, 3)
+
+    changed = df.assign(PrincipalBalance=df["PrincipalBalance"] + 1)
+    out = engine.transform(changed)
+    assert (engine.cache_hits, engine.cache_misses) == (5, 4)  # only PrincipalPaidPct recomputed
+    np.testing.assert_allclose(out["PrincipalPaidPct"],
+                               (changed["LoanAmount"] - changed["PrincipalBalance"]) / changed["LoanAmount"])
+
+    monkeypatch.setattr(fe.FEATURES["DebtToIncome"], "version", 2)
+    engine.transform(df)
+    assert engine.cache_misses == 5  # a new definition version is not served from the old file
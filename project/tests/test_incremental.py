@@ -0,0 +1,29 @@
+import json
+
+import pytest
+from src import utils
+
+
+@pytest.mark.parametrize("kind,mode", [("forest", "warm_start"), ("sgd", "partial_fit")])
+def test_incremental_consumes_only_new_rows(model_dirs, loan_book, kind, mode):
+    csv = model_dirs / "loans.csv"
+    loan_book(200, seed=0).to_csv(csv, index=False)
+    utils.train_and_save("m.pkl", data_path=csv, model_kind=kind)
+    assert utils.load_watermark("m.pkl")["rows_consumed"] == 200
+
+    loan_book(50, seed=1).to_csv(csv, mode="a", header=False, index=False)
+    result = utils.train_incremental("m.pkl", data_path=csv, n_new_trees=5)
+    assert (result["mode"], result["rows_new"], result["rows_consumed"]) == (mode, 50, 250)
+    if kind == "forest":
+        assert len(utils.load_model("m.pkl").estimators_) == 105
+
+    metrics = json.loads((model_dirs / "metrics.json").read_text())
+    assert "rmse" in metrics and metrics["incremental"]["rmse_after"] is not None
+
+    # nothing appended since: the model is left alone
+    assert utils.train_incremental("m.pkl", data_path=csv)["rows_new"] == 0
+
+
+def test_incremental_requires_watermark(model_dirs):
+    with pytest.raises(FileNotFoundError):
+        utils.train_incremental("missing.pkl", data_path=model_dirs / "loans.csv")
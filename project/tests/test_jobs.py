@@ -0,0 +1,45 @@
+import math
+import time
+from src.jobs import JobQueue
+
+
+def _wait(jobs, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = jobs.status(job_id)["status"]
+        if status in ("succeeded", "failed"):
+            return status
+        time.sleep(0.05)
+    raise TimeoutError(job_id)
+
+
+def test_duplicate_submissions_share_a_job():
+    jobs = JobQueue(max_workers=1)
+    try:
+        first, created = jobs.submit(time.sleep, 0.5, dedupe_key="sleep")
+        second, created_again = jobs.submit(time.sleep, 0.5, dedupe_key="sleep")
+        assert created and not created_again
+        assert first == second
+        assert _wait(jobs, first) == "succeeded"
+        # once finished, the key is free again
+        third, created = jobs.submit(time.sleep, 0, dedupe_key="sleep")
+        assert created and third != first
+        _wait(jobs, third)
+    finally:
+        jobs.shutdown()
+
+
+def test_result_and_failure_are_recorded():
+    swapped = []
+    jobs = JobQueue(max_workers=1)
+    try:
+        ok, _ = jobs.submit(math.sqrt, 16.0, on_success=swapped.append)
+        bad, _ = jobs.submit(math.sqrt, -1.0)
+        assert _wait(jobs, ok) == "succeeded"
+        assert jobs.result(ok) == 4.0
+        assert swapped == [4.0]
+        assert _wait(jobs, bad) == "failed"
+        assert "ValueError" in jobs.status(bad)["error"]
+        assert jobs.status("missing") is None
+    finally:
+        jobs.shutdown()
@@ -0,0 +1,72 @@
+import os
+import threading
+import joblib
+import pytest
+from src import utils
+from src.model_cache import ModelCache
+
+
+def test_cache_hits_and_reloads_on_change(tmp_path):
+    cache = ModelCache(maxsize=2)
+    path = tmp_path / "m.pkl"
+    joblib.dump({"v": 1}, path)
+
+    assert cache.get(path, joblib.load) == {"v": 1}
+    assert cache.get(path, joblib.load) == {"v": 1}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    joblib.dump({"v": 2, "pad": "x" * 100}, path)
+    assert cache.get(path, joblib.load)["v"] == 2
+    assert cache.misses == 2
+
+
+def test_cache_is_bounded_lru(tmp_path):
+    cache = ModelCache(maxsize=2)
+    paths = []
+    for i in range(3):
+        p = tmp_path / f"m{i}.pkl"
+        joblib.dump(i, p)
+        paths.append(p)
+        cache.get(p, joblib.load)
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    assert str(paths[0].resolve()) not in stats["models"]
+
+
+def test_save_model_invalidates_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "MODEL_DIR", tmp_path)
+    utils.save_model({"v": 1}, "m.pkl")
+    assert utils.load_model("m.pkl") == {"v": 1}
+    old = os.stat(tmp_path / "m.pkl")
+
+    utils.save_model({"v": 2}, "m.pkl")
+    # restore the old mtime (same size) so only the explicit invalidation can force a reload
+    os.utime(tmp_path / "m.pkl", ns=(old.st_atime_ns, old.st_mtime_ns))
+    assert utils.load_model("m.pkl") == {"v": 2}
+
+
+def test_missing_model_raises(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "MODEL_DIR", tmp_path)
+    with pytest.raises(FileNotFoundError):
+        utils.load_model("nope.pkl")
+
+
+def test_concurrent_saves_use_separate_tmp_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "MODEL_DIR", tmp_path)
+    errors = []
+
+    def save(i):
+        try:
+            utils.save_model({"v": i, "pad": "x" * 200_000}, "m.pkl")
+        except Exception as e:  # a shared tmp file is renamed away under the other writers
+            errors.append(e)
+
+    threads = [threading.Thread(target=save, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert utils.load_model("m.pkl", use_cache=False)["v"] in range(6)
+    assert [p.name for p in tmp_path.iterdir()] == ["m.pkl"]
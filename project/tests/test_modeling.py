@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, RegressorMixin, clone
+from sklearn.linear_model import LinearRegression
+
+from src.modeling import fit_and_report, linear_coeff_table, make_model_pipeline, make_preprocessor, try_baselines
+
+NUM, CAT = ["salary", "age"], ["region"]
+
+
+def _frame(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "salary": rng.lognormal(8, 0.5, n),
+        "age": rng.integers(18, 70, n).astype(float),
+        # N/S/E common, X and Y rare (5 rows each)
+        "region": np.r_[rng.choice(["N", "S", "E"], n - 10), ["X"] * 5, ["Y"] * 5],
+    })
+    y = df["salary"] * 0.01 + df["age"] + (df["region"] == "N") * 5 + rng.normal(0, 1, n)
+    return df, y
+
+
+class _RecordingRegressor(RegressorMixin, BaseEstimator):
+    # LinearRegression that remembers what the pipeline handed to fit()
+    def fit(self, X, y):
+        self.X_seen_ = X
+        self.model_ = LinearRegression().fit(X, y)
+        self.coef_ = self.model_.coef_
+        return self
+
+    def predict(self, X):
+        return self.model_.predict(X)
+
+
+def test_sparse_preprocessor_feeds_csr_to_linear_model():
+    df, y = _frame()
+    pipe = make_model_pipeline(_RecordingRegressor(), NUM, CAT, sparse=True).fit(df, y)
+    X_seen = pipe.named_steps["model"].X_seen_
+    assert sp.issparse(X_seen) and X_seen.format == "csr"
+    dense = make_model_pipeline(LinearRegression(), NUM, CAT).fit(df, y)
+    np.testing.assert_allclose(pipe.predict(df), dense.predict(df), rtol=1e-6)
+
+
+def test_rare_categories_share_the_infrequent_column():
+    df, y = _frame()
+    pre = make_preprocessor(NUM, CAT, min_frequency=20).fit(df, y)
+    assert pre.transform(df).shape[1] == len(NUM) + 4  # E, N, S + one infrequent bucket
+    pipe = make_model_pipeline(LinearRegression(), NUM, CAT, min_frequency=20).fit(df, y)
+    table = linear_coeff_table(pipe)
+    assert sorted(table["feature"]) == sorted(NUM + ["region_E", "region_N", "region_S", "region_infrequent_sklearn"])
+
+    rows = pre.transform(pd.DataFrame({"salary": [1.0] * 3, "age": [30.0] * 3, "region": ["X", "Y", "unseen"]}))
+    assert rows[:, -1].tolist() == [1.0, 1.0, 1.0]  # unseen levels join the bucket too
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_hashing_output_has_requested_width(sparse):
+    df, y = _frame()
+    pre = make_preprocessor(NUM, CAT, sparse=sparse, hashing_n_features=16).fit(df, y)
+    out = pre.transform(df)
+    assert out.shape == (len(df), len(NUM) + 16)
+    assert sp.issparse(out) == sparse
+    pipe = make_model_pipeline(LinearRegression(), NUM, CAT, hashing_n_features=16).fit(df, y)
+    table = linear_coeff_table(pipe)
+    assert len(table) == len(NUM) + 16
+    assert set(table["feature"]) == set(NUM) | {f"hash_{i}" for i in range(16)}
+
+
+def test_try_baselines_matches_fit_and_report():
+    df, y = _frame(n=300)
+    X_train, X_test, y_train, y_test = df.iloc[:220], df.iloc[220:], y.iloc[:220], y.iloc[220:]
+    metrics_df, fitted = try_baselines(X_train, y_train, X_test, y_test, NUM, CAT, n_jobs=2)
+    assert fitted["RandomForest"][0].named_steps["model"].n_jobs == 1  # no nested pools
+
+    candidates = {name: clone(pipe.named_steps["model"]) for name, (pipe, _) in fitted.items()}
+    for name, model in candidates.items():
+        _, _, expected, yhat = fit_and_report(name, model, X_train, y_train, X_test, y_test, NUM, CAT)
+        row = metrics_df.set_index("model").loc[name]
+        for k in ("MAE", "RMSE", "R2"):
+            assert row[k] == pytest.approx(expected[k], rel=1e-9)
+        np.testing.assert_allclose(fitted[name][1], yhat, rtol=1e-9)
+
+
+def test_try_baselines_pipelines_do_not_share_a_preprocessor():
+    df, y = _frame(n=300)
+    _, fitted = try_baselines(df.iloc[:220], y.iloc[:220], df.iloc[220:], y.iloc[220:], NUM, CAT, n_jobs=1)
+    ridge = fitted["RidgeCV"][0]
+    before = ridge.predict(df.iloc[220:])
+    other, y_other = _frame(n=300, seed=5)
+    fitted["Linear"][0].fit(other.assign(salary=other["salary"] * 10), y_other)  # new scaler statistics
+    np.testing.assert_array_equal(ridge.predict(df.iloc[220:]), before)
@@ -0,0 +1,105 @@
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src import monitoring
+from src.monitoring import Monitor, RollingHistogram, RollingSum, read_aggregates
+
+
+def test_rolling_sum_forgets_old_buckets():
+    r = RollingSum(window_s=60, n_buckets=6)
+    r.add(10.0, now=0)
+    r.add(2.0, count=2, now=30)
+    assert r.totals(now=30) == (12.0, 3.0)
+    assert r.totals(now=65) == (2.0, 2.0)  # the bucket at t=0 has aged out
+    assert r.mean(now=200) is None
+
+
+def test_histogram_percentile_within_bin_precision():
+    rng = np.random.default_rng(0)
+    lat = rng.lognormal(3, 1, 20_000)
+    h = RollingHistogram(window_s=60)
+    for v in lat:
+        h.add(v, now=10)
+    assert h.percentile(95, now=10) == pytest.approx(np.percentile(lat, 95), rel=0.04)
+    assert h.percentile(50, now=10) == pytest.approx(np.percentile(lat, 50), rel=0.04)
+
+
+def test_state_roundtrip_and_merge():
+    a, b = RollingHistogram(window_s=60), RollingHistogram(window_s=60)
+    for v in (1.0, 2.0, 3.0):
+        a.add(v, now=5)
+    b.add(100.0, now=5)
+    b.add(50.0, now=50)
+    merged = RollingHistogram.from_state(a.to_state()).merge(RollingHistogram.from_state(b.to_state()))
+    assert merged.totals(now=50) == (156.0, 5.0)
+    assert merged.percentile(100, now=50) == pytest.approx(100.0, rel=0.04)
+
+
+def test_monitors_in_two_processes_share_the_aggregates(tmp_path):
+    db = tmp_path / "mon.sqlite"
+    api = Monitor(db, source="api", max_events=5, flush_s=0)
+    batch = Monitor(db, source="batch", max_events=5, flush_s=0)
+    for ms in (10.0, 20.0, 30.0):
+        api.record_request(ms)
+    api.record_request(1000.0, ok=False)
+    batch.record_input(np.array([[1.0, np.nan], [3.0, 4.0]]), ["a", "b"])
+    batch.record_outcomes([10.0, 20.0, np.nan], [12.0, 16.0, 5.0])
+    batch.record_data_timestamp(1_000.0)
+    batch.flush(force=True)
+    api.flush(force=True)  # api's flush now sees batch's state too
+
+    agg = read_aggregates(db, now=1_000.0 + 120)
+    assert agg["requests"] == 4
+    assert agg["error_rate"] == pytest.approx(0.25)
+    assert agg["p95_latency_ms"] == pytest.approx(1000.0, rel=0.04)
+    assert agg["null_rate"] == pytest.approx(0.25)
+    assert agg["rolling_mae"] == pytest.approx(3.0)
+    assert agg["schema_hash"] == monitoring.schema_hash(["a", "b"])
+    assert agg["freshness_minutes"] == pytest.approx(2.0)
+
+    with sqlite3.connect(db) as con:
+        assert con.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 5  # oldest dropped
+
+
+def test_disabled_without_monitoring_db(monkeypatch):
+    monkeypatch.delenv("MONITORING_DB", raising=False)
+    m = monitoring.get_monitor()
+    assert m.record_request(5.0) is None
+    assert m.flush(force=True) is None
+
+
+def test_background_thread_flushes_off_the_request_path(tmp_path):
+    db = tmp_path / "mon.sqlite"
+    m = Monitor(db, source="api", flush_s=0.2)
+    try:
+        m.record_request(12.0)
+        assert not db.exists()  # recording never touches SQLite
+        for _ in range(100):
+            time.sleep(0.05)
+            try:
+                if read_aggregates(db).get("requests") == 1:
+                    break
+            except sqlite3.OperationalError:  # first flush still creating the file
+                pass
+        assert read_aggregates(db)["requests"] == 1
+    finally:
+        m.close()
+    assert not m._thread.is_alive()
+
+
+def test_concurrent_flushes_write_once_per_interval(tmp_path):
+    m = Monitor(tmp_path / "mon.sqlite", flush_s=0)
+    m.flush_s = 60.0
+    m._last_flush = time.monotonic() - 61
+    m.record_request(5.0)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(m.flush())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(results) == [False] * 7 + [True]
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.outliers import detect_outliers_iqr, winsorize_iqr, remove_outliers_iqr
+
+
+def _frame(n=500, seed=1):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "salary": rng.lognormal(8, 0.8, n),
+        "age": rng.integers(18, 70, n),
+        "amount": rng.standard_t(2, n) * 1000,
+        "text_num": rng.normal(0, 1, n).round(3).astype(str),
+        "region": rng.choice(["N", "S"], n),
+    })
+    df.loc[rng.choice(n, 25), "salary"] = np.nan
+    df.loc[3, "text_num"] = "n/a"
+    return df
+
+
+@pytest.mark.parametrize("cols", [None, ["salary", "amount", "text_num"]])
+def test_numpy_engine_matches_pandas_engine(cols):
+    df = _frame()
+    mask_np, table_np = detect_outliers_iqr(df, cols=cols, engine="numpy")
+    mask_pd, table_pd = detect_outliers_iqr(df, cols=cols, engine="pandas")
+    pd.testing.assert_series_equal(mask_np, mask_pd)
+    pd.testing.assert_frame_equal(table_np.reset_index(drop=True), table_pd.reset_index(drop=True))
+
+    pd.testing.assert_frame_equal(winsorize_iqr(df, cols=cols, engine="numpy"),
+                                  winsorize_iqr(df, cols=cols, engine="pandas"))
+    pd.testing.assert_frame_equal(remove_outliers_iqr(df, cols=cols, engine="numpy"),
+                                  remove_outliers_iqr(df, cols=cols, engine="pandas"))
+
+
+def test_inplace_winsorize_matches_copying_path():
+    df = _frame()
+    expected = winsorize_iqr(df, engine="pandas")
+    out = winsorize_iqr(df, engine="numpy", inplace=True)
+    assert out is df
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_winsorizer_reuses_training_bounds():
+    import pickle
+    from sklearn.linear_model import LinearRegression
+    from src.modeling import make_model_pipeline
+    from src.outliers import IQRWinsorizer
+
+    train = _frame()
+    w = IQRWinsorizer(cols=["salary", "amount"]).fit(train)
+    pd.testing.assert_frame_equal(w.transform(train), winsorize_iqr(train, cols=["salary", "amount"]))
+
+    row = pd.DataFrame({"salary": [1e9], "age": [30], "amount": [-1e9], "text_num": ["0"], "region": ["N"]})
+    out = w.transform(row)
+    assert out.loc[0, "salary"] == w.upper_[0]
+    assert out.loc[0, "amount"] == w.lower_[1]
+
+    pipe = make_model_pipeline(LinearRegression(), ["salary", "age", "amount"], ["region"], winsorize_k=1.5)
+    y = train["age"] * 2.0
+    pipe.fit(train.fillna(0), y)
+    assert list(pipe.named_steps) == ["winsor", "pre", "model"]
+    restored = pickle.loads(pickle.dumps(pipe))
+    np.testing.assert_allclose(restored.predict(row), pipe.predict(row))
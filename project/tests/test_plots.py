@@ -0,0 +1,54 @@
+import threading
+import time
+
+from src import utils
+from src.plots import PlotCache, feature_importance_png, plot_key
+
+
+def test_cache_renders_once_and_reuses_disk(tmp_path):
+    calls = []
+
+    def render():
+        calls.append(1)
+        time.sleep(0.05)
+        return b"png"
+
+    cache = PlotCache()
+    threads = [threading.Thread(target=cache.get, args=("k", render, tmp_path)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert (tmp_path / "k.png").read_bytes() == b"png"
+
+    fresh = PlotCache()  # e.g. another worker process
+    assert fresh.get("k", render, tmp_path) == b"png"
+    assert len(calls) == 1 and fresh.stats()["disk_hits"] == 1
+
+
+def test_key_changes_with_its_inputs():
+    assert plot_key("fi", "m.pkl", 1, ["a"]) == plot_key("fi", "m.pkl", 1, ["a"])
+    assert plot_key("fi", "m.pkl", 1, ["a"]) != plot_key("fi", "m.pkl", 2, ["a"])
+
+
+def test_feature_importance_png_is_a_png():
+    assert feature_importance_png(["a", "b"], [0.25, 0.75]).startswith(b"\x89PNG")
+
+
+def test_plot_is_prerendered_after_training_and_served_with_etag(trained):
+    import app as flask_app
+
+    for _ in range(100):  # background render started by train_and_save
+        if list((trained / "plots").glob("*.png")):
+            break
+        time.sleep(0.05)
+    assert utils.plot_example(trained / "example.png") == str(trained / "example.png")
+    assert utils.PLOT_CACHE.stats()["renders"] == 1
+
+    client = flask_app.app.test_client()
+    first = client.get("/plots/feature_importances")
+    assert first.status_code == 200 and first.mimetype == "image/png"
+    again = client.get("/plots/feature_importances", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304 and again.data == b""
+    assert utils.PLOT_CACHE.stats()["renders"] == 1
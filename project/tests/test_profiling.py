@@ -0,0 +1,148 @@
+import asyncio
+import json
+import pstats
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import profiling
+from src.profiling import STAGES, profiled, stage
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    STAGES.reset()
+    yield
+    profiling.set_enabled(True, trace_memory=False)
+    STAGES.reset()
+
+
+def test_decorator_records_time_and_rows():
+    @profiled("load")
+    def load(n):
+        return pd.DataFrame({"a": np.arange(n)}), None
+
+    load(10)
+    load(5)
+    s = STAGES.snapshot()["load"]
+    assert s["calls"] == 2 and s["rows"] == 15 and s["errors"] == 0
+    assert s["wall_seconds"] >= s["wall_seconds_max"] > 0
+    assert s["peak_memory_bytes"] is None  # memory tracing is opt-in
+
+
+def test_errors_are_counted_and_reraised():
+    with pytest.raises(ZeroDivisionError):
+        with stage("boom"):
+            1 / 0
+    assert STAGES.snapshot()["boom"]["errors"] == 1
+
+
+def test_disabled_records_nothing():
+    profiling.set_enabled(False)
+    with stage("off") as s:
+        s.rows = 3
+    profiled("off")(lambda: [1, 2])()
+    assert STAGES.snapshot() == {}
+
+
+def test_nested_peak_memory():
+    profiling.set_enabled(True, trace_memory=True)
+    try:
+        with stage("outer"):
+            with stage("inner"):
+                block = np.ones(2_000_000)  # 16 MB
+                del block
+            small = np.ones(1000)
+    finally:
+        tracemalloc.stop()
+    snap = STAGES.snapshot()
+    assert snap["inner"]["peak_memory_bytes"] >= 16_000_000
+    assert snap["outer"]["peak_memory_bytes"] >= snap["inner"]["peak_memory_bytes"]
+    del small
+
+
+def test_prometheus_text():
+    with stage('http GET /predict/"x"', rows=2):
+        pass
+    text = STAGES.prometheus()
+    assert "# TYPE loan_api_stage_calls_total counter" in text
+    assert 'loan_api_stage_rows_total{stage="http GET /predict/\\"x\\""} 2' in text
+    assert "peak_memory_bytes{" not in text
+
+
+def test_flask_endpoints_and_request_profile(tmp_path, monkeypatch):
+    import app as flask_app
+
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    client = flask_app.app.test_client()
+    assert client.get("/").status_code == 200
+    response = client.get("/?profile=1")
+    again = client.get("/", headers={"X-Profile": "1"})  # same route, same second
+    assert response.headers["X-Profile-File"] != again.headers["X-Profile-File"]
+    assert (tmp_path / response.headers["X-Profile-File"]).exists()
+    assert (tmp_path / again.headers["X-Profile-File"]).exists()
+
+    assert client.get("/metrics/stages").get_json()["http GET /"]["calls"] == 3
+    metrics = client.get("/metrics")
+    assert metrics.mimetype == "text/plain"
+    assert 'loan_api_stage_calls_total{stage="http GET /"} 3' in metrics.get_data(as_text=True)
+
+
+def _functions(pstats_path):
+    return {(Path(file).name, fn) for file, _, fn in pstats.Stats(str(pstats_path)).stats}
+
+
+def _payload():
+    return {"features": {"id_number": 3, "basic_salary": 2500.0, "payment": 300.0}}
+
+
+def test_flask_predict_profile_and_cpu_cover_inference(trained, monkeypatch):
+    import app as flask_app
+
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(trained / "profiles"))
+    client = flask_app.app.test_client()
+    STAGES.reset()
+    assert client.post("/predict", json=_payload()).status_code == 200  # through the micro-batcher
+    profiled_response = client.post("/predict?profile=1", json=_payload())
+    assert profiled_response.status_code == 200
+    dump = trained / "profiles" / profiled_response.headers["X-Profile-File"]
+    assert ("utils.py", "predict") in _functions(dump)
+
+    snap = STAGES.snapshot()
+    assert snap["http POST /predict"]["calls"] == 2
+    # the batched request's share of the batch counts toward its own CPU time
+    assert snap["http POST /predict"]["cpu_seconds"] >= snap["utils.predict"]["cpu_seconds"]
+
+
+def test_asgi_records_stages_and_profiles_pool_work(trained, monkeypatch):
+    import asgi_app
+
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(trained / "profiles"))
+
+    async def call(query):
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": json.dumps(_payload()).encode(), "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        await asgi_app.app({"type": "http", "method": "POST", "path": "/predict", "query_string": query},
+                           receive, send)
+        return sent[0]
+
+    STAGES.reset()
+    plain = asyncio.run(call(b""))
+    start = asyncio.run(call(b"profile=1"))
+    assert plain["status"] == start["status"] == 200
+    assert b"x-profile-file" not in dict(plain["headers"])
+    dump = trained / "profiles" / dict(start["headers"])[b"x-profile-file"].decode()
+    assert ("utils.py", "predict") in _functions(dump)
+
+    snap = STAGES.snapshot()
+    assert snap["http POST /predict"]["calls"] == 2
+    assert snap["http POST /predict"]["cpu_seconds"] >= snap["utils.predict"]["cpu_seconds"]
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from src import utils
+from src.schema import FeatureSchema, SchemaError
+
+SCHEMA = FeatureSchema(["age", "salary", "tenure"])
+
+
+def test_rows_are_written_in_training_order():
+    X = SCHEMA.to_matrix([
+        {"tenure": 3, "age": 30, "salary": "5000.5"},
+        {"salary": 1.0, "tenure": None, "age": True},
+    ])
+    assert X.dtype == np.float64
+    np.testing.assert_array_equal(X[0], [30, 5000.5, 3])
+    assert X[1, 0] == 1.0 and np.isnan(X[1, 2])
+    frame = pd.DataFrame({"salary": [1.0], "tenure": [2], "age": [3]})
+    np.testing.assert_array_equal(SCHEMA.to_matrix(frame), [[3, 1.0, 2]])
+
+
+def test_errors_name_every_problem():
+    with pytest.raises(SchemaError) as exc:
+        SCHEMA.to_matrix([{"age": 1, "salary": 2, "tenure": 3}, {"age": "abc", "salary": 2, "bonus": 1}])
+    assert exc.value.errors == [
+        "row 1: missing feature 'tenure'",
+        "row 1: unknown feature 'bonus'",
+        "row 1: feature 'age' expects a number, got 'abc'",
+    ]
+    assert FeatureSchema(SCHEMA.names, extra="ignore").to_matrix({"age": 1, "salary": 2, "tenure": 3, "x": 0}).shape == (1, 3)
+    with pytest.raises(SchemaError):
+        SCHEMA.to_matrix([])
+
+
+def test_predict_uses_saved_schema(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "MODEL_DIR", tmp_path)
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(100, 3)), columns=SCHEMA.names)
+    y = X["age"] * 2 + rng.normal(size=100)
+    model = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, y)
+    utils.save_model(model, "m.pkl")
+    utils.save_schema(X, "m.pkl")
+    assert utils.load_schema("m.pkl").dtypes == {c: "float64" for c in SCHEMA.names}
+
+    rows = [{c: row[c] for c in reversed(SCHEMA.names)} for row in X.head(4).to_dict(orient="records")]
+    for backend in ("sklearn", "flat"):
+        assert utils.predict(rows, "m.pkl", backend=backend)["predictions"] == model.predict(X.head(4)).tolist()
+    with pytest.raises(SchemaError, match="missing feature 'tenure'"):
+        utils.predict({"age": 1, "salary": 2}, "m.pkl")
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.outliers import detect_outliers_iqr, summarize_outliers
+from src.sketches import QuantileSketch, sketch_columns, merge_sketch_columns, save_sketches, load_sketches
+
+QS = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+
+
+@pytest.mark.parametrize("accuracy", [0.01, 0.05])
+def test_sketch_within_error_bound_of_exact_quantiles(accuracy):
+    rng = np.random.default_rng(0)
+    x = np.concatenate([rng.lognormal(8, 1.0, 50_000), -rng.lognormal(2, 0.5, 5_000), np.zeros(100)])
+    sk = QuantileSketch(relative_accuracy=accuracy)
+    for chunk in np.array_split(x, 7):
+        sk.update(chunk)
+    exact = pd.Series(x).quantile(QS).to_numpy()
+    approx = np.array(sk.quantiles(QS))
+    assert np.all(np.abs(approx - exact) <= accuracy * np.abs(exact) + 1e-12)
+
+
+def test_merge_and_persist_are_exact(tmp_path):
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({"a": rng.normal(100, 10, 4000), "b": rng.exponential(5, 4000)})
+    df.loc[::50, "a"] = np.nan
+    whole = sketch_columns([df], ["a", "b"])
+    halves = merge_sketch_columns(sketch_columns([df.iloc[:1500]], ["a", "b"]),
+                                  sketch_columns([df.iloc[1500:]], ["a", "b"]))
+    path = tmp_path / "sketches.json"
+    save_sketches(halves, path)
+    restored = load_sketches(path)
+    for c in ["a", "b"]:
+        assert restored[c].to_dict() == whole[c].to_dict()
+
+
+def test_detect_outliers_with_sketch_backend():
+    rng = np.random.default_rng(2)
+    history = pd.DataFrame({"salary": rng.lognormal(8, 0.5, 20_000)})
+    sketches = sketch_columns([history], ["salary"], relative_accuracy=0.005)
+
+    _, exact = detect_outliers_iqr(history)
+    approx = summarize_outliers(history, sketches=sketches)
+    assert approx["n_outliers"].iloc[0] == pytest.approx(exact["n_outliers"].iloc[0], rel=0.05)
+
+    incoming = pd.DataFrame({"salary": [3000.0, 1e7]})
+    mask, _ = detect_outliers_iqr(incoming, sketches=sketches)
+    assert mask.tolist() == [False, True]
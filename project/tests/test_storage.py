@@ -0,0 +1,133 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from src import storage, utils
+from src.feature_engineering import add_loan_features
+
+pytest.importorskip("pyarrow")
+
+
+def _loans():
+    return pd.DataFrame({
+        "Loan_ID": ["L1", "L2", "L3", "L4"],
+        "LoanDate": ["2021-01-05", "2021-02-10", None, "2021-03-01"],
+        "LoanStatus": ["Active", "Closed", "Active", "Active"],
+        "Basic Salary": [1000.0, 2500.0, 1800.0, 3000.0],
+        "AFFORDABILITY": [100.0, None, 50.0, 75.0],
+    })
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".feather"])
+def test_columnar_roundtrip_keeps_types(tmp_path, suffix):
+    path = tmp_path / f"loans{suffix}"
+    storage.write_table(_loans(), path, category_cols=["LoanStatus"])
+    df = storage.read_table(path)
+    assert pd.api.types.is_datetime64_any_dtype(df["LoanDate"])
+    assert isinstance(df["LoanStatus"].dtype, pd.CategoricalDtype)
+    assert storage.numeric_columns(path) == ["Basic Salary", "AFFORDABILITY"]
+    assert storage.read_table(path, columns=["Basic Salary"]).columns.tolist() == ["Basic Salary"]
+
+
+def test_prepare_data_same_from_csv_and_parquet(tmp_path):
+    csv = tmp_path / "loans.csv"
+    _loans().to_csv(csv, index=False)
+    parquet = tmp_path / "loans.parquet"
+    storage.import_csv(csv, parquet)
+
+    X_csv, y_csv = utils.prepare_data(csv)
+    X_pq, y_pq = utils.prepare_data(parquet)
+    pd.testing.assert_frame_equal(X_csv, X_pq)
+    pd.testing.assert_series_equal(y_csv, y_pq)
+
+
+def test_optimize_dtypes_narrows_without_changing_values():
+    df = pd.DataFrame({
+        "Age": [22, 45, 43, 61],
+        "Tenure": [24.0, 33.0, 12.0, 6.0],
+        "InterestRate": [12.5, None, 14.0, 9.25],
+        "Basic Salary": [3174.37, 2790.42, 4106.03, 1000.0],
+        "LoanStatus": ["Active", "Closed", "Active", "Active"],
+    })
+    out, dtype_map, report = storage.optimize_dtypes(df)
+    assert dtype_map == {"Age": "int16", "Tenure": "int16", "InterestRate": "float32", "LoanStatus": "category"}
+    assert out["Basic Salary"].dtype == "float64"  # cents are not exact in float32
+    pd.testing.assert_frame_equal(out.astype(df.dtypes.to_dict()), df)
+    assert (report["bytes_saved"] > 0).all()
+    assert report.attrs["bytes_after"] < report.attrs["bytes_before"]
+
+
+def test_dtype_map_is_applied_at_read_time(tmp_path):
+    csv = tmp_path / "loans.csv"
+    df = _loans().assign(Age=[30, 41, 52, 25])
+    df.to_csv(csv, index=False)
+    report = storage.optimize_table(csv, dest=tmp_path / "loans.parquet")
+    assert set(report["column"]) == {"Age", "LoanStatus", "Basic Salary", "AFFORDABILITY"}
+    assert storage.dtype_map_path(csv).exists()
+
+    for path in (csv, tmp_path / "loans.parquet"):
+        loaded = storage.read_table(path)
+        assert loaded["Age"].dtype == "int16"
+        assert isinstance(loaded["LoanStatus"].dtype, pd.CategoricalDtype)
+    assert storage.read_table(csv, dtypes=None)["Age"].dtype == "int64"
+
+    # appended rows that no longer fit keep the dtype they were read with
+    pd.concat([df, pd.DataFrame({"Age": [None], "Basic Salary": [1234.5]})]).to_csv(csv, index=False)
+    loaded = storage.read_table(csv)
+    assert loaded["Age"].dtype == "float64"
+    assert loaded["Basic Salary"].dtype == "float64"
+
+
+def test_narrowed_columns_do_not_wrap_in_arithmetic(tmp_path):
+    csv = tmp_path / "loans.csv"
+    df = _loans().assign(Age=[100, 120, 90, 127], LoanAmount=[120, 100, 127, 110])
+    df.to_csv(csv, index=False)
+    storage.optimize_table(csv)
+    loaded = storage.read_table(csv)
+    assert (loaded["Age"] + loaded["Age"]).tolist() == [200, 240, 180, 254]  # would wrap in int8
+    assert (loaded["LoanAmount"] * loaded["Age"]).tolist() == (df["LoanAmount"] * df["Age"]).tolist()
+
+    features = add_loan_features(loaded.assign(PrincipalBalance=[10, 20, 30, 40]))
+    expected = add_loan_features(df.assign(PrincipalBalance=[10, 20, 30, 40]))
+    for c in ("DebtToIncome", "PrincipalPaidPct", "HighSalaryFlag"):
+        np.testing.assert_array_equal(features[c], expected[c])
+
+
+def test_chunk_writer_types_columns_empty_in_first_chunk(tmp_path):
+    path = tmp_path / "out.parquet"
+    chunks = [
+        pd.DataFrame({"Loan_ID": ["L1", "L2"], "Note": [None, None], "Score": [np.nan, np.nan]}),
+        pd.DataFrame({"Loan_ID": ["L3"], "Note": [np.nan], "Score": [np.nan]}),  # e.g. an empty CSV column
+        pd.DataFrame({"Loan_ID": ["L4", "L5"], "Note": ["late", None], "Score": [0.5, 1.5]}),
+        pd.DataFrame({"Loan_ID": ["L6"], "Note": [np.nan], "Score": [np.nan]}),
+    ]
+    with storage.ChunkWriter(path) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    assert writer.rows == 6
+    out = pd.read_parquet(path)
+    assert out["Loan_ID"].tolist() == ["L1", "L2", "L3", "L4", "L5", "L6"]
+    assert out["Note"].tolist()[3] == "late" and out["Note"].isna().sum() == 5
+    assert out["Score"].dtype == "float64" and out["Score"].sum() == 2.0
+
+
+def test_chunk_writer_all_null_column_is_written_on_close(tmp_path):
+    path = tmp_path / "out.parquet"
+    with storage.ChunkWriter(path) as writer:
+        writer.write(pd.DataFrame({"a": [1, 2], "b": [None, None]}))
+        writer.write(pd.DataFrame({"a": [3], "b": [None]}))
+    out = pd.read_parquet(path)
+    assert out["a"].tolist() == [1, 2, 3] and out["b"].isna().all()
+
+
+def test_columnar_sibling_ignores_stale_copy(tmp_path):
+    csv = tmp_path / "loans.csv"
+    _loans().to_csv(csv, index=False)
+    assert storage.columnar_sibling(csv) == csv
+    parquet = storage.import_csv(csv, tmp_path / "loans.parquet")
+    assert storage.columnar_sibling(csv) == Path(parquet)
+
+    os.utime(csv, (os.path.getmtime(parquet) + 10,) * 2)  # rows appended to the CSV afterwards
+    assert storage.columnar_sibling(csv) == csv
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.tree import DecisionTreeRegressor
+from src import utils
+from src.tree_export import FlatForest
+
+
+def _frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({"a": rng.normal(size=n), "b": rng.lognormal(size=n), "c": rng.integers(0, 5, n)})
+    X.loc[rng.random(n) < 0.1, "b"] = np.nan
+    y = X["a"] * 3 + X["b"].fillna(0) + rng.normal(0, 0.1, n)
+    return X, y
+
+
+@pytest.mark.parametrize("model", [
+    RandomForestRegressor(n_estimators=20, random_state=0),
+    DecisionTreeRegressor(random_state=0),
+])
+def test_flat_predictions_are_identical(model):
+    X, y = _frame(300)
+    model.fit(X, y)
+    flat = FlatForest.from_sklearn(model)
+    X_new, _ = _frame(257, seed=1)
+    np.testing.assert_array_equal(flat.predict(X_new), model.predict(X_new))
+    np.testing.assert_array_equal(flat.predict(X_new, chunk_rows=16), model.predict(X_new))
+    # columns are matched by name
+    np.testing.assert_array_equal(flat.predict(X_new[["c", "a", "b"]]), model.predict(X_new))
+
+
+def test_predict_backends_agree(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "MODEL_DIR", tmp_path)
+    X, y = _frame(200)
+    model = RandomForestRegressor(n_estimators=10, random_state=0).fit(X, y)
+    utils.save_model(model, "m.pkl")
+    rows = X.head(5).to_dict(orient="records")
+    expected = utils.predict(rows, "m.pkl", backend="sklearn")
+    assert utils.predict(rows, "m.pkl", backend="flat") == expected  # exported on first use
+    assert utils.flat_model_path("m.pkl").exists()
+    assert utils.predict(rows, "m.pkl", backend="auto") == expected
+
+
+def test_flat_backend_rejects_non_tree_models(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "MODEL_DIR", tmp_path)
+    X, y = _frame(50)
+    utils.save_model(LinearRegression().fit(X.fillna(0), y), "lin.pkl")
+    rows = X.fillna(0).head(2).to_dict(orient="records")
+    with pytest.raises(TypeError):
+        utils.predict(rows, "lin.pkl", backend="flat")
+    assert utils.predict(rows, "lin.pkl", backend="auto")["n"] == 2
+
+
+def test_save_model_writes_mappable_flat_tables(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "MODEL_DIR", tmp_path)
+    X, y = _frame(100)
+    utils.save_model(RandomForestRegressor(n_estimators=5, random_state=0).fit(X, y), "m.pkl")
+    assert utils.flat_model_path("m.pkl").exists()
+    flat = utils.load_flat_model("m.pkl")
+    assert isinstance(flat.threshold.base, np.memmap)  # mapped, not copied
+    assert not flat.threshold.flags.writeable
+    # private copies stay writable, e.g. for train_incremental
+    assert utils.load_model("m.pkl", use_cache=False).estimators_[0].tree_.threshold.flags.writeable
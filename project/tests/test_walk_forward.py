@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.pipeline import make_pipeline
+
+from src.modeling import _pool_clone, eval_regression, make_model_pipeline, walk_forward_cv, walk_forward_splits
+
+
+def _frame(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "LoanDate": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.permutation(n), unit="D"),
+        "salary": rng.lognormal(8, 0.5, n),
+        "age": rng.integers(18, 70, n).astype(float),
+        "region": rng.choice(["N", "S", "E"], n),
+    })
+    df["target"] = df["salary"] * 0.01 + df["age"] + (df["region"] == "N") * 5 + rng.normal(0, 1, n)
+    return df
+
+
+@pytest.mark.parametrize("window", ["expanding", "rolling"])
+def test_splits_walk_forward_in_date_order(window):
+    df = _frame()
+    order, folds = walk_forward_splits(df, n_splits=4, window=window, gap=3)
+    dates = df["LoanDate"].to_numpy()[order]
+    assert np.all(dates[1:] >= dates[:-1])
+    assert [t.stop - t.start for _, t in folds] == [120] * 4
+    for train, test in folds:
+        assert test.start - train.stop == 3
+        assert dates[train.stop - 1] < dates[test.start]
+    sizes = [tr.stop - tr.start for tr, _ in folds]
+    assert sizes == ([117, 237, 357, 477] if window == "expanding" else [117] * 4)
+
+
+def test_splits_reject_too_few_rows():
+    with pytest.raises(ValueError):
+        walk_forward_splits(_frame(n=10), n_splits=5, test_size=2)
+
+
+def test_fold_metrics_match_a_manual_pipeline_fit():
+    df = _frame()
+    num, cat = ["salary", "age"], ["region"]
+    table = walk_forward_cv({"lin": LinearRegression(), "ridge": Ridge()}, df, "target", num, cat,
+                            n_splits=3, n_jobs=1)
+    assert list(table["model"]) == ["lin"] * 3 + ["ridge"] * 3
+    assert {"MAE", "RMSE", "R2", "n_train", "n_test", "test_from", "fit_seconds"} <= set(table.columns)
+
+    order, folds = walk_forward_splits(df, n_splits=3)
+    train, test = folds[1]
+    tr, te = df.iloc[order[train]], df.iloc[order[test]]
+    pipe = make_model_pipeline(LinearRegression(), num, cat).fit(tr[num + cat], tr["target"])
+    expected = eval_regression(te["target"], pipe.predict(te[num + cat]))
+    row = table[(table["model"] == "lin") & (table["fold"] == 1)].iloc[0]
+    for k, v in expected.items():
+        assert row[k] == pytest.approx(v)
+
+
+def test_prefix_preprocessing_is_close_to_per_fold():
+    df = _frame()
+    kw = dict(n_splits=3, n_jobs=1)
+    per_fold = walk_forward_cv(LinearRegression(), df, "target", ["salary", "age"], ["region"], **kw)
+    prefix = walk_forward_cv(LinearRegression(), df, "target", ["salary", "age"], ["region"],
+                             preprocess="prefix", **kw)
+    # an unregularised linear fit is invariant to the scaler's statistics
+    np.testing.assert_allclose(prefix["RMSE"], per_fold["RMSE"], rtol=1e-6)
+
+
+class _NJobsProbe(RegressorMixin, BaseEstimator):
+    # predicts the n_jobs it was fitted with, so the metrics show what each pool job saw
+    def __init__(self, n_jobs=-1):
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y):
+        return self
+
+    def predict(self, X):
+        return np.full(X.shape[0], float(self.n_jobs))
+
+
+@pytest.mark.parametrize("n_jobs,inner", [(2, 1.0), (1, -1.0)])
+def test_parallel_folds_run_models_single_threaded(n_jobs, inner):
+    df = _frame()
+    table = walk_forward_cv({"probe": _NJobsProbe(n_jobs=-1)}, df, "target", ["salary", "age"], ["region"], n_splits=2, n_jobs=n_jobs)
+    order, folds = walk_forward_splits(df, n_splits=2)
+    y = df["target"].to_numpy()[order]
+    expected = [np.mean(np.abs(y[test] - inner)) for _, test in folds]
+    np.testing.assert_allclose(table["MAE"], expected)
+
+
+def test_pool_clone_reaches_nested_n_jobs():
+    pipe = make_pipeline(RandomForestRegressor(n_jobs=-1))
+    assert _pool_clone(pipe, parallel=True).get_params()["randomforestregressor__n_jobs"] == 1
+    assert _pool_clone(pipe, parallel=False).get_params()["randomforestregressor__n_jobs"] == -1
+    assert pipe.get_params()["randomforestregressor__n_jobs"] == -1  # the caller's estimator is untouched